@@ -7,6 +7,7 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.routers import questionnaire, facial_analysis, gaze_analysis, risk_fusion, auth, vault
 from app.services.gaze_tracker import get_gaze_service
+from app.services.executor import get_inference_executor
 from app.database import get_database, close_database
 
 app = FastAPI(
@@ -33,11 +34,19 @@ async def startup_event():
         print("✓ Gaze tracking service ready")
     except Exception as e:
         print(f"⚠ Warning: Gaze tracking service initialization failed: {e}")
+    
+    # The facial model loads lazily on first use unless eager warm-up is requested;
+    # /api/facial/ready reports when it has finished
+    if facial_analysis.FACIAL_MODEL_EAGER:
+        facial_analysis.start_facial_warmup()
+        print("✓ Facial model warm-up started")
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown"""
+    await facial_analysis.get_facial_batcher().stop()
+    get_inference_executor().shutdown()
     close_database()
 
 # CORS middleware for frontend access
@@ -7,7 +7,8 @@ import torch.nn as nn
 from torchvision import transforms
 from PIL import Image
 import os
-from transformers import ViTForImageClassification
+import time
+from transformers import ViTConfig, ViTForImageClassification
 
 # Model configuration
 # Default model path (will be resolved in load_vit_model if not provided)
@@ -15,6 +16,15 @@ MODEL_SAVE_PATH = "backend/models/vitasd_model.pth"
 IMAGE_SIZE = 224
 BATCH_SIZE = 32
 
+# Inference precision: "fp32" (default) or "int8"
+# int8 applies dynamic quantization to the Linear layers (CPU inference only)
+VIT_QUANTIZATION = os.getenv("VIT_QUANTIZATION", "fp32").lower()
+
+# Architecture of google/vit-base-patch16-224 with a 2-class head, bundled so the
+# fine-tuned weights can be loaded without contacting the Hugging Face hub
+VIT_CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "vit_config.json")
+PRETRAINED_MODEL_NAME = "google/vit-base-patch16-224"
+
 
 class ViTASDModel(nn.Module):
     """
@@ -22,12 +32,18 @@ class ViTASDModel(nn.Module):
     """
     def __init__(self, num_classes=2, pretrained=True):
         super(ViTASDModel, self).__init__()
-        # Load pretrained ViT base model
-        self.vit = ViTForImageClassification.from_pretrained(
-            "google/vit-base-patch16-224",
-            num_labels=num_classes,
-            ignore_mismatched_sizes=True
-        )
+        if pretrained:
+            # Load pretrained ViT base model (downloads from the Hugging Face hub if not cached)
+            self.vit = ViTForImageClassification.from_pretrained(
+                PRETRAINED_MODEL_NAME,
+                num_labels=num_classes,
+                ignore_mismatched_sizes=True
+            )
+        else:
+            # Architecture only, from the bundled config; weights come from a state dict
+            config = ViTConfig.from_json_file(VIT_CONFIG_PATH)
+            config.num_labels = num_classes
+            self.vit = ViTForImageClassification(config)
     
     def forward(self, x):
         return self.vit(x)
@@ -41,11 +57,41 @@ transform = transforms.Compose([
 ])
 
 
-def load_vit_model(model_path: str = None):
+def quantize_vit_model(model: nn.Module) -> nn.Module:
+    """
+    Dynamically quantize every nn.Linear layer of the ViT to int8.
+    Weights are stored as int8 and activations are quantized on the fly,
+    which shrinks the model ~4x and speeds up CPU inference.
+    """
+    model = torch.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+    model.eval()
+    return model
+
+
+def load_vit_model(model_path: str = None, quantization: str = None):
     """
     Load the trained ViT model from backend/models/vitasd_model.pth.
     If model doesn't exist, returns a placeholder model.
+    quantization: "fp32" or "int8" (defaults to VIT_QUANTIZATION)
     """
+    if quantization is None:
+        quantization = VIT_QUANTIZATION
+    if quantization not in ("fp32", "int8"):
+        raise ValueError(f"Unknown quantization mode '{quantization}'. Use 'fp32' or 'int8'.")
+    
+    model = _load_fp32_model(model_path)
+    if quantization == "int8":
+        started = time.perf_counter()
+        timings = getattr(model, "startup_timings", {})
+        model = quantize_vit_model(model)
+        timings["quantize_ms"] = (time.perf_counter() - started) * 1000.0
+        model.startup_timings = timings
+        print("Applied dynamic int8 quantization to ViT Linear layers")
+    return model
+
+
+def _load_fp32_model(model_path: str = None):
+    """Load the fp32 ViT weights (or the pretrained fallback)"""
     if model_path is None:
         model_path = MODEL_SAVE_PATH
     
@@ -63,24 +109,116 @@ def load_vit_model(model_path: str = None):
     
     print(f"Attempting to load model from: {model_path}")
     
-    if os.path.exists(model_path):
+    if os.path.exists(model_path) or os.path.exists(_safetensors_path(model_path)):
         try:
-            model = ViTASDModel(num_classes=2, pretrained=False)
-            model.load_state_dict(torch.load(model_path, map_location=torch.device('cpu')))
-            model.eval()
+            model = _load_finetuned_model(model_path)
             print(f"Successfully loaded trained model from {model_path}")
             return model
         except Exception as e:
             print(f"Error loading model: {e}. Using pretrained model as fallback.")
-            model = ViTASDModel(num_classes=2, pretrained=True)
-            model.eval()
-            return model
+            return _load_pretrained_model()
     else:
         # Return pretrained model as fallback (not fine-tuned)
         print(f"Warning: Trained model not found at {model_path}. Using pretrained model.")
+        return _load_pretrained_model()
+
+
+def _safetensors_path(model_path: str) -> str:
+    """vitasd_model.pth -> vitasd_model.safetensors"""
+    return os.path.splitext(model_path)[0] + ".safetensors"
+
+
+def _load_finetuned_model(model_path: str):
+    """
+    Build the architecture from the bundled config and load the fine-tuned weights once.
+
+    The module is created on the meta device (no random initialization, no
+    allocation) and the state dict tensors are assigned directly, so the weights
+    are read a single time. A sibling .safetensors file is preferred; otherwise
+    the .pth checkpoint is memory-mapped. Per-phase timings are printed and kept
+    on model.startup_timings.
+    """
+    timings = {}
+    started = time.perf_counter()
+    
+    phase = time.perf_counter()
+    with torch.device("meta"):
+        model = ViTASDModel(num_classes=2, pretrained=False)
+    timings["build_architecture_ms"] = (time.perf_counter() - phase) * 1000.0
+    
+    phase = time.perf_counter()
+    weights_path = _safetensors_path(model_path)
+    if os.path.exists(weights_path):
+        from safetensors.torch import load_file
+        state_dict = load_file(weights_path, device="cpu")
+    else:
+        weights_path = model_path
+        state_dict = torch.load(model_path, map_location=torch.device('cpu'), mmap=True, weights_only=True)
+    timings["read_weights_ms"] = (time.perf_counter() - phase) * 1000.0
+    
+    phase = time.perf_counter()
+    model.load_state_dict(state_dict, assign=True)
+    model.eval()
+    timings["load_state_dict_ms"] = (time.perf_counter() - phase) * 1000.0
+    
+    timings["total_ms"] = (time.perf_counter() - started) * 1000.0
+    model.startup_timings = timings
+    model.weights_path = weights_path
+    print(f"ViT startup from {os.path.basename(weights_path)}: " + ", ".join(f"{k}={v:.0f}" for k, v in timings.items()))
+    return model
+
+
+def _load_pretrained_model():
+    """Pretrained (not fine-tuned) fallback; needs the hub or a local HF cache"""
+    try:
         model = ViTASDModel(num_classes=2, pretrained=True)
-        model.eval()
-        return model
+    except Exception as e:
+        raise RuntimeError(
+            f"Could not load pretrained {PRETRAINED_MODEL_NAME} (offline and not cached?): {e}"
+        )
+    model.eval()
+    return model
+
+
+def save_safetensors(model_path: str = None) -> str:
+    """Convert the .pth checkpoint into a .safetensors file next to it"""
+    from safetensors.torch import save_file
+    
+    if model_path is None:
+        model_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "models", "vitasd_model.pth")
+    state_dict = torch.load(model_path, map_location=torch.device('cpu'), weights_only=True)
+    output_path = _safetensors_path(model_path)
+    save_file({k: v.contiguous() for k, v in state_dict.items()}, output_path)
+    return output_path
+
+
+class ViTPredictor:
+    """
+    Serving handle for the PyTorch backend: the loaded model plus its device.
+    Exposes the same predict_batch interface as vit_onnx.OnnxViTModel.
+    """
+    backend = "torch"
+    
+    def __init__(self, model, device: torch.device, quantization: str):
+        self.model = model
+        self.device = device
+        self.quantization = quantization
+        self.startup_timings = getattr(model, "startup_timings", None)
+        # File the weights came from (None for the pretrained fallback)
+        self.model_path = getattr(model, "weights_path", None)
+        model.to(device)
+    
+    def predict_batch(self, images: list[Image.Image]) -> list[tuple[float, float]]:
+        return predict_autism_risk_batch(self.model, images, self.device)
+
+
+def load_vit_predictor(model_path: str = None, quantization: str = None) -> ViTPredictor:
+    """Load the ViT model and place it on the best available device"""
+    if quantization is None:
+        quantization = VIT_QUANTIZATION
+    # Quantized int8 kernels are CPU-only
+    device = torch.device("cuda" if torch.cuda.is_available() and quantization != "int8" else "cpu")
+    return ViTPredictor(load_vit_model(model_path, quantization), device, quantization)
 
 
 def predict_autism_risk(model, image: Image.Image, device: torch.device) -> tuple[float, float]:
@@ -88,11 +226,22 @@ def predict_autism_risk(model, image: Image.Image, device: torch.device) -> tupl
     Predict autism risk from a facial image.
     Returns: (probability of autism, confidence)
     """
+    return predict_autism_risk_batch(model, [image], device)[0]
+
+
+def predict_autism_risk_batch(model, images: list[Image.Image], device: torch.device) -> list[tuple[float, float]]:
+    """
+    Predict autism risk for several facial images in a single forward pass.
+    Returns one (probability of autism, confidence) tuple per image, in order.
+    """
+    if not images:
+        return []
+    
     model.to(device)
     model.eval()
     
-    # Preprocess image
-    img_tensor = transform(image).unsqueeze(0).to(device)
+    # Preprocess images into one Nx3x224x224 batch
+    img_tensor = torch.stack([transform(image) for image in images]).to(device)
     
     with torch.no_grad():
         outputs = model(img_tensor)
@@ -100,11 +249,10 @@ def predict_autism_risk(model, image: Image.Image, device: torch.device) -> tupl
         probabilities = torch.nn.functional.softmax(logits, dim=1)
         
         # Get probability of autism class (assuming class 1 is autism)
-        autism_prob = probabilities[0][1].item()
+        autism_probs = probabilities[:, 1]
         
         # Calculate confidence as the difference between max and second max probabilities
-        sorted_probs = torch.sort(probabilities[0], descending=True)[0]
-        confidence = (sorted_probs[0] - sorted_probs[1]).item()
+        sorted_probs = torch.sort(probabilities, dim=1, descending=True)[0]
+        confidences = sorted_probs[:, 0] - sorted_probs[:, 1]
     
-    return autism_prob, confidence
-
+    return list(zip(autism_probs.tolist(), confidences.tolist()))
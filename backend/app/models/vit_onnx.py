@@ -0,0 +1,94 @@
+"""
+ONNX Runtime backend for the ViT facial model.
+Serves the graph produced by export_onnx.py on the CPU execution provider.
+Deliberately free of torch/transformers imports so workers using this
+backend start faster and use less memory.
+"""
+import os
+import time
+from typing import List, Tuple
+
+import numpy as np
+from PIL import Image
+
+IMAGE_SIZE = 224
+MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+# Default location of the exported graph (next to vitasd_model.pth)
+ONNX_MODEL_PATH = os.getenv(
+    "FACIAL_ONNX_MODEL_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "models", "vitasd_model.onnx")
+)
+# Intra-op threads for ONNX Runtime (0 = let ORT decide)
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", "0"))
+
+
+def preprocess_image(image: Image.Image) -> np.ndarray:
+    """
+    NumPy equivalent of vit_model.transform:
+    Resize((224, 224)) -> ToTensor() -> Normalize(mean, std), as a 3x224x224 float32 array.
+    """
+    if image.size != (IMAGE_SIZE, IMAGE_SIZE):
+        image = image.resize((IMAGE_SIZE, IMAGE_SIZE), Image.BILINEAR)
+    array = np.asarray(image, dtype=np.float32) / 255.0
+    array = (array - MEAN) / STD
+    return array.transpose(2, 0, 1)
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    shifted = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+class OnnxViTModel:
+    """
+    ViT autism classifier running on ONNX Runtime's CPU provider.
+    predict_batch mirrors vit_model.predict_autism_risk_batch.
+    """
+    backend = "onnx"
+    device = "cpu"
+    quantization = None
+    
+    def __init__(self, model_path: str = ONNX_MODEL_PATH, num_threads: int = ONNX_THREADS):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads > 0:
+            options.intra_op_num_threads = num_threads
+        self.model_path = model_path
+        started = time.perf_counter()
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        self.output_name = self.session.get_outputs()[0].name
+        self.startup_timings = {"create_session_ms": (time.perf_counter() - started) * 1000.0}
+
+    def predict_batch(self, images: List[Image.Image]) -> List[Tuple[float, float]]:
+        """
+        Predict autism risk for several facial images in a single session run.
+        Returns one (probability of autism, confidence) tuple per image, in order.
+        """
+        if not images:
+            return []
+        batch = np.stack([preprocess_image(image) for image in images]).astype(np.float32, copy=False)
+        logits = self.session.run([self.output_name], {self.input_name: batch})[0]
+        probabilities = _softmax(logits)
+
+        # Probability of autism class (class 1) and margin between the top two classes
+        sorted_probs = np.sort(probabilities, axis=1)[:, ::-1]
+        confidences = sorted_probs[:, 0] - sorted_probs[:, 1]
+        return [(float(p), float(c)) for p, c in zip(probabilities[:, 1], confidences)]
+
+
+def load_onnx_model(model_path: str = None) -> OnnxViTModel:
+    """Load the exported ONNX graph. Raises if the file has not been exported yet."""
+    if model_path is None:
+        model_path = ONNX_MODEL_PATH
+    print(f"Attempting to load ONNX model from: {model_path}")
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"ONNX model not found at {model_path}. Run `python export_onnx.py` first.")
+    model = OnnxViTModel(model_path)
+    print(f"Successfully loaded ONNX model from {model_path}")
+    return model
@@ -5,20 +5,51 @@ Processes images in-memory only, no storage.
 from fastapi import APIRouter, File, UploadFile, HTTPException
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-import torch
-import torch.nn as nn
 from PIL import Image
-import io
 import numpy as np
-from typing import Optional
-import cv2
-from app.models.vit_model import load_vit_model, predict_autism_risk
+from typing import List, Literal, Optional
+import os
+import asyncio
+import time
+from app.services.batching import MicroBatcher
+from app.services.executor import InferenceBusyError, get_inference_executor
+from app.services.face_detector import get_face_detector
+from app.services.model_registry import get_model_registry
+from app.services.result_cache import ResultCache, content_digest
+from app.services.image_pipeline import DecodedImage, ImageTooLargeError, decode_upload
 
 router = APIRouter()
 
-# Global model cache (loaded once at startup)
-_model = None
-_device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+# Inference backend: "torch" (default) or "onnx" (onnxruntime CPU, no torch import)
+FACIAL_MODEL_BACKEND = os.getenv("FACIAL_MODEL_BACKEND", "torch").lower()
+
+# Name of the ViT model in the model registry
+FACIAL_MODEL_NAME = "facial"
+# Load and warm up the model at startup instead of on first use
+FACIAL_MODEL_EAGER = os.getenv("FACIAL_MODEL_EAGER", "0") == "1"
+
+# Seconds between background checks of the model file for changes (0 = every request)
+FACIAL_MODEL_CHECK_INTERVAL_SECONDS = float(os.getenv("FACIAL_MODEL_CHECK_INTERVAL_SECONDS", "2"))
+
+_warmup_task = None
+_file_check_task = None
+_last_file_check = 0.0
+
+# Result cache configuration
+# Re-uploads of identical bytes reuse the computed response (never the image itself)
+FACIAL_CACHE_MAX_ENTRIES = int(os.getenv("FACIAL_CACHE_MAX_ENTRIES", "1024"))
+FACIAL_CACHE_TTL_SECONDS = float(os.getenv("FACIAL_CACHE_TTL_SECONDS", "600"))
+
+# Micro-batching configuration
+# Concurrent uploads are grouped for up to FACIAL_BATCH_MAX_WAIT_MS and run as one forward pass
+FACIAL_BATCH_MAX_SIZE = int(os.getenv("FACIAL_BATCH_MAX_SIZE", "8"))
+FACIAL_BATCH_MAX_WAIT_MS = float(os.getenv("FACIAL_BATCH_MAX_WAIT_MS", "5"))
+FACIAL_BATCH_MAX_QUEUE = int(os.getenv("FACIAL_BATCH_MAX_QUEUE", "64"))
+# Face crop stage: classify a margin-padded crop around the detected face instead of the whole photo
+FACIAL_FACE_CROP = os.getenv("FACIAL_FACE_CROP", "0") == "1"
+FACIAL_FACE_CROP_MARGIN = float(os.getenv("FACIAL_FACE_CROP_MARGIN", "0.25"))
+# Maximum number of images accepted by /analyze-batch
+FACIAL_MAX_BATCH_FILES = int(os.getenv("FACIAL_MAX_BATCH_FILES", "8"))
 
 
 class FacialAnalysisResponse(BaseModel):
@@ -29,30 +60,74 @@ class FacialAnalysisResponse(BaseModel):
     image_quality_check: dict
 
 
-def check_image_quality(image: Image.Image) -> dict:
+class FacialBatchItem(BaseModel):
+    filename: Optional[str] = None
+    status: Literal["analyzed", "no_face", "error"]
+    result: Optional[FacialAnalysisResponse] = None
+    detail: Optional[str] = None
+    image_quality_check: Optional[dict] = None
+
+
+class FacialBatchResponse(BaseModel):
+    results: List[FacialBatchItem]
+    num_analyzed: int
+    aggregated_probability: Optional[float] = None
+    aggregated_confidence: Optional[float] = None
+    aggregated_risk_category: Optional[str] = None
+    aggregated_risk_interpretation: Optional[str] = None
+
+
+def risk_from_probability(probability: float) -> tuple[str, str]:
+    """Map an autism-class probability to (risk_category, risk_interpretation)"""
+    # Higher probability indicates higher risk
+    if probability >= 0.7:
+        risk_category = "High"
+        risk_interpretation = f"Facial analysis suggests elevated risk indicators (probability: {probability:.2%}). This is a supporting signal only and not a diagnostic tool."
+    elif probability >= 0.5:
+        risk_category = "Medium"
+        risk_interpretation = f"Facial analysis suggests moderate risk indicators (probability: {probability:.2%}). This is a supporting signal only and not a diagnostic tool."
+    else:
+        risk_category = "Low"
+        risk_interpretation = f"Facial analysis suggests lower risk indicators (probability: {probability:.2%}). This is a supporting signal only and not a diagnostic tool."
+    return risk_category, risk_interpretation
+
+
+def build_facial_response(probability: float, confidence: float, quality_check: dict) -> FacialAnalysisResponse:
+    """Assemble the API response for one analyzed image"""
+    risk_category, risk_interpretation = risk_from_probability(probability)
+    return FacialAnalysisResponse(
+        probability=float(probability),
+        confidence=float(confidence),
+        risk_category=risk_category,
+        risk_interpretation=risk_interpretation,
+        image_quality_check=quality_check
+    )
+
+
+def detect_faces(decoded: DecodedImage) -> list:
+    """Face boxes in detection-image coordinates, from the process-wide cached detector"""
+    detector = get_face_detector()
+    return detector.detect(decoded.detection_rgb if detector.needs_color else decoded.detection_gray)
+
+
+def check_image_quality(decoded: DecodedImage, faces: Optional[list] = None) -> dict:
     """
     Check image quality: face detection, frontal pose, lighting.
+    Works on the small detection images produced by decode_upload.
     Returns quality metrics and warnings.
     """
-    # Convert PIL to OpenCV format
-    img_array = np.array(image)
-    if img_array.shape[2] == 3:  # RGB
-        img_cv = cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
-    else:
-        img_cv = img_array
-    
-    gray = cv2.cvtColor(img_cv, cv2.COLOR_BGR2GRAY)
+    gray = decoded.detection_gray
     
-    # Face detection using Haar Cascade
-    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-    faces = face_cascade.detectMultiScale(gray, 1.1, 4)
+    # Face detection using the process-wide cached detector (Haar cascade by default)
+    if faces is None:
+        faces = detect_faces(decoded)
     
     quality_check = {
         "face_detected": len(faces) > 0,
         "num_faces": len(faces),
         "image_resolution": {
-            "width": image.width,
-            "height": image.height
+            "width": decoded.width,
+            "height": decoded.height
         },
         "lighting_quality": "adequate",
         "frontal_pose": False,
@@ -80,25 +155,156 @@ def check_image_quality(image: Image.Image) -> dict:
         quality_check["lighting_quality"] = "adequate"
     
     # Check resolution
-    if image.width < 224 or image.height < 224:
+    if decoded.width < 224 or decoded.height < 224:
         quality_check["warnings"].append("Image resolution is low. Higher resolution images may provide better results.")
     
     return quality_check
 
 
-def load_model_on_startup():
-    """Load the ViT model on startup"""
-    global _model
+def prepare_model_input(decoded: DecodedImage) -> tuple[dict, Image.Image]:
+    """
+    Quality-check a decoded upload and build its 224x224 model input.
+    With FACIAL_FACE_CROP=1 and exactly one detected face, the input is a
+    crop around that face instead of the whole frame.
+    """
+    faces = detect_faces(decoded)
+    quality_check = check_image_quality(decoded, faces)
+    if FACIAL_FACE_CROP and len(faces) == 1:
+        return quality_check, decoded.crop_face(faces[0], FACIAL_FACE_CROP_MARGIN)
+    return quality_check, decoded.full_frame_input()
+
+
+def load_facial_model():
+    """Load the ViT model for the configured backend (called lazily by the model registry)"""
+    if FACIAL_MODEL_BACKEND == "onnx":
+        from app.models.vit_onnx import load_onnx_model
+        model = load_onnx_model()
+    else:
+        from app.models.vit_model import load_vit_predictor
+        model = load_vit_predictor()
+    # Remember the file version so a replaced model file can be detected
+    model.file_stamp = _file_stamp(model.model_path)
+    print(f"ViT model loaded successfully on device: {model.device} (backend: {model.backend})")
+    return model
+
+
+def _file_stamp(path: Optional[str]):
+    """(mtime, size) of a file, or None if it does not exist"""
+    if not path:
+        return None
     try:
-        _model = load_vit_model()
-        print(f"ViT model loaded successfully on device: {_device}")
-    except Exception as e:
-        print(f"Warning: Could not load ViT model: {e}")
-        print("Facial analysis will return placeholder values. Please train and save the model first.")
-        _model = None
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def warm_up_facial_model(model):
+    """Dummy forward passes (single image and a full batch) to prime kernels and allocators"""
+    blank = Image.new("RGB", (224, 224))
+    model.predict_batch([blank])
+    if FACIAL_BATCH_MAX_SIZE > 1:
+        model.predict_batch([blank] * FACIAL_BATCH_MAX_SIZE)
+
+
+# Registered here, loaded on first use (or by warm-up when FACIAL_MODEL_EAGER=1)
+get_model_registry().register(FACIAL_MODEL_NAME, load_facial_model, warm_up_facial_model)
+
+
+def _predict_batch(images: list) -> list:
+    """Run one batched forward pass over the images collected by the batcher"""
+    model = get_model_registry().get(FACIAL_MODEL_NAME)
+    if model is None:
+        raise RuntimeError("Facial analysis model is not available")
+    return model.predict_batch(images)
 
-# Load model when module is imported
-load_model_on_startup()
+
+_batcher = MicroBatcher(
+    _predict_batch,
+    max_batch_size=FACIAL_BATCH_MAX_SIZE,
+    max_wait_ms=FACIAL_BATCH_MAX_WAIT_MS,
+    name="facial",
+    executor=get_inference_executor(),
+    max_queue_size=FACIAL_BATCH_MAX_QUEUE
+)
+
+
+def get_facial_batcher() -> MicroBatcher:
+    """Get the micro-batcher wrapping the global ViT model"""
+    return _batcher
+
+
+_result_cache = ResultCache(max_entries=FACIAL_CACHE_MAX_ENTRIES, ttl_seconds=FACIAL_CACHE_TTL_SECONDS)
+
+
+def _check_facial_model_file():
+    """Reload the facial model if its file on disk changed since it was loaded (worker thread)"""
+    registry = get_model_registry()
+    if not registry.is_loaded(FACIAL_MODEL_NAME):
+        return
+    model = registry.get(FACIAL_MODEL_NAME)
+    if model is not None and _file_stamp(model.model_path) != model.file_stamp:
+        print(f"Model file {model.model_path} changed - reloading facial model")
+        # Waits for the entry lock (held during warm-up) on this thread, not on the event loop
+        registry.reload(FACIAL_MODEL_NAME)
+
+
+def _schedule_facial_model_file_check():
+    """Start a background model file check unless one ran recently or is still running"""
+    global _file_check_task, _last_file_check
+    now = time.monotonic()
+    if now - _last_file_check < FACIAL_MODEL_CHECK_INTERVAL_SECONDS:
+        return
+    if _file_check_task is not None and not _file_check_task.done():
+        return
+    _last_file_check = now
+    # Plain thread (not the bounded inference pool), like the warm-up
+    _file_check_task = asyncio.get_running_loop().run_in_executor(None, _check_facial_model_file)
+
+
+def _facial_model_generation():
+    """
+    Token identifying the model that produced cached results.
+    Reads the registry without taking its lock. A replaced model file is
+    detected by a background check; the model is then reloaded on next use
+    and the changed token invalidates the result cache.
+    """
+    registry = get_model_registry()
+    if not registry.is_loaded(FACIAL_MODEL_NAME):
+        return None
+    _schedule_facial_model_file_check()
+    return registry.version(FACIAL_MODEL_NAME)
+
+
+async def get_facial_model():
+    """Get the facial model, loading it off the event loop on first use. None if unavailable."""
+    registry = get_model_registry()
+    if registry.is_loaded(FACIAL_MODEL_NAME):
+        return registry.get(FACIAL_MODEL_NAME)
+    return await get_inference_executor().run(registry.get, FACIAL_MODEL_NAME)
+
+
+def start_facial_warmup():
+    """Load and warm up the facial model in the background (no-op if already running or ready)"""
+    global _warmup_task
+    registry = get_model_registry()
+    if registry.is_ready(FACIAL_MODEL_NAME) or registry.state(FACIAL_MODEL_NAME) == "failed":
+        return
+    if _warmup_task is None or _warmup_task.done():
+        loop = asyncio.get_running_loop()
+        # Plain thread (not the bounded inference pool) so warm-up never competes for admission
+        _warmup_task = loop.run_in_executor(None, registry.warmup, FACIAL_MODEL_NAME)
+
+
+async def _decode_and_check(contents: bytes):
+    """
+    Decode one upload and run its quality check on the inference executor.
+    Returns (224x224 model input image, quality_check).
+    """
+    executor = get_inference_executor()
+    decoded = await executor.run(decode_upload, contents)
+    quality_check, model_input = await executor.run(prepare_model_input, decoded, cpu_bound=True)
+    return model_input, quality_check
 
 
 @router.post("/analyze")
@@ -110,10 +316,16 @@ async def analyze_face(file: UploadFile = File(...)):
     try:
         # Read image into memory
         contents = await file.read()
-        image = Image.open(io.BytesIO(contents)).convert("RGB")
         
-        # Perform image quality checks
-        quality_check = check_image_quality(image)
+        # Identical bytes analyzed by the same model: reuse the computed response
+        digest = content_digest(contents)
+        cached = _result_cache.get(digest, _facial_model_generation())
+        if cached is not None:
+            del contents
+            return FacialAnalysisResponse(**cached)
+        
+        # Decode and perform image quality checks (off the event loop)
+        image, quality_check = await _decode_and_check(contents)
         
         # If no face detected, return error
         if not quality_check["face_detected"]:
@@ -123,7 +335,7 @@ async def analyze_face(file: UploadFile = File(...)):
             )
         
         # If model is not loaded, return placeholder response
-        if _model is None:
+        if await get_facial_model() is None:
             return JSONResponse(
                 status_code=503,
                 content={
@@ -136,44 +348,170 @@ async def analyze_face(file: UploadFile = File(...)):
                 }
             )
         
-        # Predict autism risk
-        probability, confidence = predict_autism_risk(_model, image, _device)
-        
-        # Determine risk category based on probability
-        # Higher probability indicates higher risk
-        if probability >= 0.7:
-            risk_category = "High"
-            risk_interpretation = f"Facial analysis suggests elevated risk indicators (probability: {probability:.2%}). This is a supporting signal only and not a diagnostic tool."
-        elif probability >= 0.5:
-            risk_category = "Medium"
-            risk_interpretation = f"Facial analysis suggests moderate risk indicators (probability: {probability:.2%}). This is a supporting signal only and not a diagnostic tool."
-        else:
-            risk_category = "Low"
-            risk_interpretation = f"Facial analysis suggests lower risk indicators (probability: {probability:.2%}). This is a supporting signal only and not a diagnostic tool."
+        # Predict autism risk (batched together with concurrent requests)
+        probability, confidence = await _batcher.submit(image)
         
         # Clear image from memory explicitly
         del image
         del contents
         
-        return FacialAnalysisResponse(
-            probability=float(probability),
-            confidence=float(confidence),
-            risk_category=risk_category,
-            risk_interpretation=risk_interpretation,
-            image_quality_check=quality_check
-        )
+        response = build_facial_response(probability, confidence, quality_check)
+        _result_cache.put(digest, response.model_dump(), _facial_model_generation())
+        return response
     
     except HTTPException:
         raise
+    except ImageTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except InferenceBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
 
 
+@router.post("/analyze-batch", response_model=FacialBatchResponse)
+async def analyze_face_batch(files: List[UploadFile] = File(...)):
+    """
+    Analyze several facial images of the same child (e.g. multiple angles) in one request.
+    Images are decoded and quality-checked concurrently, then every accepted face goes
+    through the model in a single batched forward pass. The aggregated probability is
+    the mean over the analyzed images.
+    Images are processed in-memory only and immediately discarded.
+    """
+    if not files:
+        raise HTTPException(status_code=400, detail="No images provided")
+    if len(files) > FACIAL_MAX_BATCH_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many images ({len(files)}). At most {FACIAL_MAX_BATCH_FILES} are accepted per request."
+        )
+    
+    try:
+        contents_list = [await file.read() for file in files]
+        digests = [content_digest(contents) for contents in contents_list]
+        items: List[Optional[FacialBatchItem]] = [None] * len(files)
+        
+        # Serve repeated uploads from the result cache
+        generation = _facial_model_generation()
+        pending = []
+        for index, digest in enumerate(digests):
+            cached = _result_cache.get(digest, generation)
+            if cached is not None:
+                items[index] = FacialBatchItem(filename=files[index].filename, status="analyzed", result=FacialAnalysisResponse(**cached))
+            else:
+                pending.append(index)
+        
+        # Decode and quality-check the remaining images concurrently
+        checked = await asyncio.gather(
+            *[_decode_and_check(contents_list[index]) for index in pending],
+            return_exceptions=True
+        )
+        del contents_list
+        
+        accepted = []
+        for index, outcome in zip(pending, checked):
+            if isinstance(outcome, InferenceBusyError):
+                raise outcome
+            if isinstance(outcome, ImageTooLargeError):
+                items[index] = FacialBatchItem(filename=files[index].filename, status="error", detail=str(outcome))
+                continue
+            if isinstance(outcome, Exception):
+                items[index] = FacialBatchItem(filename=files[index].filename, status="error", detail=f"Error processing image: {str(outcome)}")
+                continue
+            image, quality_check = outcome
+            if not quality_check["face_detected"]:
+                items[index] = FacialBatchItem(
+                    filename=files[index].filename,
+                    status="no_face",
+                    detail="No face detected in image. Please upload a clear frontal facial image.",
+                    image_quality_check=quality_check
+                )
+                continue
+            accepted.append((index, image, quality_check))
+        del checked
+        
+        if accepted:
+            if await get_facial_model() is None:
+                raise HTTPException(status_code=503, detail="Model not available. Please ensure the model has been trained and saved.")
+            
+            # One forward pass over all accepted faces
+            predictions = await get_inference_executor().run(_predict_batch, [image for _, image, _ in accepted])
+            generation = _facial_model_generation()
+            for (index, _, quality_check), (probability, confidence) in zip(accepted, predictions):
+                response = build_facial_response(probability, confidence, quality_check)
+                _result_cache.put(digests[index], response.model_dump(), generation)
+                items[index] = FacialBatchItem(filename=files[index].filename, status="analyzed", result=response)
+            del accepted
+        
+        analyzed = [item.result for item in items if item.status == "analyzed"]
+        batch_response = FacialBatchResponse(results=items, num_analyzed=len(analyzed))
+        if analyzed:
+            probability = sum(result.probability for result in analyzed) / len(analyzed)
+            confidence = sum(result.confidence for result in analyzed) / len(analyzed)
+            risk_category, risk_interpretation = risk_from_probability(probability)
+            batch_response.aggregated_probability = probability
+            batch_response.aggregated_confidence = confidence
+            batch_response.aggregated_risk_category = risk_category
+            batch_response.aggregated_risk_interpretation = risk_interpretation
+        return batch_response
+    
+    except HTTPException:
+        raise
+    except ImageTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except InferenceBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing images: {str(e)}")
+
+
 @router.get("/health")
 async def health_check():
-    """Check if facial analysis model is loaded"""
+    """Check if facial analysis model is loaded (does not trigger loading)"""
+    registry = get_model_registry()
+    model = registry.get(FACIAL_MODEL_NAME) if registry.is_loaded(FACIAL_MODEL_NAME) else None
     return {
-        "model_loaded": _model is not None,
-        "device": str(_device)
+        "model_loaded": model is not None,
+        "device": str(model.device) if model is not None else None,
+        "backend": FACIAL_MODEL_BACKEND,
+        "quantization": model.quantization if model is not None else None,
+        "startup_timings": model.startup_timings if model is not None else None,
+        "model": registry.status(FACIAL_MODEL_NAME)
     }
 
+
+@router.get("/ready")
+async def readiness():
+    """
+    Readiness probe for load balancers: 200 only once the model is loaded and warmed up.
+    The first probe on a cold worker starts the warm-up in the background.
+    """
+    registry = get_model_registry()
+    if registry.is_ready(FACIAL_MODEL_NAME):
+        return {"ready": True, "model": registry.status(FACIAL_MODEL_NAME)}
+    
+    start_facial_warmup()
+    return JSONResponse(
+        status_code=503,
+        content={"ready": False, "model": registry.status(FACIAL_MODEL_NAME)}
+    )
+
+
+@router.get("/batching")
+async def batching_stats():
+    """Queue depth and batch-size histograms of the inference micro-batcher"""
+    stats = _batcher.stats()
+    stats["executor"] = get_inference_executor().stats()
+    return stats
+
+
+@router.get("/cache")
+async def cache_stats():
+    """Size, hit rate and eviction counters of the facial result cache"""
+    return _result_cache.stats()
+
+
+@router.post("/cache/invalidate")
+async def invalidate_cache():
+    """Drop every cached facial analysis result"""
+    return {"invalidated": _result_cache.clear()}
@@ -2,13 +2,44 @@
 Gaze analysis router for processing gaze tracking results.
 Uses EyeTrax library for gaze estimation.
 """
-from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect
 from pydantic import BaseModel
-from typing import List, Literal, Optional
+from typing import List, Literal, Optional, Tuple
+import asyncio
+import json
+import math
+import mimetypes
+import os
+import tempfile
+import time
+from collections import deque
 from app.services.gaze_tracker import get_gaze_service, calculate_9_point_calibration_targets
+from app.services.executor import InferenceBusyError, get_inference_executor
+from app.services.gaze_protocol import FORMAT_NAMES, PROTOCOL_VERSION, FrameDecodeError, decode_header
+from app.services.gaze_sessions import GazeSession, get_gaze_session_store
+from app.services.gaze_features import CalibrationAccumulator
+from app.services.gaze_filter import FilterOptionError, GazeFilter
+from app.services.gaze_flow import FrameFlowController
+from app.services.gaze_spi import SPIAccumulator
+from app.services.gaze_payload import CompactPayloadError, decode_compact_gaze, decode_compact_gaze_json
+from app.services.gaze_recording import GAZE_RECORDING_SAMPLE_FPS, RecordingError, analyze_recording, iter_recording_frames
 
 router = APIRouter()
 
+# Also retrain the shared model on every calibration, for clients that predict without a session_id.
+# Set to 0 when many sessions calibrate concurrently so they cannot overwrite each other.
+GAZE_UPDATE_GLOBAL_MODEL = os.getenv("GAZE_UPDATE_GLOBAL_MODEL", "1") == "1"
+# While the gaze video plays, /ws pushes an interim SPI every this many counted points (0 = only on request)
+GAZE_SPI_PUSH_EVERY = int(os.getenv("GAZE_SPI_PUSH_EVERY", "30"))
+# Binary calibration frames are extracted in groups of this size while a point is still streaming
+GAZE_STREAM_FLUSH_FRAMES = int(os.getenv("GAZE_STREAM_FLUSH_FRAMES", "8"))
+# Most frames accepted by /predict/batch, and batched together by /ws when frames queue up
+GAZE_BATCH_MAX_FRAMES = int(os.getenv("GAZE_BATCH_MAX_FRAMES", "64"))
+# Largest recording accepted by /analyze/recording, in MB
+GAZE_RECORDING_MAX_MB = float(os.getenv("GAZE_RECORDING_MAX_MB", "200"))
+# /ws messages read ahead of the frame being processed before the socket stops reading (TCP backpressure)
+GAZE_WS_INBOX_SIZE = int(os.getenv("GAZE_WS_INBOX_SIZE", "16"))
+
 
 class GazeDataPoint(BaseModel):
     timestamp: float
@@ -32,6 +63,13 @@ class GazeAnalysisResponse(BaseModel):
     recommendation: str
 
 
+class RecordingAnalysisResponse(GazeAnalysisResponse):
+    gaze_data: List[GazeDataPoint]  # One point per frame with a prediction, timestamps in ms from the start
+    video_duration: float  # Seconds covered by the analyzed frames
+    frames: dict  # analyzed, face_not_detected, blink_detected, predicted
+    timings: dict
+
+
 class CalibrationFrame(BaseModel):
     frame: str  # base64 encoded image
     target_x: float  # Normalized x coordinate (0-1)
@@ -52,6 +90,8 @@ class CalibrationPointsResponse(BaseModel):
 
 class FrameCheckRequest(BaseModel):
     frame: str  # base64 encoded image (no data-url prefix)
+    session_id: Optional[str] = None  # with seq, caches the extraction for a /predict of the same frame
+    seq: Optional[int] = None  # client frame number, unique within the session
 
 
 class FrameCheckResponse(BaseModel):
@@ -59,6 +99,41 @@ class FrameCheckResponse(BaseModel):
     blink_detected: bool
 
 
+def apply_gaze_filter(gaze_filter: GazeFilter, x: float, y: float, timestamp_ms: Optional[float] = None) -> dict:
+    """Smooth a predicted point; the raw point and the current fixation are returned alongside"""
+    # Missing or non-advancing client timestamps fall back to the server clock inside the filter
+    valid = isinstance(timestamp_ms, (int, float)) and not isinstance(timestamp_ms, bool)
+    smoothed = gaze_filter.update(x, y, timestamp_ms / 1000.0 if valid else None)
+    return {"x": smoothed["x"], "y": smoothed["y"], "raw_x": x, "raw_y": y, "fixation": smoothed["fixation"]}
+
+
+def resolve_predict_session(body: dict) -> Optional[GazeSession]:
+    """Session named by a /check, /predict or /frame body; 404 if it expired, 400 if smoothing lacks one"""
+    session_id = body.get("session_id")
+    session = get_gaze_session_store().get(session_id) if session_id else None
+    if session_id and session is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired gaze session; please recalibrate")
+    if body.get("smooth") and session is None:
+        raise HTTPException(status_code=400, detail="Smoothing requires a session_id")
+    return session
+
+
+def gaze_point_response(body: dict, session: Optional[GazeSession], gaze: Optional[Tuple[float, float]]) -> dict:
+    """/predict output for a prediction (smoothed if the body asks for it), or the center fallback"""
+    if not gaze:
+        # Fallback to center if prediction fails
+        return {"x": 0.5, "y": 0.5, "calibrated": True, "prediction_failed": True}
+    x, y = gaze
+    if body.get("smooth"):
+        if session.gaze_filter is None:
+            try:
+                session.gaze_filter = GazeFilter.from_options(body.get("filter"))
+            except FilterOptionError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        return {**apply_gaze_filter(session.gaze_filter, x, y, body.get("timestamp")), "calibrated": True}
+    return {"x": x, "y": y, "calibrated": True}
+
+
 @router.get("/calibration-points")
 async def get_calibration_points(screen_width: int = 1920, screen_height: int = 1080):
     """
@@ -93,9 +168,15 @@ async def check_frame(request: FrameCheckRequest):
     """
     Lightweight EyeTrax-only per-frame check used by the frontend during calibration:
     returns face detection + blink detection so the UI can restart the current point on blink.
+    With session_id and seq, a following /predict with the same seq reuses this extraction.
+    An unknown or expired session_id returns 404, as /predict does.
     """
     gaze_service = get_gaze_service()
-    result = gaze_service.check_frame(request.frame)
+    session = resolve_predict_session({"session_id": request.session_id})
+    try:
+        result = await get_inference_executor().run(gaze_service.check_frame, request.frame, session, request.seq)
+    except InferenceBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     return FrameCheckResponse(**result)
 
 
@@ -104,6 +185,7 @@ async def calibrate_gaze(request: CalibrationRequest):
     """
     Calibrate gaze tracking system with collected frames using EyeTrax.
     Uses EyeTrax's extract_features and train methods.
+    Returns a session_id; pass it to /predict and /ws to use this calibration.
     """
     try:
         gaze_service = get_gaze_service()
@@ -117,32 +199,244 @@ async def calibrate_gaze(request: CalibrationRequest):
             for frame in request.frames
         ]
         
-        success = gaze_service.calibrate_with_frames(
+        session = await get_inference_executor().run(
+            gaze_service.calibrate_session,
             calibration_data,
             screen_width=request.screen_width,
-            screen_height=request.screen_height
+            screen_height=request.screen_height,
+            update_global=GAZE_UPDATE_GLOBAL_MODEL
         )
         
-        if success:
-            return {"status": "calibrated", "message": "Gaze tracking system calibrated using EyeTrax"}
+        if session is not None:
+            get_gaze_session_store().put(session)
+            return {
+                "status": "calibrated",
+                "message": "Gaze tracking system calibrated using EyeTrax",
+                "session_id": session.session_id,
+                "timings": session.calibration_timings
+            }
         else:
             raise HTTPException(status_code=500, detail="Calibration failed")
     
+    except HTTPException:
+        raise
+    except InferenceBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error during calibration: {str(e)}")
 
 
+class CalibrationMessageError(ValueError):
+    """A streamed calibration message with a missing or invalid field"""
+
+
+def calibration_number(data: dict, key: str, default: float, integer: bool = False,
+                       minimum: Optional[float] = None, maximum: Optional[float] = None):
+    """A numeric field of a calibration message; raises CalibrationMessageError naming the field"""
+    value = data.get(key, default)
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        number = None
+    if number is None or isinstance(value, bool):
+        raise CalibrationMessageError(f"{key} must be a number")
+    if not math.isfinite(number):
+        raise CalibrationMessageError(f"{key} must be finite")
+    if integer:
+        if not number.is_integer():
+            raise CalibrationMessageError(f"{key} must be an integer")
+        number = int(number)
+    if minimum is not None and number < minimum:
+        raise CalibrationMessageError(f"{key} must be at least {minimum}")
+    if maximum is not None and number > maximum:
+        raise CalibrationMessageError(f"{key} must be at most {maximum}")
+    return number
+
+
+@router.websocket("/calibrate/ws")
+async def websocket_streaming_calibration(websocket: WebSocket):
+    """
+    Streaming 9-point calibration. Frames are sent per calibration point and
+    their features are extracted as they arrive; only the feature vectors are
+    kept, and the session model is trained as soon as the last point is done.
+
+    Client messages (JSON unless noted):
+      {"type": "start", "screen_width": 1920, "screen_height": 1080, "points": 9}
+      {"type": "point", "point_index": 0, "target_x": 0.5, "target_y": 0.5}
+      {"type": "frames", "frames": [base64, ...]}      frames of the current point
+      binary message                                     one frame (app.services.gaze_protocol)
+      {"type": "restart_point", "point_index": 0}        discard the point's samples (e.g. after a blink)
+      {"type": "point_done", "point_index": 0}
+      {"type": "finish"}                                 train now, even if points are missing
+    Server replies with "started", "point_done" (sample counts), "busy", "error"
+    and finally {"type": "calibrated", "session_id": ...}; send start again to recalibrate.
+    A message with an invalid field (e.g. a point_index outside the points, a
+    target outside 0-1) is answered with "error" and otherwise ignored.
+    """
+    await websocket.accept()
+    gaze_service = get_gaze_service()
+    executor = get_inference_executor()
+    accumulator: Optional[CalibrationAccumulator] = None
+    # Extraction stream key of the current calibration (estimator state is kept across its points)
+    extract_stream = None
+    current_point: Optional[int] = None
+    buffered_frames: list = []
+    last_point_done = None
+    
+    async def extract(frames: list, point_index: int, single_worker: bool = False) -> bool:
+        try:
+            results, timings = await executor.run(gaze_service.extract_features_batch, frames,
+                                                  "calibration frame", extract_stream, single_worker)
+        except InferenceBusyError as e:
+            await websocket.send_json({"type": "busy", "detail": str(e), "point_index": point_index,
+                                       "dropped_frames": len(frames)})
+            return False
+        accumulator.add(point_index, results, timings)
+        return True
+    
+    async def finish() -> bool:
+        X, y = accumulator.arrays()
+        if len(X) < 9:
+            await websocket.send_json({"type": "error",
+                                       "detail": f"Not enough calibration samples: {len(X)} (need at least 9)"})
+            return False
+        try:
+            session = await executor.run(
+                gaze_service.train_session, X, y, accumulator.screen_width, accumulator.screen_height,
+                accumulator.timings, GAZE_UPDATE_GLOBAL_MODEL
+            )
+        except InferenceBusyError as e:
+            await websocket.send_json({"type": "busy", "detail": str(e)})
+            return False
+        if session is None:
+            await websocket.send_json({"type": "error", "detail": "Calibration failed"})
+            return False
+        get_gaze_session_store().put(session)
+        if last_point_done is not None:
+            session.calibration_timings["after_last_point_ms"] = (time.perf_counter() - last_point_done) * 1000.0
+        await websocket.send_json({
+            "type": "calibrated",
+            "session_id": session.session_id,
+            "samples": len(X),
+            "face_not_detected": accumulator.face_not_detected,
+            "blink_detected": accumulator.blink_detected,
+            "timings": session.calibration_timings
+        })
+        return True
+    
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            
+            if message.get("bytes") is not None:
+                if accumulator is None or current_point is None:
+                    await websocket.send_json({"type": "error", "detail": "Send start and point before frames"})
+                    continue
+                buffered_frames.append(message["bytes"])
+                if len(buffered_frames) >= GAZE_STREAM_FLUSH_FRAMES:
+                    # A small flush goes to one worker rather than ~2 frames per thread
+                    frames, buffered_frames = buffered_frames, []
+                    await extract(frames, current_point, single_worker=True)
+                continue
+            
+            try:
+                data = json.loads(message.get("text") or "{}")
+            except json.JSONDecodeError:
+                data = None
+            if not isinstance(data, dict):
+                await websocket.send_json({"type": "error", "detail": "Messages must be JSON objects"})
+                continue
+            message_type = data.get("type")
+            
+            try:
+                if message_type == "start":
+                    screen_width = calibration_number(data, "screen_width", 1920, integer=True, minimum=1)
+                    screen_height = calibration_number(data, "screen_height", 1080, integer=True, minimum=1)
+                    points = calibration_number(data, "points", 9, integer=True, minimum=1)
+                elif accumulator is not None and message_type == "point":
+                    point_index = calibration_number(data, "point_index", 0, integer=True, minimum=0,
+                                                     maximum=accumulator.points - 1)
+                    target_x = calibration_number(data, "target_x", 0.0, minimum=0.0, maximum=1.0)
+                    target_y = calibration_number(data, "target_y", 0.0, minimum=0.0, maximum=1.0)
+                elif accumulator is not None and message_type in ("restart_point", "point_done"):
+                    point_index = calibration_number(data, "point_index", current_point or 0, integer=True,
+                                                     minimum=0, maximum=accumulator.points - 1)
+            except CalibrationMessageError as e:
+                await websocket.send_json({"type": "error", "detail": str(e)})
+                continue
+            
+            if message_type == "start":
+                accumulator = CalibrationAccumulator(screen_width, screen_height, points)
+                current_point, buffered_frames, last_point_done = None, [], None
+                extract_stream = object()
+                await websocket.send_json({"type": "started", "points": accumulator.points})
+            elif message_type == "close":
+                break
+            elif accumulator is None:
+                await websocket.send_json({"type": "error", "detail": "Send start first"})
+            elif message_type == "point":
+                current_point = point_index
+                accumulator.set_point(current_point, target_x, target_y)
+                buffered_frames = []
+            elif message_type == "frames":
+                if current_point is None:
+                    await websocket.send_json({"type": "error", "detail": "Send point before frames"})
+                    continue
+                frames = [frame for frame in data.get("frames", []) if frame]
+                if frames:
+                    await extract(frames, current_point)
+            elif message_type == "restart_point":
+                accumulator.restart_point(point_index)
+                if point_index == current_point:
+                    buffered_frames = []
+            elif message_type == "point_done":
+                if buffered_frames and point_index == current_point:
+                    frames, buffered_frames = buffered_frames, []
+                    await extract(frames, point_index, single_worker=True)
+                all_done = accumulator.complete_point(point_index)
+                last_point_done = time.perf_counter()
+                await websocket.send_json({
+                    "type": "point_done",
+                    "point_index": point_index,
+                    "samples": accumulator.point_samples(point_index),
+                    "total_samples": accumulator.total_samples
+                })
+                if all_done and await finish():
+                    accumulator = None
+            elif message_type == "finish":
+                if await finish():
+                    accumulator = None
+    
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        print(f"Calibration WebSocket error: {e}")
+        await websocket.close()
+
+
 @router.post("/predict")
 async def predict_gaze(frame: dict):
     """
     Predict gaze coordinates from a single frame using EyeTrax.
-    Input: {"frame": "base64_encoded_image"}
+    Input: {"frame": "base64_encoded_image", "session_id": optional id from /calibrate}
     Output: {"x": float, "y": float} (normalized coordinates 0-1)
+    
+    With "smooth": true (requires session_id) the session's One Euro filter and
+    fixation detector are applied: x/y are smoothed, raw_x/raw_y and "fixation"
+    are added. Optional "timestamp" (ms, client clock) and "filter" overrides
+    (min_cutoff, beta, d_cutoff, fixation_dispersion, fixation_min_ms; used when
+    the session's filter is created).
+    
+    An optional "seq" (with session_id) reuses the features of a /check of the
+    same frame instead of extracting them again.
     """
     try:
         gaze_service = get_gaze_service()
+        session = resolve_predict_session(frame)
         
-        if not gaze_service.get_calibration_status():
+        if session is None and not gaze_service.get_calibration_status():
             # If not calibrated, return approximate center (fallback)
             return {"x": 0.5, "y": 0.5, "calibrated": False}
         
@@ -150,77 +444,436 @@ async def predict_gaze(frame: dict):
         if not frame_base64:
             raise HTTPException(status_code=400, detail="No frame data provided")
         
-        result = gaze_service.predict_gaze(frame_base64)
-        
-        if result:
-            x, y = result
-            return {"x": x, "y": y, "calibrated": True}
-        else:
-            # Fallback to center if prediction fails
-            return {"x": 0.5, "y": 0.5, "calibrated": True, "prediction_failed": True}
+        result = await get_inference_executor().run(gaze_service.predict_gaze, frame_base64, session, frame.get("seq"))
+        return gaze_point_response(frame, session, result)
     
+    except HTTPException:
+        raise
+    except InferenceBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error predicting gaze: {str(e)}")
 
 
+@router.post("/predict/batch")
+async def predict_gaze_batch(body: dict):
+    """
+    /predict for buffered frames (e.g. a burst, or the replay of a recording),
+    with one vectorized predict over all of them.
+    Input: {"frames": [base64, ...], "session_id", "smooth", "filter" as for /predict,
+            "timestamps": optional [ms, ...] aligned with frames (drive smoothing)}
+    Output: {"predictions": [/predict output per frame, in order], "calibrated", "timings"}
+    """
+    try:
+        gaze_service = get_gaze_service()
+        session = resolve_predict_session(body)
+        
+        frames = body.get("frames") or []
+        if not frames:
+            raise HTTPException(status_code=400, detail="No frames provided")
+        if len(frames) > GAZE_BATCH_MAX_FRAMES:
+            raise HTTPException(status_code=400, detail=f"At most {GAZE_BATCH_MAX_FRAMES} frames per batch")
+        timestamps = body.get("timestamps") or [None] * len(frames)
+        if len(timestamps) != len(frames):
+            raise HTTPException(status_code=400, detail="timestamps must align with frames")
+        
+        if session is None and not gaze_service.get_calibration_status():
+            # If not calibrated, return approximate center (fallback)
+            return {"predictions": [{"x": 0.5, "y": 0.5, "calibrated": False} for _ in frames], "calibrated": False}
+        
+        points, timings = await get_inference_executor().run(gaze_service.predict_gaze_batch, frames, session)
+        predictions = [
+            gaze_point_response({**body, "timestamp": timestamp}, session, point)
+            for point, timestamp in zip(points, timestamps)
+        ]
+        return {"predictions": predictions, "calibrated": True, "timings": timings}
+    
+    except HTTPException:
+        raise
+    except InferenceBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error predicting gaze batch: {str(e)}")
+
+
+@router.post("/frame")
+async def analyze_frame(frame: dict):
+    """
+    /check and /predict in one call, from a single EyeTrax extraction.
+    Input: the /predict body ("frame", optional "session_id", "smooth", "timestamp", "filter")
+    Output: the /predict response plus "face_detected" and "blink_detected".
+    Without a calibration the face/blink status is still returned, with the center point.
+    """
+    try:
+        gaze_service = get_gaze_service()
+        session = resolve_predict_session(frame)
+        
+        frame_base64 = frame.get("frame", "")
+        if not frame_base64:
+            raise HTTPException(status_code=400, detail="No frame data provided")
+        
+        calibrated = session is not None or gaze_service.get_calibration_status()
+        result = await get_inference_executor().run(
+            gaze_service.analyze_frame, frame_base64, session, frame.get("seq"), calibrated
+        )
+        status = {"face_detected": result["face_detected"], "blink_detected": result["blink_detected"]}
+        if not calibrated:
+            return {"x": 0.5, "y": 0.5, "calibrated": False, **status}
+        return {**gaze_point_response(frame, session, result["gaze"]), **status}
+    
+    except HTTPException:
+        raise
+    except InferenceBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error analyzing frame: {str(e)}")
+
+
+def spi_message(spi: SPIAccumulator, final: bool) -> dict:
+    """Interim counters, or the full analysis once the video has ended"""
+    if final and spi.total_valid_frames:
+        return {"type": "spi", "final": True, **build_gaze_analysis(spi.social_frames, spi.geometric_frames).model_dump()}
+    return {
+        "type": "spi",
+        "final": final,
+        "spi": spi.spi,
+        "social_frames": spi.social_frames,
+        "geometric_frames": spi.geometric_frames,
+        "total_valid_frames": spi.total_valid_frames
+    }
+
+
+async def read_gaze_messages(websocket: WebSocket, inbox: asyncio.Queue):
+    """Move raw WebSocket messages into inbox (the frame loop reads them) until the client disconnects"""
+    try:
+        while True:
+            message = await websocket.receive()
+            await inbox.put(message)
+            if message["type"] == "websocket.disconnect":
+                return
+    except Exception:
+        # Connection broken: wake the frame loop
+        await inbox.put({"type": "websocket.disconnect"})
+
+
+def parse_gaze_message(message: dict) -> Tuple[str, object]:
+    """("disconnect" | "bytes" | "json", payload) for a raw WebSocket message"""
+    if message["type"] == "websocket.disconnect":
+        return "disconnect", None
+    if message.get("bytes") is not None:
+        return "bytes", message["bytes"]
+    return "json", json.loads(message.get("text") or "{}")
+
+
+def is_frame_message(item: Tuple[str, object]) -> bool:
+    kind, payload = item
+    return kind == "bytes" or (kind == "json" and payload.get("type") == "frame")
+
+
+def frame_echo(item: Tuple[str, object]) -> dict:
+    """seq/timestamp a reply to this frame message echoes"""
+    kind, payload = item
+    if kind == "bytes":
+        try:
+            header = decode_header(payload)
+        except FrameDecodeError:
+            return {}
+        return {"seq": header.seq, "timestamp": header.timestamp}
+    if payload.get("timestamp") is not None:
+        return {"timestamp": payload.get("timestamp")}
+    return {}
+
+
 @router.websocket("/ws")
 async def websocket_gaze_tracking(websocket: WebSocket):
     """
     WebSocket endpoint for real-time gaze tracking using EyeTrax.
     Client sends frames, server responds with gaze coordinates.
+
+    Frames are JSON ({"type": "frame", "frame": base64}) by default. A client
+    that sends {"type": "hello", "binary": true} first may then send each
+    frame as a binary message (see app.services.gaze_protocol); replies to
+    binary frames echo the frame's seq and timestamp. A "session_id" in the
+    hello (or in a JSON frame) selects that session's calibration.
+    
+    "smooth": true in the hello enables server-side smoothing and fixation
+    detection for this connection ("filter" holds optional parameter
+    overrides, see apply_gaze_filter); frame timestamps (ms) drive the filter,
+    and the server clock stands in while they are missing or not increasing.
+    
+    "check": true in the hello (or in a JSON frame) adds "face_detected" and
+    "blink_detected" to the replies, from the same extraction as the
+    prediction, so no separate /check is needed; it works before calibration.
+    
+    Between {"type": "video_start"} and {"type": "video_end"} every predicted
+    point is classified social/geometric server-side and counted; an interim
+    {"type": "spi", "final": false} is pushed every GAZE_SPI_PUSH_EVERY points
+    (or on {"type": "spi_request"}) and video_end returns the final analysis
+    (the /analyze response with "type": "spi", "final": true).
+    
+    Every frame gets exactly one reply. Frames are read while the previous one
+    is processed; a frame that is still waiting when a newer frame arrives is
+    stale and is answered with {"type": "dropped"} instead of being processed.
+    With "flow_control": true in the hello, every frame reply also carries
+    "credits": how many frames the client may have in flight (sent but not
+    answered), derived from the measured per-frame time and the inference
+    queue (app.services.gaze_flow); at most 2 while stale frames are dropped,
+    so a client that follows its credits has no frames dropped. {"type": "flow_request"} returns the
+    stream's effective FPS, frame time and drop counts as {"type": "flow"}.
+    
+    A client that needs every frame (e.g. replaying a recording) sends
+    "drop_stale": false in the hello; its frames then all go through the
+    extractor pool, and frames that queue up are analyzed together (up to
+    GAZE_BATCH_MAX_FRAMES) with one vectorized predict. Such streams skip
+    the face-tracking crop (GAZE_ROI) and the per-session feature cache.
     """
     await websocket.accept()
     gaze_service = get_gaze_service()
+    executor = get_inference_executor()
+    session_store = get_gaze_session_store()
+    binary_enabled = False
+    session_id = None
+    gaze_filter: Optional[GazeFilter] = None
+    check_enabled = False
+    spi = SPIAccumulator()
+    spi_active = False
+    flow = FrameFlowController()
+    flow_enabled = False
+    drop_stale = True
+    # Extraction stream key of this connection's batched frames
+    extract_stream = object()
+    inbox: asyncio.Queue = asyncio.Queue(maxsize=GAZE_WS_INBOX_SIZE)
+    reader = asyncio.create_task(read_gaze_messages(websocket, inbox))
+    # The message being handled plus the next one (to spot stale frames), or a batch being gathered
+    backlog: deque = deque()
+    
+    def queued_jobs() -> int:
+        stats = executor.stats()
+        return max(0, stats["pending"] - stats["threads"])
+    
+    async def reply(message: dict, echo: dict):
+        if flow_enabled:
+            message["credits"] = flow.credits(queued_jobs())
+        await websocket.send_json({**message, **echo})
+    
+    async def send_result(result: dict, echo: dict, check: bool, calibrated: bool):
+        """Gaze reply for one analyzed frame (smoothing and SPI counting included)"""
+        status = {"face_detected": result["face_detected"], "blink_detected": result["blink_detected"]} if check else {}
+        if not calibrated:
+            await reply({
+                "type": "gaze",
+                "x": 0.5,
+                "y": 0.5,
+                "calibrated": False,
+                **status
+            }, echo)
+        elif result["gaze"]:
+            x, y = result["gaze"]
+            point = {"x": x, "y": y}
+            if gaze_filter is not None:
+                point = apply_gaze_filter(gaze_filter, x, y, echo.get("timestamp"))
+            if spi_active:
+                # Classify the raw prediction, as the client does for /analyze
+                point["social_region"] = spi.add(x, y)
+            await reply({
+                "type": "gaze",
+                **point,
+                "calibrated": True,
+                **status
+            }, echo)
+            if spi_active and GAZE_SPI_PUSH_EVERY > 0 and spi.total_valid_frames % GAZE_SPI_PUSH_EVERY == 0:
+                await websocket.send_json(spi_message(spi, final=False))
+        else:
+            await reply({
+                "type": "gaze",
+                "x": 0.5,
+                "y": 0.5,
+                "calibrated": True,
+                "prediction_failed": True,
+                **status
+            }, echo)
+    
+    def current_session() -> Tuple[Optional[GazeSession], bool]:
+        # A session id must resolve to a live session; without one the shared model is used
+        session = session_store.get(session_id) if session_id else None
+        calibrated = session is not None if session_id else gaze_service.get_calibration_status()
+        if session is not None:
+            # Reported by /status?session_id=
+            session.frame_flow = flow
+        return session, calibrated
     
     try:
         while True:
-            # Receive frame data
-            data = await websocket.receive_json()
+            if not backlog:
+                backlog.append(parse_gaze_message(await inbox.get()))
+            if len(backlog) < 2 and not inbox.empty():
+                backlog.append(parse_gaze_message(inbox.get_nowait()))
+            item = backlog.popleft()
+            kind, data = item
+            if kind == "disconnect":
+                break
             
-            if data.get("type") == "frame":
-                frame_base64 = data.get("frame", "")
+            if drop_stale and is_frame_message(item) and backlog and is_frame_message(backlog[0]):
+                # A newer frame is already waiting: skip this one
+                if kind == "json":
+                    session_id = data.get("session_id") or session_id
+                flow.frame_dropped()
+                await reply({"type": "dropped"}, frame_echo(item))
+                continue
+            
+            if not drop_stale and is_frame_message(item):
+                # Every frame is wanted: take the queued frames as one batch (possibly of one). All frames
+                # of the connection take this path, so they share one extractor estimator state
+                batch = [item]
+                while len(batch) < GAZE_BATCH_MAX_FRAMES:
+                    if not backlog and not inbox.empty():
+                        backlog.append(parse_gaze_message(inbox.get_nowait()))
+                    if not backlog or not is_frame_message(backlog[0]):
+                        break
+                    batch.append(backlog.popleft())
                 
-                if gaze_service.get_calibration_status():
-                    result = gaze_service.predict_gaze(frame_base64)
-                    if result:
-                        x, y = result
-                        await websocket.send_json({
-                            "type": "gaze",
-                            "x": x,
-                            "y": y,
-                            "calibrated": True
-                        })
+                frame_args, echoes, checks = [], [], []
+                for batch_kind, batch_data in batch:
+                    if batch_kind == "bytes":
+                        if not binary_enabled:
+                            await reply({"type": "error", "detail": "Binary frames require a hello handshake"}, {})
+                            continue
+                        try:
+                            header = decode_header(batch_data)
+                        except FrameDecodeError as e:
+                            await reply({"type": "error", "detail": str(e)}, {})
+                            continue
+                        # The extractor pool decodes the image
+                        frame_args.append(batch_data)
+                        echoes.append({"seq": header.seq, "timestamp": header.timestamp})
+                        checks.append(check_enabled)
                     else:
-                        await websocket.send_json({
-                            "type": "gaze",
-                            "x": 0.5,
-                            "y": 0.5,
-                            "calibrated": True,
-                            "prediction_failed": True
-                        })
-                else:
-                    # Not calibrated, return center
+                        session_id = batch_data.get("session_id") or session_id
+                        frame_args.append(batch_data.get("frame", ""))
+                        echoes.append(frame_echo((batch_kind, batch_data)))
+                        checks.append(check_enabled or bool(batch_data.get("check")))
+                if not frame_args:
+                    continue
+                
+                session, calibrated = current_session()
+                if not calibrated and not any(checks):
+                    for echo in echoes:
+                        await reply({"type": "gaze", "x": 0.5, "y": 0.5, "calibrated": False}, echo)
+                    continue
+                
+                started = time.perf_counter()
+                try:
+                    results, _ = await executor.run(gaze_service.analyze_frames_batch, frame_args, session, calibrated,
+                                                    "stream frame", extract_stream)
+                except InferenceBusyError as e:
+                    for echo in echoes:
+                        flow.frame_rejected()
+                        await reply({"type": "busy", "detail": str(e)}, echo)
+                    continue
+                elapsed_ms = (time.perf_counter() - started) * 1000.0
+                for result, echo, check in zip(results, echoes, checks):
+                    flow.frame_done(elapsed_ms / len(results))
+                    await send_result(result, echo, check, calibrated)
+                continue
+            
+            frame_fn, frame_arg, echo, check = None, None, {}, check_enabled
+            if kind == "bytes":
+                if not binary_enabled:
+                    await reply({"type": "error", "detail": "Binary frames require a hello handshake"}, {})
+                    continue
+                try:
+                    header = decode_header(data)
+                except FrameDecodeError as e:
+                    await reply({"type": "error", "detail": str(e)}, {})
+                    continue
+                # The image is decoded by the inference thread, off the event loop
+                frame_fn, frame_arg = gaze_service.analyze_frame_message, data
+                echo = {"seq": header.seq, "timestamp": header.timestamp}
+            else:
+                if data.get("type") == "hello":
+                    binary_enabled = bool(data.get("binary"))
+                    try:
+                        new_filter = GazeFilter.from_options(data.get("filter")) if data.get("smooth") else None
+                    except FilterOptionError as e:
+                        await reply({"type": "error", "detail": str(e)}, {})
+                        continue
+                    session_id = data.get("session_id") or None
+                    gaze_filter = new_filter
+                    check_enabled = bool(data.get("check"))
+                    flow_enabled = bool(data.get("flow_control"))
+                    drop_stale = bool(data.get("drop_stale", True))
+                    flow.drop_stale = drop_stale
                     await websocket.send_json({
-                        "type": "gaze",
-                        "x": 0.5,
-                        "y": 0.5,
-                        "calibrated": False
+                        "type": "hello",
+                        "protocol": "binary" if binary_enabled else "json",
+                        "version": PROTOCOL_VERSION,
+                        "formats": list(FORMAT_NAMES.values()) if binary_enabled else [],
+                        "session": session_id is not None and session_store.get(session_id) is not None,
+                        "filter": gaze_filter.parameters if gaze_filter else None,
+                        "check": check_enabled,
+                        "flow": flow.stats(queued_jobs()) if flow_enabled else None,
+                        "drop_stale": drop_stale
                     })
+                    continue
+                elif data.get("type") == "frame":
+                    session_id = data.get("session_id") or session_id
+                    frame_fn, frame_arg = gaze_service.analyze_frame, data.get("frame", "")
+                    check = check or bool(data.get("check"))
+                    echo = frame_echo(item)
+                elif data.get("type") == "video_start":
+                    spi.reset()
+                    spi_active = True
+                    continue
+                elif data.get("type") in ("video_end", "spi_request"):
+                    final = data.get("type") == "video_end"
+                    spi_active = spi_active and not final
+                    await websocket.send_json(spi_message(spi, final))
+                    continue
+                elif data.get("type") == "flow_request":
+                    await websocket.send_json({"type": "flow", **flow.stats(queued_jobs())})
+                    continue
+                elif data.get("type") == "close":
+                    break
+                else:
+                    continue
             
-            elif data.get("type") == "close":
-                break
+            session, calibrated = current_session()
+            if not calibrated and not check:
+                # Not calibrated, return center
+                await reply({
+                    "type": "gaze",
+                    "x": 0.5,
+                    "y": 0.5,
+                    "calibrated": False
+                }, echo)
+                continue
+            
+            started = time.perf_counter()
+            try:
+                result = await executor.run(frame_fn, frame_arg, session, None, calibrated)
+            except InferenceBusyError as e:
+                # Drop this frame; the client can send the next one
+                flow.frame_rejected()
+                await reply({"type": "busy", "detail": str(e)}, echo)
+                continue
+            except FrameDecodeError as e:
+                await reply({"type": "error", "detail": str(e)}, echo)
+                continue
+            flow.frame_done((time.perf_counter() - started) * 1000.0)
+            await send_result(result, echo, check, calibrated)
     
     except WebSocketDisconnect:
         pass
     except Exception as e:
         print(f"WebSocket error: {e}")
         await websocket.close()
+    finally:
+        reader.cancel()
 
 
-@router.post("/analyze", response_model=GazeAnalysisResponse)
-async def analyze_gaze(request: GazeAnalysisRequest):
+def build_gaze_analysis(social_frames: int, geometric_frames: int) -> GazeAnalysisResponse:
     """
-    Analyze gaze tracking data and calculate Social Preference Index (SPI).
+    SPI, risk category and wording for region counts.
     SPI = (Social_Frames - Geometric_Frames) / Total_Valid_Frames
     
     Interpretation:
@@ -228,19 +881,7 @@ async def analyze_gaze(request: GazeAnalysisRequest):
     - 0.0 <= SPI < 0.2: Moderate Risk (Mixed preference)
     - SPI < 0.0: High Risk (Preference for geometric stimuli)
     """
-    if not request.gaze_data:
-        raise HTTPException(status_code=400, detail="No gaze data provided")
-    
-    if request.video_duration <= 0:
-        raise HTTPException(status_code=400, detail="Invalid video duration")
-    
-    # Count frames in each region
-    social_frames = sum(1 for point in request.gaze_data if point.social_region)
-    geometric_frames = sum(1 for point in request.gaze_data if not point.social_region)
-    total_valid_frames = len(request.gaze_data)
-    
-    if total_valid_frames == 0:
-        raise HTTPException(status_code=400, detail="No valid gaze data points")
+    total_valid_frames = social_frames + geometric_frames
     
     # Calculate SPI
     spi = (social_frames - geometric_frames) / total_valid_frames
@@ -270,11 +911,153 @@ async def analyze_gaze(request: GazeAnalysisRequest):
     )
 
 
+@router.post("/analyze", response_model=GazeAnalysisResponse)
+async def analyze_gaze(request: GazeAnalysisRequest):
+    """
+    Analyze gaze tracking data and calculate Social Preference Index (SPI).
+    See build_gaze_analysis for the formula and risk thresholds.
+    """
+    if not request.gaze_data:
+        raise HTTPException(status_code=400, detail="No gaze data provided")
+    
+    if request.video_duration <= 0:
+        raise HTTPException(status_code=400, detail="Invalid video duration")
+    
+    # Count frames in each region
+    social_frames = sum(1 for point in request.gaze_data if point.social_region)
+    geometric_frames = sum(1 for point in request.gaze_data if not point.social_region)
+    total_valid_frames = len(request.gaze_data)
+    
+    if total_valid_frames == 0:
+        raise HTTPException(status_code=400, detail="No valid gaze data points")
+    
+    return build_gaze_analysis(social_frames, geometric_frames)
+
+
+@router.post("/analyze/compact", response_model=GazeAnalysisResponse)
+async def analyze_gaze_compact(request: Request):
+    """
+    Same analysis as /analyze for a compact columnar payload
+    (see app.services.gaze_payload): a binary body (application/octet-stream)
+    or its JSON/base64 form (application/json). The social_region bitset is
+    counted vectorized; no per-point objects are built.
+    """
+    body = await request.body()
+    try:
+        if request.headers.get("content-type", "").startswith("application/json"):
+            data = decode_compact_gaze_json(json.loads(body))
+        else:
+            data = decode_compact_gaze(body)
+    except (CompactPayloadError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if data.count == 0:
+        raise HTTPException(status_code=400, detail="No gaze data provided")
+    
+    if data.video_duration <= 0:
+        raise HTTPException(status_code=400, detail="Invalid video duration")
+    
+    return build_gaze_analysis(data.social_frames, data.geometric_frames)
+
+
 @router.get("/status")
-async def get_gaze_status():
-    """Get calibration status of gaze tracking system"""
+async def get_gaze_status(session_id: Optional[str] = None):
+    """Get calibration status of gaze tracking system (or of one calibration session)"""
     gaze_service = get_gaze_service()
-    return {
-        "calibrated": gaze_service.get_calibration_status(),
-        "model_path": gaze_service.model_path
+    session_store = get_gaze_session_store()
+    session = session_store.get(session_id) if session_id else None
+    if session_id:
+        calibrated = session is not None
+    else:
+        calibrated = gaze_service.get_calibration_status()
+    status = {
+        "calibrated": calibrated,
+        "model_path": gaze_service.model_path,
+        "sessions": session_store.stats()
     }
+    if session is not None and session.frame_flow is not None:
+        # Effective FPS, frame time and drops of the session's latest /ws stream
+        status["stream"] = session.frame_flow.stats()
+    if session is not None and session.roi_tracker is not None:
+        # Face-tracking crop counters (GAZE_ROI)
+        status["roi"] = session.roi_tracker.stats()
+    return status
+
+
+@router.delete("/sessions/{session_id}")
+async def delete_gaze_session(session_id: str):
+    """Discard a calibration session once the child's screening is finished"""
+    if not get_gaze_session_store().remove(session_id):
+        raise HTTPException(status_code=404, detail="Unknown or expired gaze session")
+    return {"status": "deleted", "session_id": session_id}
+
+
+@router.post("/analyze/recording", response_model=RecordingAnalysisResponse)
+async def analyze_gaze_recording(request: Request, session_id: Optional[str] = None,
+                                 sample_fps: float = GAZE_RECORDING_SAMPLE_FPS):
+    """
+    Gaze trace and SPI for a recording made on the client and uploaded once,
+    instead of live per-frame requests. The request body is the recording
+    itself: a video OpenCV can decode, or a tar of frame images (see
+    app.services.gaze_recording). session_id (query) is the calibration to
+    use (default: the shared model). The body is streamed to a temporary
+    file, checked against GAZE_RECORDING_MAX_MB as it arrives, and deleted
+    after the analysis. The SPI is computed as in /analyze.
+    """
+    gaze_service = get_gaze_service()
+    session = get_gaze_session_store().get(session_id) if session_id else None
+    if session_id and session is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired gaze session; please recalibrate")
+    if session is None and not gaze_service.get_calibration_status():
+        raise HTTPException(status_code=400, detail="Gaze tracking is not calibrated")
+    
+    max_bytes = int(GAZE_RECORDING_MAX_MB * 1024 * 1024)
+    too_large = f"Recording is larger than {GAZE_RECORDING_MAX_MB:g} MB"
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        raise HTTPException(status_code=413, detail=too_large)
+    
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    fd, path = tempfile.mkstemp(prefix="gaze-recording-", suffix=mimetypes.guess_extension(content_type) or "")
+    try:
+        # Stream the body to disk: OpenCV needs a file path and the clip never sits in memory.
+        # The limit is enforced while reading, so a missing or wrong Content-Length cannot bypass it.
+        size = 0
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in request.stream():
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail=too_large)
+                f.write(chunk)
+        if size == 0:
+            raise HTTPException(status_code=400, detail="Empty recording")
+        
+        result = await get_inference_executor().run(
+            lambda: analyze_recording(gaze_service, iter_recording_frames(path, sample_fps), session)
+        )
+    except HTTPException:
+        raise
+    except RecordingError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except InferenceBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error analyzing recording: {str(e)}")
+    finally:
+        os.remove(path)
+    
+    spi = result["spi"]
+    if spi.total_valid_frames == 0:
+        raise HTTPException(
+            status_code=400,
+            detail=f"No valid gaze data points in {result['frames']['analyzed']} analyzed frames"
+        )
+    
+    analysis = build_gaze_analysis(spi.social_frames, spi.geometric_frames)
+    return RecordingAnalysisResponse(
+        **analysis.model_dump(),
+        gaze_data=result["gaze_data"],
+        video_duration=result["duration_ms"] / 1000.0,
+        frames=result["frames"],
+        timings=result["timings"]
+    )
@@ -0,0 +1,189 @@
+"""
+Dynamic micro-batching for model inference.
+Concurrent requests are collected for a few milliseconds and run through
+the model as a single batch; each caller gets its own result back.
+"""
+import asyncio
+import time
+from collections import Counter
+from typing import Any, Callable, List, Optional, Tuple
+from app.services.executor import InferenceBusyError, InferenceExecutor
+
+
+class MicroBatcher:
+    """
+    Collects concurrently submitted items into batches.
+
+    A single background task pulls the first pending item, then keeps
+    collecting until either `max_batch_size` items are gathered or
+    `max_wait_ms` has elapsed, and runs `predict_batch_fn` once on the batch.
+    `predict_batch_fn` must return one result per input item, in order.
+
+    When `max_queue_size` items are already waiting, `submit` raises
+    InferenceBusyError instead of growing the queue further.
+    """
+    def __init__(
+        self,
+        predict_batch_fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 8,
+        max_wait_ms: float = 5.0,
+        name: str = "batcher",
+        executor: Optional[InferenceExecutor] = None,
+        max_queue_size: int = 64
+    ):
+        self.predict_batch_fn = predict_batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_ms = max(0.0, float(max_wait_ms))
+        self.name = name
+        self.executor = executor
+        self.max_queue_size = max(1, int(max_queue_size))
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        # Metrics
+        self._batch_sizes: Counter = Counter()
+        self._queue_depths: Counter = Counter()
+        self._max_queue_depth = 0
+        self._total_items = 0
+        self._total_batches = 0
+        self._total_errors = 0
+        self._total_rejected = 0
+        self._total_wait_ms = 0.0
+        self._total_run_ms = 0.0
+
+    def _ensure_worker(self):
+        """Start the background worker on the current event loop if needed"""
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def submit(self, item: Any) -> Any:
+        """Queue a single item and wait for its result"""
+        self._ensure_worker()
+        if self._queue.qsize() >= self.max_queue_size:
+            self._total_rejected += 1
+            raise InferenceBusyError(
+                f"{self.name}: {self._queue.qsize()} requests already waiting. Please retry shortly."
+            )
+        future = self._loop.create_future()
+        await self._queue.put((item, future, time.perf_counter()))
+        depth = self._queue.qsize()
+        if depth > self._max_queue_depth:
+            self._max_queue_depth = depth
+        return await future
+
+    async def _collect(self) -> List[Tuple[Any, asyncio.Future, float]]:
+        """Wait for the first item, then fill the batch until full or timed out"""
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000.0
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+
+        # Drain anything already queued without waiting further
+        while len(batch) < self.max_batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        """Background loop: collect a batch, run it, fan results back out"""
+        while True:
+            batch = await self._collect()
+            self._queue_depths[_bucket(self._queue.qsize())] += 1
+
+            # Skip requests whose callers already went away
+            batch = [entry for entry in batch if not entry[1].cancelled()]
+            if not batch:
+                continue
+
+            items = [entry[0] for entry in batch]
+            started = time.perf_counter()
+            for _, _, enqueued in batch:
+                self._total_wait_ms += (started - enqueued) * 1000.0
+
+            try:
+                results = await self._execute(items)
+                if len(results) != len(items):
+                    raise RuntimeError(
+                        f"{self.name}: expected {len(items)} results, got {len(results)}"
+                    )
+            except Exception as e:
+                self._total_errors += 1
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            finally:
+                self._total_run_ms += (time.perf_counter() - started) * 1000.0
+                self._batch_sizes[len(items)] += 1
+                self._total_batches += 1
+                self._total_items += len(items)
+
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    async def _execute(self, items: List[Any]) -> List[Any]:
+        """Run the batch function off the event loop"""
+        if self.executor is not None:
+            return await self.executor.run(self.predict_batch_fn, items)
+        return await self._loop.run_in_executor(None, self.predict_batch_fn, items)
+
+    async def stop(self):
+        """Cancel the background worker"""
+        if self._worker is not None and not self._worker.done():
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+
+    def stats(self) -> dict:
+        """Queue depth and batch-size histograms for tuning"""
+        batches = self._total_batches
+        return {
+            "name": self.name,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue_depth": self._max_queue_depth,
+            "total_items": self._total_items,
+            "total_batches": batches,
+            "total_errors": self._total_errors,
+            "total_rejected": self._total_rejected,
+            "max_queue_size": self.max_queue_size,
+            "mean_batch_size": (self._total_items / batches) if batches else 0.0,
+            "mean_queue_wait_ms": (self._total_wait_ms / self._total_items) if self._total_items else 0.0,
+            "mean_batch_run_ms": (self._total_run_ms / batches) if batches else 0.0,
+            "batch_size_histogram": {str(k): v for k, v in sorted(self._batch_sizes.items())},
+            "queue_depth_histogram": {k: self._queue_depths[k] for k in _BUCKET_LABELS if self._queue_depths[k]},
+        }
+
+
+_BUCKET_LABELS = ["0", "1", "2-3", "4-7", "8-15", "16-31", "32+"]
+
+
+def _bucket(depth: int) -> str:
+    """Map a queue depth to a power-of-two histogram bucket"""
+    if depth <= 1:
+        return str(depth)
+    if depth < 4:
+        return "2-3"
+    if depth < 8:
+        return "4-7"
+    if depth < 16:
+        return "8-15"
+    if depth < 32:
+        return "16-31"
+    return "32+"
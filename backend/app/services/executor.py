@@ -0,0 +1,107 @@
+"""
+Bounded executor for CPU-heavy inference work.
+Keeps ViT, OpenCV and MediaPipe calls off the asyncio event loop and
+sheds load once too much work is pending.
+"""
+import asyncio
+import functools
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+# Executor configuration
+# INFERENCE_THREADS: worker threads for model/OpenCV calls
+# INFERENCE_MAX_PENDING: running + queued jobs allowed before new work is rejected
+# INFERENCE_PROCESS_WORKERS: optional process pool for stateless CPU-bound helpers (0 = disabled)
+INFERENCE_THREADS = int(os.getenv("INFERENCE_THREADS", str(min(4, os.cpu_count() or 1))))
+INFERENCE_MAX_PENDING = int(os.getenv("INFERENCE_MAX_PENDING", "32"))
+INFERENCE_PROCESS_WORKERS = int(os.getenv("INFERENCE_PROCESS_WORKERS", "0"))
+
+
+class InferenceBusyError(Exception):
+    """Raised when the inference executor is saturated and cannot accept more work"""
+    pass
+
+
+class InferenceExecutor:
+    """
+    Thread pool (plus optional process pool) with admission control.
+
+    Every call to `run` counts as one pending job until it finishes; once
+    `max_pending` jobs are in flight, further calls fail fast with
+    InferenceBusyError so the routers can answer 503 instead of queueing
+    unboundedly behind a slow upload.
+    """
+    def __init__(self, max_workers: int = 4, max_pending: int = 32, process_workers: int = 0):
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(1, max_pending)
+        self.process_workers = max(0, process_workers)
+        self._threads = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+
+    def _process_pool(self) -> Optional[ProcessPoolExecutor]:
+        if self.process_workers and self._processes is None:
+            self._processes = ProcessPoolExecutor(max_workers=self.process_workers)
+        return self._processes
+
+    async def run(self, fn: Callable, *args, cpu_bound: bool = False, **kwargs) -> Any:
+        """
+        Run fn(*args, **kwargs) in the pool and await its result.
+
+        cpu_bound=True routes the call to the process pool when one is
+        configured; fn and its arguments must then be picklable and must not
+        rely on process-local state such as loaded models.
+        """
+        if self._pending >= self.max_pending:
+            self._rejected += 1
+            raise InferenceBusyError(
+                f"Inference queue is full ({self._pending} pending). Please retry shortly."
+            )
+
+        pool = self._process_pool() if cpu_bound else None
+        if pool is None:
+            pool = self._threads
+
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(pool, functools.partial(fn, *args, **kwargs))
+        finally:
+            self._pending -= 1
+            self._completed += 1
+
+    def stats(self) -> dict:
+        """Current load of the executor"""
+        return {
+            "threads": self.max_workers,
+            "process_workers": self.process_workers,
+            "max_pending": self.max_pending,
+            "pending": self._pending,
+            "completed": self._completed,
+            "rejected": self._rejected,
+        }
+
+    def shutdown(self):
+        """Stop the worker pools"""
+        self._threads.shutdown(wait=False, cancel_futures=True)
+        if self._processes is not None:
+            self._processes.shutdown(wait=False, cancel_futures=True)
+            self._processes = None
+
+
+# Global instance
+_executor: Optional[InferenceExecutor] = None
+
+def get_inference_executor() -> InferenceExecutor:
+    """Get or create the global inference executor"""
+    global _executor
+    if _executor is None:
+        _executor = InferenceExecutor(
+            max_workers=INFERENCE_THREADS,
+            max_pending=INFERENCE_MAX_PENDING,
+            process_workers=INFERENCE_PROCESS_WORKERS
+        )
+    return _executor
@@ -0,0 +1,216 @@
+"""
+Face detection backends for image quality checks.
+Detectors are created once per process and reused across requests;
+detection runs on a downscaled copy and boxes are mapped back to the
+original image coordinates.
+"""
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Face detector configuration
+# FACE_DETECTOR_BACKEND: haar (default), mediapipe or dnn
+# FACE_DETECTION_MAX_SIDE: longest side of the image the detector actually sees (0 = full resolution)
+# FACE_DNN_PROTOTXT / FACE_DNN_MODEL: Caffe SSD files for the dnn backend
+#   (e.g. deploy.prototxt + res10_300x300_ssd_iter_140000.caffemodel)
+FACE_DETECTOR_BACKEND = os.getenv("FACE_DETECTOR_BACKEND", "haar").lower()
+FACE_DETECTION_MAX_SIDE = int(os.getenv("FACE_DETECTION_MAX_SIDE", "640"))
+FACE_DNN_PROTOTXT = os.getenv("FACE_DNN_PROTOTXT", "")
+FACE_DNN_MODEL = os.getenv("FACE_DNN_MODEL", "")
+
+# (x, y, width, height) in pixels
+Box = Tuple[int, int, int, int]
+
+
+def downscale(image: np.ndarray, max_side: int) -> Tuple[np.ndarray, float]:
+    """
+    Shrink an image so its longest side is at most max_side.
+    Returns (image, scale) where scale maps downscaled coordinates back to the original.
+    """
+    height, width = image.shape[:2]
+    longest = max(height, width)
+    if max_side <= 0 or longest <= max_side:
+        return image, 1.0
+    factor = max_side / float(longest)
+    small = cv2.resize(
+        image,
+        (max(1, int(round(width * factor))), max(1, int(round(height * factor)))),
+        interpolation=cv2.INTER_AREA
+    )
+    return small, longest / float(max_side)
+
+
+class FaceDetector(ABC):
+    """
+    Base class for face detectors.
+
+    `detect` accepts an RGB (H, W, 3) or grayscale (H, W) uint8 array and
+    returns face boxes in the coordinates of that array. Subclasses implement
+    `_detect` on the downscaled image; per-thread state lives in
+    `self._local` because the OpenCV/MediaPipe objects are not thread-safe.
+    `needs_color` tells callers whether passing grayscale loses accuracy.
+    """
+    name = "base"
+    needs_color = False
+
+    def __init__(self, max_side: int = FACE_DETECTION_MAX_SIDE):
+        self.max_side = max_side
+        self._local = threading.local()
+
+    def detect(self, image: np.ndarray) -> List[Box]:
+        small, scale = downscale(image, self.max_side)
+        boxes = self._detect(small)
+        if scale == 1.0:
+            return [tuple(int(v) for v in box) for box in boxes]
+        return [tuple(int(round(v * scale)) for v in box) for box in boxes]
+
+    @abstractmethod
+    def _detect(self, image: np.ndarray) -> List[Box]:
+        """Face boxes in the coordinates of the (downscaled) image"""
+
+
+class HaarFaceDetector(FaceDetector):
+    """OpenCV Haar cascade (frontal face). The cascade XML is parsed once per worker thread."""
+    name = "haar"
+    cascade_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+
+    def __init__(self, max_side: int = FACE_DETECTION_MAX_SIDE):
+        super().__init__(max_side)
+        if cv2.CascadeClassifier(self.cascade_path).empty():
+            raise RuntimeError(f"Could not load Haar cascade from {self.cascade_path}")
+
+    def _cascade(self):
+        cascade = getattr(self._local, "cascade", None)
+        if cascade is None:
+            cascade = cv2.CascadeClassifier(self.cascade_path)
+            self._local.cascade = cascade
+        return cascade
+
+    def _detect(self, image: np.ndarray) -> List[Box]:
+        gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+        faces = self._cascade().detectMultiScale(gray, 1.1, 4)
+        return [tuple(face) for face in faces]
+
+
+class MediaPipeFaceDetector(FaceDetector):
+    """MediaPipe BlazeFace short/full-range detector"""
+    name = "mediapipe"
+    needs_color = True
+
+    def __init__(self, max_side: int = FACE_DETECTION_MAX_SIDE, min_confidence: float = 0.5):
+        super().__init__(max_side)
+        import mediapipe as mp
+        self._solution = mp.solutions.face_detection
+        self.min_confidence = min_confidence
+
+    def _detector(self):
+        detector = getattr(self._local, "detector", None)
+        if detector is None:
+            # model_selection=1 is the full-range model (faces up to ~5m away)
+            detector = self._solution.FaceDetection(
+                model_selection=1,
+                min_detection_confidence=self.min_confidence
+            )
+            self._local.detector = detector
+        return detector
+
+    def _detect(self, image: np.ndarray) -> List[Box]:
+        rgb = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB) if image.ndim == 2 else image
+        height, width = rgb.shape[:2]
+        results = self._detector().process(rgb)
+        boxes = []
+        for detection in results.detections or []:
+            bbox = detection.location_data.relative_bounding_box
+            x = max(0, int(bbox.xmin * width))
+            y = max(0, int(bbox.ymin * height))
+            w = min(width - x, int(bbox.width * width))
+            h = min(height - y, int(bbox.height * height))
+            if w > 0 and h > 0:
+                boxes.append((x, y, w, h))
+        return boxes
+
+
+class DnnFaceDetector(FaceDetector):
+    """OpenCV DNN ResNet-10 SSD face detector (Caffe model files supplied via config)"""
+    name = "dnn"
+    needs_color = True
+    input_size = (300, 300)
+    mean = (104.0, 177.0, 123.0)
+
+    def __init__(
+        self,
+        max_side: int = FACE_DETECTION_MAX_SIDE,
+        prototxt: str = FACE_DNN_PROTOTXT,
+        model: str = FACE_DNN_MODEL,
+        min_confidence: float = 0.5
+    ):
+        super().__init__(max_side)
+        if not prototxt or not model or not os.path.exists(prototxt) or not os.path.exists(model):
+            raise RuntimeError("dnn face detector requires FACE_DNN_PROTOTXT and FACE_DNN_MODEL files")
+        self.prototxt = prototxt
+        self.model = model
+        self.min_confidence = min_confidence
+
+    def _net(self):
+        net = getattr(self._local, "net", None)
+        if net is None:
+            net = cv2.dnn.readNetFromCaffe(self.prototxt, self.model)
+            self._local.net = net
+        return net
+
+    def _detect(self, image: np.ndarray) -> List[Box]:
+        rgb = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB) if image.ndim == 2 else image
+        height, width = rgb.shape[:2]
+        # swapRB: the network expects BGR input
+        blob = cv2.dnn.blobFromImage(rgb, 1.0, self.input_size, self.mean, swapRB=True)
+        net = self._net()
+        net.setInput(blob)
+        detections = net.forward()[0, 0]
+        boxes = []
+        for detection in detections:
+            if detection[2] < self.min_confidence:
+                continue
+            x1 = int(max(0.0, detection[3]) * width)
+            y1 = int(max(0.0, detection[4]) * height)
+            x2 = int(min(1.0, detection[5]) * width)
+            y2 = int(min(1.0, detection[6]) * height)
+            if x2 > x1 and y2 > y1:
+                boxes.append((x1, y1, x2 - x1, y2 - y1))
+        return boxes
+
+
+FACE_DETECTORS = {
+    HaarFaceDetector.name: HaarFaceDetector,
+    MediaPipeFaceDetector.name: MediaPipeFaceDetector,
+    DnnFaceDetector.name: DnnFaceDetector,
+}
+
+
+def create_face_detector(backend: str, max_side: int = FACE_DETECTION_MAX_SIDE) -> FaceDetector:
+    """Instantiate a face detector backend by name"""
+    if backend not in FACE_DETECTORS:
+        raise ValueError(f"Unknown face detector backend '{backend}'. Choose from: {', '.join(FACE_DETECTORS)}")
+    return FACE_DETECTORS[backend](max_side=max_side)
+
+
+# Global instance
+_face_detector: Optional[FaceDetector] = None
+_face_detector_lock = threading.Lock()
+
+def get_face_detector() -> FaceDetector:
+    """Get or create the process-wide face detector selected by FACE_DETECTOR_BACKEND"""
+    global _face_detector
+    if _face_detector is None:
+        with _face_detector_lock:
+            if _face_detector is None:
+                try:
+                    _face_detector = create_face_detector(FACE_DETECTOR_BACKEND)
+                except Exception as e:
+                    print(f"Warning: Could not create '{FACE_DETECTOR_BACKEND}' face detector: {e}. Falling back to haar.")
+                    _face_detector = HaarFaceDetector()
+                print(f"✓ Face detector ready: {_face_detector.name} (max side {_face_detector.max_side}px)")
+    return _face_detector
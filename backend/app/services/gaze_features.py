@@ -0,0 +1,276 @@
+"""
+Parallel EyeTrax feature extraction for gaze calibration.
+
+MediaPipe FaceMesh instances are not thread-safe, so every worker thread
+gets its own GazeEstimators, kept for the life of the pool. FaceMesh
+tracking and the blink (EAR) history are per-stream state: each worker
+keeps one estimator per recent stream (calibration, /ws connection or
+recording) and resets that state before an estimator moves to another
+stream, instead of building a new FaceMesh graph. Frames are split into contiguous chunks, one per worker, so each estimator still
+sees consecutive frames, and results are returned in input order so they
+stay aligned with the targets. Small batches (the flushes of a streamed
+calibration) can be kept on one worker, where splitting them would cost
+more in handoffs than it saves.
+
+CalibrationAccumulator keeps only the extracted feature vectors of a
+streaming calibration (/api/gaze/calibrate/ws), point by point.
+
+FrameFeatureCache remembers the last few extractions of a session by frame
+sequence number, so a /check and a /predict for the same frame share one
+MediaPipe pass.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Worker threads used to extract calibration features (1 = serial)
+GAZE_EXTRACT_WORKERS = int(os.getenv("GAZE_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Streams whose estimator state each worker keeps at once (least recently used is reset and reused)
+GAZE_EXTRACT_STREAMS = int(os.getenv("GAZE_EXTRACT_STREAMS", "4"))
+
+# Per-session frame feature cache
+# GAZE_FEATURE_CACHE_SIZE: extractions remembered per session (0 disables the cache)
+# GAZE_FEATURE_CACHE_TTL_SECONDS: how long an extraction can be reused
+GAZE_FEATURE_CACHE_SIZE = int(os.getenv("GAZE_FEATURE_CACHE_SIZE", "8"))
+GAZE_FEATURE_CACHE_TTL_SECONDS = float(os.getenv("GAZE_FEATURE_CACHE_TTL_SECONDS", "2"))
+
+# (features or None, blink_detected), or None when the frame could not be decoded
+ExtractionResult = Optional[Tuple[Optional[np.ndarray], bool]]
+
+
+def reset_estimator_state(estimator) -> bool:
+    """
+    Clear the per-stream state of an EyeTrax GazeEstimator: MediaPipe
+    FaceMesh tracking (SolutionBase.reset restarts the graph without
+    rebuilding it) and the EAR blink history. Returns False if the
+    estimator does not expose them, in which case it must be replaced.
+    """
+    reset = getattr(getattr(estimator, "face_mesh", None), "reset", None)
+    if reset is None:
+        return False
+    reset()
+    for name in ("_ear_history", "ear_history"):
+        history = getattr(estimator, name, None)
+        if hasattr(history, "clear"):
+            history.clear()
+    return True
+
+
+def close_estimator(estimator):
+    """Release the MediaPipe graph of an estimator that is no longer used"""
+    close = getattr(getattr(estimator, "face_mesh", None), "close", None)
+    if close is not None:
+        try:
+            close()
+        except Exception as e:
+            print(f"Warning: Could not close gaze estimator: {e}")
+
+
+class FeatureExtractorPool:
+    """
+    Thread pool whose workers each own an EyeTrax estimator.
+
+    extract(items, decode) decodes every item with `decode` and runs
+    extract_features on it; it returns one ExtractionResult per item, in
+    order, plus per-stage timings (decode/extract are summed over workers,
+    wall_ms is elapsed time). Calls passing the same `stream` key (e.g. the
+    points of one streamed calibration, the chunks of one recording) keep
+    their estimator state; a call without a key starts from reset state.
+    `context` names the frames in error messages; `single_worker` runs the
+    whole call as one chunk.
+    """
+    def __init__(self, estimator_factory: Callable[[], Any], workers: int = GAZE_EXTRACT_WORKERS,
+                 streams: int = GAZE_EXTRACT_STREAMS):
+        self.estimator_factory = estimator_factory
+        self.workers = max(1, workers)
+        self.streams = max(1, streams)
+        self._threads = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="gaze-extract")
+        self._local = threading.local()
+
+        # Metrics
+        self.created = 0
+        self.resets = 0
+
+    def _fresh(self, estimator=None):
+        # Worker thread: an estimator without per-stream state, reusing `estimator` when it can be reset
+        if estimator is not None:
+            if reset_estimator_state(estimator):
+                self.resets += 1
+                return estimator
+            close_estimator(estimator)
+        self.created += 1
+        return self.estimator_factory()
+
+    def _estimator(self, stream: Optional[object]):
+        if stream is None:
+            # One-shot call: the worker's scratch estimator, reset every time
+            scratch = getattr(self._local, "scratch", None)
+            self._local.scratch = self._fresh(scratch)
+            return self._local.scratch
+        estimators = getattr(self._local, "estimators", None)
+        if estimators is None:
+            estimators = self._local.estimators = OrderedDict()
+        estimator = estimators.get(stream)
+        if estimator is not None:
+            estimators.move_to_end(stream)
+            return estimator
+        # A new stream: no FaceMesh tracking or blink history from another child's frames
+        evicted = estimators.popitem(last=False)[1] if len(estimators) >= self.streams else None
+        estimator = estimators[stream] = self._fresh(evicted)
+        return estimator
+
+    def _extract_chunk(self, items: Sequence, decode: Callable[[Any], Optional[np.ndarray]], context: str,
+                       stream: Optional[object]):
+        estimator = self._estimator(stream)
+        results: List[ExtractionResult] = []
+        decode_ms = extract_ms = 0.0
+        for item in items:
+            started = time.perf_counter()
+            try:
+                frame = decode(item)
+            except Exception as e:
+                print(f"Error decoding {context}: {e}")
+                frame = None
+            decoded = time.perf_counter()
+            decode_ms += (decoded - started) * 1000.0
+            if frame is None or frame.size == 0:
+                results.append(None)
+                continue
+            try:
+                features, blink = estimator.extract_features(frame)
+                results.append((features, bool(blink)))
+            except Exception as e:
+                print(f"Error extracting features from {context}: {e}")
+                results.append(None)
+            extract_ms += (time.perf_counter() - decoded) * 1000.0
+        return results, decode_ms, extract_ms
+
+    def extract(self, items: Sequence, decode: Callable[[Any], Optional[np.ndarray]],
+                context: str = "calibration frame", stream: Optional[object] = None,
+                single_worker: bool = False) -> Tuple[List[ExtractionResult], Dict[str, float]]:
+        started = time.perf_counter()
+        workers = 1 if single_worker else self.workers
+        chunk_size = max(1, -(-len(items) // workers))  # ceil division
+        chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+        futures = [self._threads.submit(self._extract_chunk, chunk, decode, context, stream) for chunk in chunks]
+
+        results: List[ExtractionResult] = []
+        timings = {"frames": len(items), "workers": len(chunks), "decode_ms": 0.0, "extract_ms": 0.0}
+        for future in futures:
+            chunk_results, decode_ms, extract_ms = future.result()
+            results.extend(chunk_results)
+            timings["decode_ms"] += decode_ms
+            timings["extract_ms"] += extract_ms
+        timings["wall_ms"] = (time.perf_counter() - started) * 1000.0
+        return results, timings
+
+    def shutdown(self):
+        """Stop the worker threads"""
+        self._threads.shutdown(wait=False, cancel_futures=True)
+
+
+class FrameFeatureCache:
+    """Short-lived (features, blink_detected) per frame sequence number, oldest evicted first"""
+    def __init__(self, max_entries: int = GAZE_FEATURE_CACHE_SIZE, ttl_seconds: float = GAZE_FEATURE_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[int, Tuple[float, Tuple[Optional[np.ndarray], bool]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, seq: int) -> Optional[Tuple[Optional[np.ndarray], bool]]:
+        with self._lock:
+            entry = self._entries.get(seq)
+            if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[1]
+
+    def put(self, seq: int, result: Tuple[Optional[np.ndarray], bool]):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[seq] = (time.monotonic(), result)
+            self._entries.move_to_end(seq)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class CalibrationAccumulator:
+    """
+    Feature vectors kept per calibration point while frames stream in.
+    Only the compact EyeTrax features are retained; frames are dropped as
+    soon as they have been extracted. A point can be restarted (e.g. after
+    a blink) which discards its samples.
+    """
+    def __init__(self, screen_width: int = 1920, screen_height: int = 1080, points: int = 9):
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+        self.points = max(1, points)
+        self._targets: Dict[int, Tuple[float, float]] = {}
+        self._features: Dict[int, List[np.ndarray]] = {}
+        self._completed: set = set()
+        self.face_not_detected = 0
+        self.blink_detected = 0
+        self.invalid = 0
+        self.timings: Dict[str, float] = {"frames": 0, "decode_ms": 0.0, "extract_ms": 0.0, "wall_ms": 0.0}
+
+    def set_point(self, point_index: int, target_x: float, target_y: float):
+        """Target of a point in normalized (0-1) coordinates, stored in screen pixels like EyeTrax"""
+        self._targets[point_index] = (target_x * self.screen_width, target_y * self.screen_height)
+        self._features.setdefault(point_index, [])
+
+    def add(self, point_index: int, results: List[ExtractionResult], timings: Dict[str, float]) -> int:
+        """Keep the usable features of one extracted batch. Returns how many were kept."""
+        if point_index not in self._targets:
+            raise KeyError(f"Calibration point {point_index} has no target")
+        for key in ("frames", "decode_ms", "extract_ms", "wall_ms"):
+            self.timings[key] += timings.get(key, 0)
+        kept = 0
+        for result in results:
+            if result is None:
+                self.invalid += 1
+                continue
+            features, blink = result
+            if features is None:
+                self.face_not_detected += 1
+            elif blink:
+                self.blink_detected += 1
+            else:
+                self._features[point_index].append(features)
+                kept += 1
+        return kept
+
+    def restart_point(self, point_index: int):
+        """Discard the samples collected for a point"""
+        if point_index in self._features:
+            self._features[point_index] = []
+        self._completed.discard(point_index)
+
+    def complete_point(self, point_index: int) -> bool:
+        """Mark a point finished. Returns True once every point is complete."""
+        self._completed.add(point_index)
+        return len(self._completed) >= self.points
+
+    def point_samples(self, point_index: int) -> int:
+        return len(self._features.get(point_index, []))
+
+    @property
+    def total_samples(self) -> int:
+        return sum(len(features) for features in self._features.values())
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(X, y) for training, with y the targets in screen pixels"""
+        X, y = [], []
+        for point_index in sorted(self._features):
+            target = self._targets[point_index]
+            X.extend(self._features[point_index])
+            y.extend([target] * len(self._features[point_index]))
+        return np.array(X), np.array(y)
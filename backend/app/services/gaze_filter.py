@@ -0,0 +1,218 @@
+"""
+Online smoothing and fixation detection for a stream of gaze predictions.
+
+GazeFilter runs a One Euro filter (Casiez et al., 2012) on x and y, which
+removes jitter while the gaze is still and follows quickly when it moves,
+and an online dispersion-threshold (I-DT) fixation detector on the
+smoothed points. Coordinates are normalized screen coordinates (0-1) and
+timestamps are in seconds. One filter belongs to one gaze session.
+
+Client timestamps drive the filter while they increase. A missing
+timestamp, or one that does not advance (e.g. binary frames whose header
+timestamp was left at 0), is replaced by the server's clock for that
+step, so the filter never sees dt <= 0 and freezes.
+"""
+import math
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Filter defaults (overridable per session)
+# GAZE_FILTER_MIN_CUTOFF: cutoff frequency (Hz) while the gaze is still; lower = smoother
+# GAZE_FILTER_BETA: how quickly the cutoff rises with gaze speed; higher = less lag on saccades
+# GAZE_FIXATION_DISPERSION: max (x range + y range) of a fixation, in normalized units
+# GAZE_FIXATION_MIN_MS: minimum fixation duration
+GAZE_FILTER_MIN_CUTOFF = float(os.getenv("GAZE_FILTER_MIN_CUTOFF", "1.0"))
+GAZE_FILTER_BETA = float(os.getenv("GAZE_FILTER_BETA", "2.0"))
+GAZE_FILTER_D_CUTOFF = float(os.getenv("GAZE_FILTER_D_CUTOFF", "1.0"))
+GAZE_FIXATION_DISPERSION = float(os.getenv("GAZE_FIXATION_DISPERSION", "0.1"))
+GAZE_FIXATION_MIN_MS = float(os.getenv("GAZE_FIXATION_MIN_MS", "100"))
+
+FILTER_PARAMETERS = ("min_cutoff", "beta", "d_cutoff", "fixation_dispersion", "fixation_min_ms")
+# Parameters that divide by their value (cutoff frequencies) must be > 0; the others >= 0
+_POSITIVE_PARAMETERS = ("min_cutoff", "d_cutoff")
+
+
+class FilterOptionError(ValueError):
+    """Raised when a client-supplied filter override is not a usable number"""
+    pass
+
+
+def _smoothing_factor(dt: float, cutoff: float) -> float:
+    tau = 1.0 / (2.0 * math.pi * cutoff)
+    return 1.0 / (1.0 + tau / dt)
+
+
+class OneEuroFilter:
+    """One Euro filter for a single scalar signal"""
+    def __init__(self, min_cutoff: float = 1.0, beta: float = 0.0, d_cutoff: float = 1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self._value: Optional[float] = None
+        self._derivative = 0.0
+        self._timestamp: Optional[float] = None
+
+    def reset(self):
+        self._value = None
+        self._derivative = 0.0
+        self._timestamp = None
+
+    def __call__(self, value: float, timestamp: float) -> float:
+        if self._timestamp is None:
+            # First sample: start from the raw value
+            self._value, self._timestamp = value, timestamp
+            return value
+        dt = timestamp - self._timestamp
+        if dt <= 0:
+            # Duplicate or out-of-order timestamp
+            return self._value
+
+        derivative = (value - self._value) / dt
+        alpha_d = _smoothing_factor(dt, self.d_cutoff)
+        self._derivative = alpha_d * derivative + (1.0 - alpha_d) * self._derivative
+
+        cutoff = self.min_cutoff + self.beta * abs(self._derivative)
+        alpha = _smoothing_factor(dt, cutoff)
+        self._value = alpha * value + (1.0 - alpha) * self._value
+        self._timestamp = timestamp
+        return self._value
+
+
+class FixationDetector:
+    """
+    Online I-DT fixation detector.
+
+    Points are added in time order; a fixation is reported once the points of
+    the last `min_duration` seconds stay within `max_dispersion`
+    ((max x - min x) + (max y - min y)), and lasts until a point breaks it.
+    """
+    def __init__(self, max_dispersion: float = 0.1, min_duration: float = 0.1):
+        self.max_dispersion = max_dispersion
+        self.min_duration = min_duration
+        self._window: List[Tuple[float, float, float]] = []
+        self.fixations = 0
+
+    def reset(self):
+        self._window = []
+
+    @staticmethod
+    def _dispersion(points) -> float:
+        xs = [p[1] for p in points]
+        ys = [p[2] for p in points]
+        return (max(xs) - min(xs)) + (max(ys) - min(ys))
+
+    def _in_fixation(self) -> bool:
+        return len(self._window) > 1 and self._window[-1][0] - self._window[0][0] >= self.min_duration
+
+    def update(self, x: float, y: float, timestamp: float) -> Optional[Dict[str, float]]:
+        """Add a point; returns the current fixation (centroid, start, duration) or None"""
+        was_fixating = self._in_fixation()
+        self._window.append((timestamp, x, y))
+        if self._dispersion(self._window) > self.max_dispersion:
+            if was_fixating:
+                # The fixation ended; the new point starts a new window
+                self._window = [self._window[-1]]
+            else:
+                # Slide: drop the oldest points until the window is compact again
+                while len(self._window) > 1 and self._dispersion(self._window) > self.max_dispersion:
+                    self._window.pop(0)
+
+        if not self._in_fixation():
+            return None
+        if not was_fixating:
+            self.fixations += 1
+        count = len(self._window)
+        return {
+            "x": sum(p[1] for p in self._window) / count,
+            "y": sum(p[2] for p in self._window) / count,
+            "start": self._window[0][0],
+            "duration_ms": (self._window[-1][0] - self._window[0][0]) * 1000.0,
+        }
+
+
+class GazeFilter:
+    """
+    Per-session smoothing + fixation state.
+    update(x, y, timestamp) returns the smoothed point and the current fixation.
+    """
+    def __init__(self, min_cutoff: float = GAZE_FILTER_MIN_CUTOFF, beta: float = GAZE_FILTER_BETA,
+                 d_cutoff: float = GAZE_FILTER_D_CUTOFF, fixation_dispersion: float = GAZE_FIXATION_DISPERSION,
+                 fixation_min_ms: float = GAZE_FIXATION_MIN_MS):
+        self.parameters = {
+            "min_cutoff": min_cutoff,
+            "beta": beta,
+            "d_cutoff": d_cutoff,
+            "fixation_dispersion": fixation_dispersion,
+            "fixation_min_ms": fixation_min_ms,
+        }
+        self._x = OneEuroFilter(min_cutoff, beta, d_cutoff)
+        self._y = OneEuroFilter(min_cutoff, beta, d_cutoff)
+        self.fixation = FixationDetector(fixation_dispersion, fixation_min_ms / 1000.0)
+        # Filter clock (seconds), and the last client timestamp and server time it advanced from
+        self._time: Optional[float] = None
+        self._client_time: Optional[float] = None
+        self._server_time = 0.0
+        # Polling clients may hit /predict concurrently for the same session
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_options(cls, options: Optional[dict]) -> "GazeFilter":
+        """
+        Build a filter from client-supplied overrides, ignoring unknown keys.
+        Raises FilterOptionError naming the first value that is not a finite
+        number, or not > 0 (cutoffs) / >= 0 (the others).
+        """
+        options = options or {}
+        if not isinstance(options, dict):
+            raise FilterOptionError("filter must be an object of parameter overrides")
+        parameters = {}
+        for key in FILTER_PARAMETERS:
+            if key not in options:
+                continue
+            try:
+                value = float(options[key])
+            except (TypeError, ValueError):
+                value = None
+            if value is None or isinstance(options[key], bool):
+                raise FilterOptionError(f"filter.{key} must be a number")
+            if not math.isfinite(value):
+                raise FilterOptionError(f"filter.{key} must be finite")
+            if key in _POSITIVE_PARAMETERS and value <= 0:
+                raise FilterOptionError(f"filter.{key} must be greater than 0")
+            if value < 0:
+                raise FilterOptionError(f"filter.{key} must not be negative")
+            parameters[key] = value
+        return cls(**parameters)
+
+    def reset(self):
+        with self._lock:
+            self._x.reset()
+            self._y.reset()
+            self.fixation.reset()
+            self._time = None
+            self._client_time = None
+
+    def _advance(self, timestamp: Optional[float]) -> float:
+        # Caller holds the lock. The client's step when its timestamp advances, the server's otherwise
+        now = time.monotonic()
+        valid = timestamp is not None and math.isfinite(timestamp)
+        if self._time is None:
+            self._time = timestamp if valid else now
+        elif valid and self._client_time is not None and timestamp > self._client_time:
+            self._time += timestamp - self._client_time
+        else:
+            self._time += max(now - self._server_time, 1e-6)
+        if valid and (self._client_time is None or timestamp > self._client_time):
+            self._client_time = timestamp
+        self._server_time = now
+        return self._time
+
+    def update(self, x: float, y: float, timestamp: Optional[float] = None) -> Dict[str, object]:
+        """Smooth a point; timestamp is the client's capture time in seconds (None = server clock)"""
+        with self._lock:
+            t = self._advance(timestamp)
+            smooth_x = min(1.0, max(0.0, self._x(x, t)))
+            smooth_y = min(1.0, max(0.0, self._y(y, t)))
+            return {"x": smooth_x, "y": smooth_y, "fixation": self.fixation.update(smooth_x, smooth_y, t)}
@@ -0,0 +1,100 @@
+"""
+Credit-based flow control for the gaze WebSocket.
+
+The server measures how long a frame takes to process (an exponential
+moving average, including the wait for an inference thread) and derives a
+credit window: the number of frames a client may have in flight. Jobs
+queued behind busy inference threads shrink the window.
+
+With stale dropping (the default) a connection processes one frame at a
+time and drops every frame that has a newer one behind it, so the window
+is at most two: the frame being processed plus the one on its way, sent
+when the previous reply arrived. A larger window would only get frames
+encoded and uploaded to be dropped. Clients that batch instead of dropping
+(drop_stale false) get as many frames as fit in
+GAZE_FLOW_TARGET_LATENCY_MS at the measured per-frame time. Effective FPS
+counts answered frames over the last GAZE_FLOW_FPS_WINDOW_SECONDS.
+"""
+import os
+import time
+from collections import deque
+from typing import Deque, Optional
+
+# Flow control configuration
+# GAZE_FLOW_TARGET_LATENCY_MS: queueing + processing budget for the newest frame of a stream
+# GAZE_FLOW_MAX_CREDITS: upper bound on frames a client may have in flight (batching streams)
+# GAZE_FLOW_FPS_WINDOW_SECONDS: window over which the effective frame rate is measured
+GAZE_FLOW_TARGET_LATENCY_MS = float(os.getenv("GAZE_FLOW_TARGET_LATENCY_MS", "250"))
+GAZE_FLOW_MAX_CREDITS = int(os.getenv("GAZE_FLOW_MAX_CREDITS", "4"))
+GAZE_FLOW_FPS_WINDOW_SECONDS = float(os.getenv("GAZE_FLOW_FPS_WINDOW_SECONDS", "2"))
+
+# Weight of the newest sample in the per-frame time average
+_FRAME_MS_SMOOTHING = 0.2
+# Window of a stream that drops stale frames: the frame being processed plus the next one in transit
+_DROP_STALE_CREDITS = 2
+
+
+class FrameFlowController:
+    """Per-stream processing time, credit window, drop and frame rate counters"""
+    def __init__(self, target_latency_ms: float = GAZE_FLOW_TARGET_LATENCY_MS,
+                 max_credits: int = GAZE_FLOW_MAX_CREDITS, fps_window_seconds: float = GAZE_FLOW_FPS_WINDOW_SECONDS):
+        self.target_latency_ms = target_latency_ms
+        self.max_credits = max(1, max_credits)
+        self.fps_window_seconds = fps_window_seconds
+        # False when the stream batches queued frames instead of dropping them
+        self.drop_stale = True
+        self.frame_ms: Optional[float] = None
+        self.processed = 0
+        self.dropped = 0
+        self.busy = 0
+        self._answered: Deque[float] = deque()
+
+    def _prune(self, now: float):
+        while self._answered and now - self._answered[0] > self.fps_window_seconds:
+            self._answered.popleft()
+
+    def frame_done(self, elapsed_ms: float):
+        """A frame was processed in elapsed_ms (queue wait included)"""
+        if self.frame_ms is None:
+            self.frame_ms = elapsed_ms
+        else:
+            self.frame_ms += _FRAME_MS_SMOOTHING * (elapsed_ms - self.frame_ms)
+        self.processed += 1
+        now = time.monotonic()
+        self._answered.append(now)
+        self._prune(now)
+
+    def frame_dropped(self):
+        self.dropped += 1
+
+    def frame_rejected(self):
+        """The inference executor was full"""
+        self.busy += 1
+
+    @property
+    def fps(self) -> float:
+        self._prune(time.monotonic())
+        return len(self._answered) / self.fps_window_seconds
+
+    def credits(self, queued_jobs: int = 0) -> int:
+        """
+        Frames the client may have in flight (sent but not yet answered).
+        queued_jobs: inference jobs waiting for a thread, across all clients.
+        """
+        if self.frame_ms is None or self.frame_ms <= 0:
+            window = 1
+        else:
+            window = int(self.target_latency_ms // self.frame_ms)
+        limit = min(self.max_credits, _DROP_STALE_CREDITS) if self.drop_stale else self.max_credits
+        window = min(limit, max(1, window))
+        return max(1, window - queued_jobs)
+
+    def stats(self, queued_jobs: int = 0) -> dict:
+        return {
+            "credits": self.credits(queued_jobs),
+            "fps": round(self.fps, 2),
+            "frame_ms": round(self.frame_ms, 2) if self.frame_ms is not None else None,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "busy": self.busy,
+        }
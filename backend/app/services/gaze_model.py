@@ -0,0 +1,146 @@
+"""
+Flat, pickle-free storage of a calibrated gaze model.
+
+EyeTrax's gaze model is a StandardScaler followed by a ridge regressor, with
+an optional per-feature variable_scaling in between. Its parameters are
+written as a single float64 .npy array:
+
+    [FORMAT_VERSION, n_features, n_outputs, screen_width, screen_height,
+     mean[n_features], scale[n_features], variable_scaling[n_features],
+     coef[n_outputs * n_features], intercept[n_outputs]]
+
+Loading it executes no code, so the file is safe to read from shared
+storage. The file is small and read into memory: the folded weights are
+recomputed on load anyway, so a memory map would not be shared. The scaler is folded into the regression when the model is built, so
+predict is a single matmul (X @ weights + bias) without sklearn.
+"""
+import os
+import pickle
+from typing import Any, Optional
+
+import numpy as np
+
+FORMAT_VERSION = 1
+_HEADER_SIZE = 5
+
+
+class GazeModelFormatError(ValueError):
+    """Raised when a gaze model file or object cannot be represented in the flat format"""
+    pass
+
+
+class LinearGazeModel:
+    """
+    Scaler + ridge parameters of a calibrated gaze model, plus the screen size
+    its targets were expressed in. predict mirrors GazeEstimator.predict:
+    ((X - mean) / scale * variable_scaling) @ coef.T + intercept.
+    """
+    def __init__(self, mean: np.ndarray, scale: np.ndarray, variable_scaling: Optional[np.ndarray],
+                 coef: np.ndarray, intercept: np.ndarray, screen_width: int, screen_height: int):
+        coef = np.atleast_2d(np.asarray(coef, dtype=np.float64))
+        n_features = coef.shape[1]
+        self.mean = np.asarray(mean, dtype=np.float64).reshape(n_features)
+        self.scale = np.asarray(scale, dtype=np.float64).reshape(n_features)
+        if variable_scaling is None:
+            variable_scaling = np.ones(n_features)
+        self.variable_scaling = np.asarray(variable_scaling, dtype=np.float64).reshape(n_features)
+        self.coef = coef
+        self.intercept = np.asarray(intercept, dtype=np.float64).reshape(coef.shape[0])
+        self.screen_width = int(screen_width)
+        self.screen_height = int(screen_height)
+
+        # Fold the scaler into the regression: one (n_features, n_outputs) matmul per batch
+        factor = self.variable_scaling / self.scale
+        self.weights = np.ascontiguousarray((coef * factor).T)
+        self.bias = self.intercept - (self.mean * factor) @ coef.T
+
+    @property
+    def n_features(self) -> int:
+        return self.coef.shape[1]
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Screen pixel coordinates for a 2D array of EyeTrax features"""
+        return np.asarray(X, dtype=np.float64) @ self.weights + self.bias
+
+    @classmethod
+    def from_sklearn(cls, model: Any, scaler: Any, variable_scaling: Optional[np.ndarray],
+                     screen_width: int, screen_height: int) -> "LinearGazeModel":
+        """From a fitted scaler and linear regressor (what GazeEstimator.train produces)"""
+        coef = getattr(model, "coef_", None)
+        if coef is None:
+            raise GazeModelFormatError(f"{type(model).__name__} is not a fitted linear model")
+        coef = np.atleast_2d(coef)
+        n_features = coef.shape[1]
+        mean = getattr(scaler, "mean_", None)
+        scale = getattr(scaler, "scale_", None)
+        return cls(
+            mean if mean is not None else np.zeros(n_features),
+            scale if scale is not None else np.ones(n_features),
+            variable_scaling,
+            coef,
+            np.broadcast_to(getattr(model, "intercept_", 0.0), (coef.shape[0],)),
+            screen_width,
+            screen_height,
+        )
+
+    @classmethod
+    def from_legacy_dict(cls, data: dict) -> "LinearGazeModel":
+        """From the dict GazeTrackingService used to pickle (model, scaler, variable_scaling, screen size)"""
+        return cls.from_sklearn(
+            data['model'],
+            data['scaler'],
+            data.get('variable_scaling', None),
+            data.get('screen_width', 1920),
+            data.get('screen_height', 1080),
+        )
+
+    def to_array(self) -> np.ndarray:
+        header = [FORMAT_VERSION, self.n_features, self.coef.shape[0], self.screen_width, self.screen_height]
+        return np.concatenate([
+            np.asarray(header, dtype=np.float64),
+            self.mean, self.scale, self.variable_scaling, self.coef.ravel(), self.intercept,
+        ])
+
+    @classmethod
+    def from_array(cls, data: np.ndarray) -> "LinearGazeModel":
+        data = np.asarray(data)
+        if data.ndim != 1 or data.size < _HEADER_SIZE:
+            raise GazeModelFormatError("Not a flat gaze model array")
+        version, n_features, n_outputs, screen_width, screen_height = (int(v) for v in data[:_HEADER_SIZE])
+        if version != FORMAT_VERSION:
+            raise GazeModelFormatError(f"Unsupported gaze model format version {version}")
+        if data.size != _HEADER_SIZE + n_features * (3 + n_outputs) + n_outputs:
+            raise GazeModelFormatError("Gaze model array size does not match its header")
+        offset = _HEADER_SIZE
+
+        def take(count: int) -> np.ndarray:
+            nonlocal offset
+            values = data[offset:offset + count]
+            offset += count
+            return values
+
+        mean, scale, variable_scaling = take(n_features), take(n_features), take(n_features)
+        coef = take(n_outputs * n_features).reshape(n_outputs, n_features)
+        return cls(mean, scale, variable_scaling, coef, take(n_outputs), screen_width, screen_height)
+
+    def save(self, path: str):
+        """Write atomically, so readers never see a partial file"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, self.to_array(), allow_pickle=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "LinearGazeModel":
+        return cls.from_array(np.load(path, allow_pickle=False))
+
+
+def migrate_pickle(pickle_path: str, model_path: str) -> LinearGazeModel:
+    """
+    Convert a model pickled by earlier versions (a trusted local file) to the
+    flat format at model_path. The pickle is left in place.
+    """
+    with open(pickle_path, 'rb') as f:
+        model = LinearGazeModel.from_legacy_dict(pickle.load(f))
+    model.save(model_path)
+    return model
@@ -0,0 +1,117 @@
+"""
+Compact columnar encoding of recorded gaze points for /api/gaze/analyze/compact.
+
+Binary body (application/octet-stream), all little-endian:
+
+    magic          4 bytes  b"GZC1"
+    count          uint32   number of points
+    video_duration float64  seconds
+    t0             float64  timestamp (ms) the offsets are relative to
+    timestamps     float32[count]  ms since t0
+    x              float32[count]  normalized 0-1
+    y              float32[count]  normalized 0-1
+    social_region  uint8[ceil(count / 8)]  bitset, LSB first
+
+JSON body: {"count", "video_duration", "t0", and the four columns as
+base64 strings of the same bytes: "timestamps", "x", "y", "social_region"}.
+
+Columns are NumPy views over the received bytes (no per-point objects);
+SPI only needs a popcount of the bitset.
+"""
+import base64
+import struct
+from typing import NamedTuple
+
+import numpy as np
+
+MAGIC = b"GZC1"
+HEADER = struct.Struct("<4sIdd")
+
+
+class CompactPayloadError(ValueError):
+    """Raised when a compact gaze payload is malformed"""
+    pass
+
+
+class CompactGazeData(NamedTuple):
+    video_duration: float
+    t0: float
+    timestamps: np.ndarray
+    x: np.ndarray
+    y: np.ndarray
+    social_bits: np.ndarray
+    count: int
+
+    @property
+    def social_frames(self) -> int:
+        return int(np.unpackbits(self.social_bits, count=self.count, bitorder="little").sum())
+
+    @property
+    def geometric_frames(self) -> int:
+        return self.count - self.social_frames
+
+
+def _bitset_size(count: int) -> int:
+    return (count + 7) // 8
+
+
+def _columns(count: int, video_duration: float, t0: float, timestamps: bytes, x: bytes, y: bytes,
+             social: bytes) -> CompactGazeData:
+    float_bytes = 4 * count
+    if len(timestamps) != float_bytes or len(x) != float_bytes or len(y) != float_bytes:
+        raise CompactPayloadError(f"Float columns must hold {count} float32 values")
+    if len(social) != _bitset_size(count):
+        raise CompactPayloadError(f"social_region must hold {_bitset_size(count)} bytes")
+    return CompactGazeData(
+        video_duration=float(video_duration),
+        t0=float(t0),
+        timestamps=np.frombuffer(timestamps, dtype="<f4"),
+        x=np.frombuffer(x, dtype="<f4"),
+        y=np.frombuffer(y, dtype="<f4"),
+        social_bits=np.frombuffer(social, dtype=np.uint8),
+        count=count,
+    )
+
+
+def decode_compact_gaze(body: bytes) -> CompactGazeData:
+    """Parse the binary encoding. Raises CompactPayloadError."""
+    if len(body) < HEADER.size:
+        raise CompactPayloadError("Payload is shorter than its header")
+    magic, count, video_duration, t0 = HEADER.unpack_from(body)
+    if magic != MAGIC:
+        raise CompactPayloadError("Not a compact gaze payload")
+    view = memoryview(body)
+    offset = HEADER.size
+    columns = []
+    for size in (4 * count, 4 * count, 4 * count, _bitset_size(count)):
+        columns.append(view[offset:offset + size])
+        offset += size
+    if offset != len(body):
+        raise CompactPayloadError(f"Payload size does not match {count} points")
+    return _columns(count, video_duration, t0, *columns)
+
+
+def decode_compact_gaze_json(data: dict) -> CompactGazeData:
+    """Parse the JSON/base64 encoding. Raises CompactPayloadError."""
+    try:
+        count = int(data["count"])
+        video_duration = float(data["video_duration"])
+        t0 = float(data.get("t0", 0.0))
+        columns = [base64.b64decode(data[key]) for key in ("timestamps", "x", "y", "social_region")]
+    except (KeyError, TypeError, ValueError) as e:
+        raise CompactPayloadError(f"Invalid compact gaze payload: {e}")
+    return _columns(count, video_duration, t0, *columns)
+
+
+def encode_compact_gaze(timestamps, x, y, social_region, video_duration: float) -> bytes:
+    """Binary encoding of gaze points (timestamps in ms); used by clients and the benchmark"""
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    t0 = float(timestamps[0]) if len(timestamps) else 0.0
+    count = len(timestamps)
+    return b"".join((
+        HEADER.pack(MAGIC, count, float(video_duration), t0),
+        (timestamps - t0).astype("<f4").tobytes(),
+        np.asarray(x, dtype="<f4").tobytes(),
+        np.asarray(y, dtype="<f4").tobytes(),
+        np.packbits(np.asarray(social_region, dtype=bool), bitorder="little").tobytes(),
+    ))
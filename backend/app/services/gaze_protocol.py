@@ -0,0 +1,87 @@
+"""
+Binary framing for the real-time gaze WebSocket.
+
+After a {"type": "hello", "binary": true} handshake a client may send each
+frame as one binary WebSocket message instead of JSON with a base64 data
+URL. A message is a fixed little-endian header followed by the payload:
+
+    version    uint8    PROTOCOL_VERSION
+    format     uint8    FORMAT_JPEG or FORMAT_GRAY8
+    width      uint16   frame width in pixels (GRAY8 only, 0 for JPEG)
+    height     uint16   frame height in pixels (GRAY8 only, 0 for JPEG)
+    seq        uint32   client sequence number, echoed in the reply
+    timestamp  float64  client capture time (ms), echoed in the reply
+
+JPEG payloads are decoded by cv2.imdecode straight from the received
+buffer; GRAY8 payloads are width*height raw luminance bytes.
+"""
+import struct
+from typing import NamedTuple, Tuple
+
+import cv2
+import numpy as np
+
+PROTOCOL_VERSION = 1
+FORMAT_JPEG = 1
+FORMAT_GRAY8 = 2
+FORMAT_NAMES = {FORMAT_JPEG: "jpeg", FORMAT_GRAY8: "gray8"}
+
+HEADER = struct.Struct("<BBHHId")
+
+
+class FrameDecodeError(ValueError):
+    """Raised when a binary frame is malformed or cannot be decoded"""
+    pass
+
+
+class FrameHeader(NamedTuple):
+    version: int
+    format: int
+    width: int
+    height: int
+    seq: int
+    timestamp: float
+
+
+def encode_frame(payload: bytes, fmt: int = FORMAT_JPEG, width: int = 0, height: int = 0,
+                 seq: int = 0, timestamp: float = 0.0) -> bytes:
+    """Build a binary frame message (used by clients, tests and the benchmark)"""
+    return HEADER.pack(PROTOCOL_VERSION, fmt, width, height, seq & 0xFFFFFFFF, timestamp) + payload
+
+
+def decode_header(message: bytes) -> FrameHeader:
+    """Parse only the header of a binary frame message. Raises FrameDecodeError."""
+    if len(message) <= HEADER.size:
+        raise FrameDecodeError("Frame is shorter than its header")
+    header = FrameHeader(*HEADER.unpack_from(message))
+    if header.version != PROTOCOL_VERSION:
+        raise FrameDecodeError(f"Unsupported protocol version {header.version}")
+    return header
+
+
+def decode_frame(message: bytes) -> Tuple[FrameHeader, np.ndarray]:
+    """
+    Parse a binary frame message into its header and a BGR image
+    (the format EyeTrax's extract_features expects).
+    Raises FrameDecodeError on malformed input.
+    """
+    header = decode_header(message)
+
+    # View the payload in place; no bytes are copied before decoding
+    payload = np.frombuffer(message, dtype=np.uint8, offset=HEADER.size)
+
+    if header.format == FORMAT_JPEG:
+        image = cv2.imdecode(payload, cv2.IMREAD_COLOR)
+        if image is None:
+            raise FrameDecodeError("Could not decode JPEG payload")
+        return header, image
+
+    if header.format == FORMAT_GRAY8:
+        if payload.size != header.width * header.height:
+            raise FrameDecodeError(
+                f"GRAY8 payload has {payload.size} bytes, expected {header.width}x{header.height}"
+            )
+        gray = payload.reshape(header.height, header.width)
+        return header, cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+
+    raise FrameDecodeError(f"Unknown frame format {header.format}")
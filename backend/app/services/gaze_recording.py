@@ -0,0 +1,187 @@
+"""
+Post-hoc gaze analysis of an uploaded recording.
+
+A low-bandwidth client records the child watching the stimulus locally and
+uploads it once, as a compressed video or as a tar of frame images. The
+recording is decoded in a streaming fashion (cv2.VideoCapture or a
+streamed tarfile), sampled down to GAZE_RECORDING_SAMPLE_FPS, and analyzed
+in chunks of GAZE_RECORDING_CHUNK_FRAMES on the calibration extractor pool
+while a reader thread decodes the next chunk. Only the gaze trace is kept;
+frames are dropped as soon as their chunk is analyzed.
+"""
+import os
+import re
+import tarfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.services.gaze_spi import SPIAccumulator
+
+# Recording analysis configuration
+# GAZE_RECORDING_SAMPLE_FPS: frames per second analyzed (the live client samples every 100 ms); 0 = every frame
+# GAZE_RECORDING_CHUNK_FRAMES: frames decoded ahead and analyzed per extractor pool call
+# GAZE_RECORDING_MAX_FRAMES: analyzed frames allowed per recording
+# GAZE_RECORDING_TAR_FPS: frame rate assumed for tar images not named by their capture time
+GAZE_RECORDING_SAMPLE_FPS = float(os.getenv("GAZE_RECORDING_SAMPLE_FPS", "10"))
+GAZE_RECORDING_CHUNK_FRAMES = int(os.getenv("GAZE_RECORDING_CHUNK_FRAMES", "32"))
+GAZE_RECORDING_MAX_FRAMES = int(os.getenv("GAZE_RECORDING_MAX_FRAMES", "20000"))
+GAZE_RECORDING_TAR_FPS = float(os.getenv("GAZE_RECORDING_TAR_FPS", "30"))
+
+_IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+_EPOCH_MS = re.compile(r"^\d{12,}$")
+
+# (timestamp in ms from the start of the recording, BGR frame)
+TimedFrame = Tuple[float, np.ndarray]
+
+
+class RecordingError(ValueError):
+    """Raised when an uploaded recording cannot be read"""
+    pass
+
+
+def iter_video_frames(path: str, sample_fps: float = GAZE_RECORDING_SAMPLE_FPS) -> Iterator[TimedFrame]:
+    """Decode a video file frame by frame, keeping about sample_fps frames per second"""
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise RecordingError("Could not open the recording as a video")
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS) or 0.0
+        if fps <= 0 or fps > 240:
+            fps = 30.0  # Missing or bogus container metadata
+        step = 1.0 / sample_fps if sample_fps > 0 else 0.0
+        next_sample = 0.0
+        index = 0
+        while True:
+            # Frames that are not sampled are grabbed but never retrieved (no conversion or copy)
+            if not capture.grab():
+                break
+            timestamp = index / fps
+            index += 1
+            if timestamp + 1e-6 < next_sample:
+                continue
+            ok, frame = capture.retrieve()
+            if not ok:
+                break
+            next_sample += step
+            yield timestamp * 1000.0, frame
+    finally:
+        capture.release()
+
+
+def iter_tar_frames(path: str, sample_fps: float = GAZE_RECORDING_SAMPLE_FPS,
+                    archive_fps: float = GAZE_RECORDING_TAR_FPS) -> Iterator[TimedFrame]:
+    """
+    Decode the images of a tar archive in archive order, keeping about
+    sample_fps frames per second like iter_video_frames. Members named by
+    their capture time (Date.now() in ms, e.g. 1700000000123.jpg) are timed
+    by it; otherwise frames are assumed to be archive_fps apart.
+    """
+    frame_ms = 1000.0 / archive_fps if archive_fps > 0 else 1000.0 / 30.0
+    step_ms = 1000.0 / sample_fps if sample_fps > 0 else 0.0
+    next_sample = 0.0
+    first_timestamp: Optional[float] = None
+    index = 0
+    try:
+        # Streaming mode: members are read one after the other, never all at once
+        with tarfile.open(path, mode="r|*") as archive:
+            for member in archive:
+                if not member.isfile() or not member.name.lower().endswith(_IMAGE_SUFFIXES):
+                    continue
+                stem = os.path.splitext(os.path.basename(member.name))[0]
+                if _EPOCH_MS.match(stem):
+                    timestamp = float(stem)
+                    if first_timestamp is None:
+                        first_timestamp = timestamp
+                    timestamp -= first_timestamp
+                else:
+                    timestamp = index * frame_ms
+                index += 1
+                # Frames that are not sampled are skipped before decoding
+                if timestamp + 1e-3 < next_sample:
+                    continue
+                data = archive.extractfile(member).read()
+                frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+                if frame is None:
+                    continue
+                # After a gap in capture times, restart the sampling grid instead of catching up
+                if timestamp - next_sample >= step_ms:
+                    next_sample = timestamp
+                next_sample += step_ms
+                yield timestamp, frame
+    except tarfile.TarError as e:
+        raise RecordingError(f"Could not read the frame archive: {e}")
+
+
+def iter_recording_frames(path: str, sample_fps: float = GAZE_RECORDING_SAMPLE_FPS) -> Iterator[TimedFrame]:
+    """Frames of an uploaded recording: a tar of images, or any video OpenCV can decode"""
+    if tarfile.is_tarfile(path):
+        return iter_tar_frames(path, sample_fps)
+    return iter_video_frames(path, sample_fps)
+
+
+def _read_chunk(frames: Iterator[TimedFrame], size: int) -> List[TimedFrame]:
+    chunk = []
+    for item in frames:
+        chunk.append(item)
+        if len(chunk) >= size:
+            break
+    return chunk
+
+
+def analyze_recording(gaze_service, frames: Iterator[TimedFrame], session=None,
+                      chunk_frames: int = GAZE_RECORDING_CHUNK_FRAMES,
+                      max_frames: int = GAZE_RECORDING_MAX_FRAMES) -> Dict[str, object]:
+    """
+    Gaze trace and SPI counters of a recording.
+    gaze_service is the GazeTrackingService; session the calibration (None = shared model).
+    Returns {"gaze_data": [{timestamp, x, y, social_region}], "spi": SPIAccumulator,
+             "frames": counters, "duration_ms", "timings"}.
+    """
+    started = time.perf_counter()
+    spi = SPIAccumulator()
+    gaze_data: List[Dict[str, object]] = []
+    counters = {"analyzed": 0, "face_not_detected": 0, "blink_detected": 0, "predicted": 0}
+    timings = {"decode_wait_ms": 0.0, "analyze_ms": 0.0}
+    duration_ms = 0.0
+    # All chunks are one stream: the extractor workers keep their tracking state across them
+    stream = object()
+
+    # One reader thread decodes the next chunk while the pool analyzes the current one
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="recording-reader") as reader:
+        pending = reader.submit(_read_chunk, frames, chunk_frames)
+        while True:
+            waited = time.perf_counter()
+            chunk = pending.result()
+            timings["decode_wait_ms"] += (time.perf_counter() - waited) * 1000.0
+            if not chunk:
+                break
+            if counters["analyzed"] + len(chunk) > max_frames:
+                raise RecordingError(f"Recording has more than {max_frames} frames to analyze")
+            pending = reader.submit(_read_chunk, frames, chunk_frames)
+
+            analyzed = time.perf_counter()
+            analyses, _ = gaze_service.analyze_frames_batch(
+                [frame for _, frame in chunk], session, True, "recording frame", stream
+            )
+            timings["analyze_ms"] += (time.perf_counter() - analyzed) * 1000.0
+
+            for (timestamp, _), analysis in zip(chunk, analyses):
+                counters["analyzed"] += 1
+                duration_ms = max(duration_ms, timestamp)
+                if not analysis["face_detected"]:
+                    counters["face_not_detected"] += 1
+                elif analysis["blink_detected"]:
+                    counters["blink_detected"] += 1
+                if analysis["gaze"] is None:
+                    continue
+                x, y = analysis["gaze"]
+                counters["predicted"] += 1
+                gaze_data.append({"timestamp": timestamp, "x": x, "y": y, "social_region": spi.add(x, y)})
+            del chunk
+
+    timings["total_ms"] = (time.perf_counter() - started) * 1000.0
+    return {"gaze_data": gaze_data, "spi": spi, "frames": counters, "duration_ms": duration_ms, "timings": timings}
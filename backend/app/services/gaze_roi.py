@@ -0,0 +1,183 @@
+"""
+Face-tracking region of interest for gaze feature extraction.
+
+MediaPipe FaceMesh otherwise receives every webcam frame at full
+resolution. FaceROITracker finds the face once with the shared face
+detector (app.services.face_detector), then crops later frames to a padded
+box around it, converted to BGR and optionally downscaled only after
+cropping. If no face is found in the crop, the face is re-detected on the
+full frame and the crop retried. The face is also re-detected every
+GAZE_ROI_REDETECT_EVERY frames to follow head movement. While no face is
+found (the child looks away, an empty frame), detection backs off
+exponentially so those frames cost little more than the full-frame path.
+
+The crop keeps the frame's aspect ratio and is scaled uniformly. EyeTrax's
+features are landmarks centred on the nose and divided by the inter-eye
+distance, with normalized x and y, so a crop with a different aspect ratio
+would stretch them relative to the calibration.
+"""
+import os
+import threading
+from typing import Callable, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.services.face_detector import Box, get_face_detector
+
+# Gaze ROI configuration
+# GAZE_ROI: 1 = extract gaze features from a face-tracking crop instead of the full frame
+# GAZE_ROI_PADDING: padding around the detected face box on each side, as a fraction of the face size
+# GAZE_ROI_MAX_WIDTH: crops wider than this are downscaled (0 = keep the crop resolution)
+# GAZE_ROI_REDETECT_EVERY: frames between re-detections while the face is tracked (0 = only on loss)
+GAZE_ROI_ENABLED = os.getenv("GAZE_ROI", "0") == "1"
+GAZE_ROI_PADDING = float(os.getenv("GAZE_ROI_PADDING", "0.6"))
+GAZE_ROI_MAX_WIDTH = int(os.getenv("GAZE_ROI_MAX_WIDTH", "320"))
+GAZE_ROI_REDETECT_EVERY = int(os.getenv("GAZE_ROI_REDETECT_EVERY", "30"))
+
+# Channel layout of a decoded frame -> conversion to BGR (EyeTrax) / RGB / gray (face detector)
+_TO_BGR = {"rgb": cv2.COLOR_RGB2BGR, "rgba": cv2.COLOR_RGBA2BGR, "gray": cv2.COLOR_GRAY2BGR}
+_TO_RGB = {"bgr": cv2.COLOR_BGR2RGB, "rgba": cv2.COLOR_RGBA2RGB, "gray": cv2.COLOR_GRAY2RGB}
+_TO_GRAY = {"bgr": cv2.COLOR_BGR2GRAY, "rgb": cv2.COLOR_RGB2GRAY, "rgba": cv2.COLOR_RGBA2GRAY}
+
+# Longest wait (in frames) between detection attempts while no face is found, if GAZE_ROI_REDETECT_EVERY is 0
+_NO_FACE_BACKOFF_MAX = 30
+
+
+def to_bgr(image: np.ndarray, layout: str) -> np.ndarray:
+    """Convert an image with the given channel layout (bgr, rgb, rgba, gray) to BGR"""
+    if layout == "bgr":
+        return image
+    return cv2.cvtColor(image, _TO_BGR[layout])
+
+
+def roi_region(box: Box, frame_width: int, frame_height: int, padding: float) -> Tuple[int, int, int, int]:
+    """
+    (x0, y0, x1, y1) of a crop with the frame's aspect ratio that contains the
+    face box padded by `padding` on each side, shifted to stay inside the frame.
+    """
+    x, y, width, height = box
+    side = max(width, height) * (1.0 + 2.0 * padding)
+    scale = min(1.0, max(side / frame_width, side / frame_height))
+    crop_width = max(1, int(round(frame_width * scale)))
+    crop_height = max(1, int(round(frame_height * scale)))
+    center_x, center_y = x + width / 2.0, y + height / 2.0
+    x0 = int(round(min(max(center_x - crop_width / 2.0, 0), frame_width - crop_width)))
+    y0 = int(round(min(max(center_y - crop_height / 2.0, 0), frame_height - crop_height)))
+    return x0, y0, x0 + crop_width, y0 + crop_height
+
+
+class FaceROITracker:
+    """
+    Per-stream face box. extract() runs an EyeTrax extraction on the crop
+    around the last face, re-detecting when the face is lost. One tracker
+    belongs to one frame stream (a gaze session).
+    """
+    def __init__(self, padding: float = GAZE_ROI_PADDING, max_width: int = GAZE_ROI_MAX_WIDTH,
+                 redetect_every: int = GAZE_ROI_REDETECT_EVERY):
+        self.padding = padding
+        self.max_width = max_width
+        self.redetect_every = redetect_every
+        self.box: Optional[Box] = None
+        self._frames_since_detection = 0
+        # Consecutive detections without a usable face, and the frames to wait before the next attempt
+        self._misses = 0
+        self._retry_after = 0
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.frames = 0
+        self.cropped_frames = 0
+        self.detections = 0
+        self.losses = 0
+
+    def _detect(self, image: np.ndarray, layout: str) -> Optional[Box]:
+        detector = get_face_detector()
+        if layout == "gray":
+            detector_input = image
+        elif detector.needs_color:
+            detector_input = image if layout == "rgb" else cv2.cvtColor(image, _TO_RGB[layout])
+        else:
+            detector_input = cv2.cvtColor(image, _TO_GRAY[layout])
+        faces = detector.detect(detector_input)
+        self.detections += 1
+        # The largest face is the child in front of the screen
+        return max(faces, key=lambda box: box[2] * box[3]) if faces else None
+
+    def _detected(self, box: Optional[Box]):
+        # Caller holds the lock; box is the tracked face after a detection attempt
+        self._frames_since_detection = 0
+        if box is not None:
+            self._misses = 0
+            self._retry_after = 0
+            return
+        self._misses += 1
+        limit = self.redetect_every if self.redetect_every > 0 else _NO_FACE_BACKOFF_MAX
+        self._retry_after = min(limit, 2 ** self._misses)
+
+    def _crop(self, image: np.ndarray, layout: str, box: Box) -> np.ndarray:
+        frame_height, frame_width = image.shape[:2]
+        x0, y0, x1, y1 = roi_region(box, frame_width, frame_height, self.padding)
+        # Convert only the crop
+        crop = to_bgr(image[y0:y1, x0:x1], layout)
+        if self.max_width > 0 and crop.shape[1] > self.max_width:
+            factor = self.max_width / float(crop.shape[1])
+            crop = cv2.resize(
+                crop,
+                (self.max_width, max(1, int(round(crop.shape[0] * factor)))),
+                interpolation=cv2.INTER_AREA
+            )
+        return crop
+
+    def extract(self, image: np.ndarray, layout: str,
+                extract_features: Callable[[np.ndarray], Tuple[Optional[np.ndarray], bool]]
+                ) -> Tuple[Optional[np.ndarray], bool]:
+        """
+        extract_features (a BGR frame -> (features, blink) function) on the
+        face crop of a full frame with the given channel layout.
+        """
+        with self._lock:
+            self.frames += 1
+            box = self.box
+            if box is None:
+                detected = self._frames_since_detection >= self._retry_after
+            else:
+                detected = self.redetect_every > 0 and self._frames_since_detection >= self.redetect_every
+            if detected:
+                box = self._detect(image, layout) or box
+                self._detected(box)
+            self._frames_since_detection += 1
+            self.box = box
+
+        if box is None:
+            # No face anywhere (or backing off): let EyeTrax look at the full frame
+            return extract_features(to_bgr(image, layout))
+
+        result = extract_features(self._crop(image, layout, box))
+        if result[0] is not None:
+            with self._lock:
+                self.cropped_frames += 1
+            return result
+
+        # Lost the face in the crop: re-detect on the full frame and retry once
+        with self._lock:
+            self.losses += 1
+            box = None if detected else self._detect(image, layout)
+            self.box = box
+            self._detected(box)
+        if box is None:
+            return extract_features(to_bgr(image, layout))
+        result = extract_features(self._crop(image, layout, box))
+        if result[0] is not None:
+            with self._lock:
+                self.cropped_frames += 1
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "frames": self.frames,
+            "cropped_frames": self.cropped_frames,
+            "detections": self.detections,
+            "losses": self.losses,
+            "box": list(self.box) if self.box is not None else None,
+        }
@@ -0,0 +1,244 @@
+"""
+Per-session calibrated gaze models.
+
+Each /api/gaze/calibrate call trains its own small ridge model (EyeTrax's
+scaler + regressor) and stores it under a random session id, so children
+calibrating at the same time no longer overwrite each other. Sessions live
+in a bounded in-memory LRU with a time-to-live; when GAZE_SESSION_SPILL_DIR
+is set, evicted sessions are written there in the flat gaze model format
+(app.services.gaze_model) and loaded back on next use.
+"""
+import os
+import re
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+from app.services.gaze_features import FrameFeatureCache
+from app.services.gaze_model import LinearGazeModel
+
+# Session store configuration
+# GAZE_SESSION_MAX: calibrated sessions kept in memory per process
+# GAZE_SESSION_TTL_SECONDS: sessions unused for longer are discarded (memory and disk)
+# GAZE_SESSION_SPILL_DIR: if set, sessions evicted from memory are written here instead of dropped
+GAZE_SESSION_MAX = int(os.getenv("GAZE_SESSION_MAX", "256"))
+GAZE_SESSION_TTL_SECONDS = float(os.getenv("GAZE_SESSION_TTL_SECONDS", "3600"))
+GAZE_SESSION_SPILL_DIR = os.getenv("GAZE_SESSION_SPILL_DIR", "")
+
+_SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+# Minimum seconds between sweeps of the spill directory for expired files
+_SPILL_SWEEP_INTERVAL_SECONDS = 60.0
+
+
+class GazeSession:
+    """
+    A calibrated gaze model (EyeTrax's fitted scaler and ridge regressor,
+    flattened into a LinearGazeModel) plus the screen size the calibration
+    targets were expressed in. predict mirrors GazeEstimator.predict.
+    """
+    def __init__(self, session_id: str, model: LinearGazeModel):
+        self.session_id = session_id
+        self.model = model
+        self.screen_width = model.screen_width
+        self.screen_height = model.screen_height
+        self.last_used = time.time()
+        # Per-stage timings of the calibration that produced this session (not persisted)
+        self.calibration_timings: Optional[dict] = None
+        # Smoothing/fixation state of the session's prediction stream (app.services.gaze_filter)
+        self.gaze_filter = None
+        # Recent extractions by frame seq, shared by /check and /predict (not persisted)
+        self.feature_cache = FrameFeatureCache()
+        # Flow control counters of the session's latest /ws stream (app.services.gaze_flow)
+        self.frame_flow = None
+        # Face-tracking crop of the session's frames (app.services.gaze_roi), when GAZE_ROI is on
+        self.roi_tracker = None
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Screen pixel coordinates for a 2D array of EyeTrax features"""
+        return self.model.predict(X)
+
+
+def new_session_id() -> str:
+    return secrets.token_urlsafe(16)
+
+
+class GazeSessionStore:
+    """
+    Thread-safe LRU of GazeSession objects with a time-to-live and optional
+    spill to disk. get() refreshes a session's last use; sessions past the
+    TTL are removed lazily on access and on every put(). Spilled files past
+    the TTL are swept at startup and at most every
+    _SPILL_SWEEP_INTERVAL_SECONDS during put().
+    """
+    def __init__(self, max_sessions: int = GAZE_SESSION_MAX, ttl_seconds: float = GAZE_SESSION_TTL_SECONDS,
+                 spill_dir: str = GAZE_SESSION_SPILL_DIR):
+        self.max_sessions = max(1, int(max_sessions))
+        self.ttl_seconds = float(ttl_seconds)
+        self.spill_dir = spill_dir or None
+        self._sessions: "OrderedDict[str, GazeSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+
+        # Metrics
+        self.evictions = 0
+        self.expirations = 0
+        self.spilled = 0
+        self.restored = 0
+
+        if self.spill_dir:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            with self._lock:
+                self._sweep_spill_dir()
+
+    def _expired(self, last_used: float) -> bool:
+        return self.ttl_seconds > 0 and time.time() - last_used > self.ttl_seconds
+
+    def _spill_path(self, session_id: str) -> str:
+        return os.path.join(self.spill_dir, f"{session_id}.npy")
+
+    def _remove_spill_file(self, session_id: str) -> bool:
+        # Caller holds the lock
+        if not self.spill_dir:
+            return False
+        try:
+            os.remove(self._spill_path(session_id))
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            print(f"Warning: Could not remove spilled gaze session {session_id}: {e}")
+            return False
+        return True
+
+    def _sweep_spill_dir(self):
+        # Caller holds the lock; spilled sessions are rarely revisited, so their files expire here
+        self._last_sweep = time.time()
+        if not self.spill_dir or self.ttl_seconds <= 0:
+            return
+        try:
+            names = os.listdir(self.spill_dir)
+        except OSError as e:
+            print(f"Warning: Could not list gaze session spill dir {self.spill_dir}: {e}")
+            return
+        for name in names:
+            session_id, extension = os.path.splitext(name)
+            if extension != ".npy" or not _SESSION_ID_PATTERN.match(session_id):
+                continue
+            try:
+                expired = self._expired(os.path.getmtime(self._spill_path(session_id)))
+            except OSError:
+                continue
+            if expired and self._remove_spill_file(session_id):
+                self.expirations += 1
+
+    def _spill(self, session: GazeSession):
+        # Caller holds the lock
+        try:
+            session.model.save(self._spill_path(session.session_id))
+            self.spilled += 1
+        except Exception as e:
+            print(f"Warning: Could not spill gaze session {session.session_id}: {e}")
+
+    def _restore(self, session_id: str) -> Optional[GazeSession]:
+        # Caller holds the lock
+        path = self._spill_path(session_id)
+        if not os.path.exists(path):
+            return None
+        try:
+            if self._expired(os.path.getmtime(path)):
+                os.remove(path)
+                self.expirations += 1
+                return None
+            session = GazeSession(session_id, LinearGazeModel.load(path))
+            os.remove(path)
+        except Exception as e:
+            print(f"Warning: Could not restore gaze session {session_id}: {e}")
+            return None
+        self.restored += 1
+        return session
+
+    def _purge_expired(self):
+        # Caller holds the lock; the LRU order means expired sessions are at the front
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if not self._expired(session.last_used):
+                break
+            self._sessions.popitem(last=False)
+            self._remove_spill_file(session.session_id)
+            self.expirations += 1
+        if self.spill_dir and time.time() - self._last_sweep >= _SPILL_SWEEP_INTERVAL_SECONDS:
+            self._sweep_spill_dir()
+
+    def _evict_overflow(self):
+        # Caller holds the lock
+        while len(self._sessions) > self.max_sessions:
+            _, evicted = self._sessions.popitem(last=False)
+            self.evictions += 1
+            if self.spill_dir:
+                self._spill(evicted)
+
+    def put(self, session: GazeSession):
+        """Store a session, evicting (or spilling) the least recently used beyond max_sessions"""
+        with self._lock:
+            self._purge_expired()
+            session.last_used = time.time()
+            self._sessions[session.session_id] = session
+            self._sessions.move_to_end(session.session_id)
+            self._evict_overflow()
+
+    def get(self, session_id: str) -> Optional[GazeSession]:
+        """Return the session (restoring it from disk if spilled), or None if unknown/expired"""
+        if not session_id or not _SESSION_ID_PATTERN.match(session_id):
+            return None
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None and self._expired(session.last_used):
+                del self._sessions[session_id]
+                self._remove_spill_file(session_id)
+                self.expirations += 1
+                return None
+            if session is None and self.spill_dir:
+                session = self._restore(session_id)
+                if session is not None:
+                    self._sessions[session_id] = session
+            if session is None:
+                return None
+            session.last_used = time.time()
+            self._sessions.move_to_end(session_id)
+            self._evict_overflow()
+            return session
+
+    def remove(self, session_id: str) -> bool:
+        """Forget a session in memory and on disk. Returns True if it existed."""
+        if not session_id or not _SESSION_ID_PATTERN.match(session_id):
+            return False
+        with self._lock:
+            removed = self._sessions.pop(session_id, None) is not None
+            return self._remove_spill_file(session_id) or removed
+
+    def stats(self) -> dict:
+        """Session counts and eviction counters"""
+        return {
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "ttl_seconds": self.ttl_seconds,
+            "spill_dir": self.spill_dir,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "spilled": self.spilled,
+            "restored": self.restored,
+        }
+
+
+# Global instance
+_session_store: Optional[GazeSessionStore] = None
+
+def get_gaze_session_store() -> GazeSessionStore:
+    """Get or create the global gaze session store"""
+    global _session_store
+    if _session_store is None:
+        _session_store = GazeSessionStore()
+    return _session_store
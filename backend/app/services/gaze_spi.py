@@ -0,0 +1,45 @@
+"""
+Running Social Preference Index (SPI) counters for a gaze stream.
+
+The screening video shows social scenes on the left half of the screen and
+geometric patterns on the right half, so a predicted gaze point is social
+when x < GAZE_SOCIAL_REGION_MAX_X (the same rule the frontend applies).
+Counting as predictions arrive makes the final SPI available in O(1).
+"""
+import os
+
+# Normalized x below which a gaze point is on the social side
+GAZE_SOCIAL_REGION_MAX_X = float(os.getenv("GAZE_SOCIAL_REGION_MAX_X", "0.5"))
+
+
+def is_social_region(x: float, y: float = 0.5) -> bool:
+    """True if a normalized gaze point falls on the social (left) side"""
+    return x < GAZE_SOCIAL_REGION_MAX_X
+
+
+class SPIAccumulator:
+    """SPI = (social_frames - geometric_frames) / total_valid_frames, updated per point"""
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.social_frames = 0
+        self.geometric_frames = 0
+
+    def add(self, x: float, y: float) -> bool:
+        """Count one valid gaze point. Returns whether it was social."""
+        social = is_social_region(x, y)
+        if social:
+            self.social_frames += 1
+        else:
+            self.geometric_frames += 1
+        return social
+
+    @property
+    def total_valid_frames(self) -> int:
+        return self.social_frames + self.geometric_frames
+
+    @property
+    def spi(self) -> float:
+        total = self.total_valid_frames
+        return (self.social_frames - self.geometric_frames) / total if total else 0.0
@@ -3,15 +3,20 @@ Gaze tracking service using EyeTrax library
 Based on https://github.com/ck-zhang/EyeTrax
 Uses EyeTrax's GazeEstimator, extract_features, train, and predict methods
 """
-import cv2
 import numpy as np
-from typing import Optional, List, Tuple, Dict
+from typing import Callable, Optional, List, Tuple, Dict
 import base64
 from io import BytesIO
 from PIL import Image
 import os
 import sys
-import pickle
+import threading
+import time
+from app.services.gaze_features import GAZE_EXTRACT_WORKERS, FeatureExtractorPool
+from app.services.gaze_model import LinearGazeModel, migrate_pickle
+from app.services.gaze_protocol import decode_frame
+from app.services.gaze_roi import GAZE_ROI_ENABLED, FaceROITracker, to_bgr
+from app.services.gaze_sessions import GazeSession, new_session_id
 
 # Add tf_env to path to ensure EyeTrax can be imported
 tf_env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'tf_env', 'Lib', 'site-packages')
@@ -67,10 +72,21 @@ class GazeTrackingService:
     def __init__(self):
         self.estimator: Optional[GazeEstimator] = None
         self.is_calibrated = False
-        self.model_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "models", "gaze_model.pkl")
+        models_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "models")
+        self.model_path = os.path.join(models_dir, "gaze_model.npy")
+        # Written by earlier versions; migrated to model_path on first start
+        self.legacy_model_path = os.path.join(models_dir, "gaze_model.pkl")
+        # Flat copy of the shared calibration used for prediction (app.services.gaze_model)
+        self.gaze_model: Optional[LinearGazeModel] = None
         # Default screen dimensions (will be set from frontend)
         self.screen_width = 1920
         self.screen_height = 1080
+        # EyeTrax's estimator (MediaPipe FaceMesh + blink history) is not thread-safe;
+        # requests now run on the inference thread pool, so serialize access to it
+        self._lock = threading.Lock()
+        self._extractor_pool: Optional[FeatureExtractorPool] = None
+        # Face-tracking crop before extraction (app.services.gaze_roi); one tracker per session
+        self.roi_enabled = GAZE_ROI_ENABLED
     
     def initialize(self) -> bool:
         """Initialize the EyeTrax GazeEstimator"""
@@ -84,14 +100,16 @@ class GazeTrackingService:
             print("✓ EyeTrax GazeEstimator initialized successfully")
             
             # Try to load existing model if available
-            if os.path.exists(self.model_path):
+            if not os.path.exists(self.model_path) and os.path.exists(self.legacy_model_path):
                 try:
-                    self._load_model(self.model_path)
-                    self.is_calibrated = True
-                    print(f"✓ Loaded existing gaze model from {self.model_path}")
+                    migrate_pickle(self.legacy_model_path, self.model_path)
+                    print(f"✓ Migrated gaze model {self.legacy_model_path} to {self.model_path}")
                 except Exception as e:
-                    print(f"Could not load existing model: {e}")
-                    self.is_calibrated = False
+                    print(f"Could not migrate pickled gaze model: {e}")
+            if os.path.exists(self.model_path):
+                self.is_calibrated = self._load_model(self.model_path)
+                if self.is_calibrated:
+                    print(f"✓ Loaded existing gaze model from {self.model_path}")
             else:
                 print("No existing model found - calibration required")
             
@@ -104,25 +122,13 @@ class GazeTrackingService:
     
     def _save_model(self, path: str) -> bool:
         """
-        Save the EyeTrax model using pickle.
+        Save the calibrated model in the flat .npy format (app.services.gaze_model).
         EyeTrax's GazeEstimator doesn't have save_model method, so we save manually.
         """
         try:
-            if not self.estimator or not self.is_calibrated:
+            if not self.estimator or not self.is_calibrated or self.gaze_model is None:
                 return False
-            
-            # Save model, scaler, and variable_scaling
-            model_data = {
-                'model': self.estimator.model,
-                'scaler': self.estimator.scaler,
-                'variable_scaling': self.estimator.variable_scaling,
-                'screen_width': self.screen_width,
-                'screen_height': self.screen_height
-            }
-            
-            with open(path, 'wb') as f:
-                pickle.dump(model_data, f)
-            
+            self.gaze_model.save(path)
             return True
         except Exception as e:
             print(f"Error saving model: {e}")
@@ -132,19 +138,13 @@ class GazeTrackingService:
     
     def _load_model(self, path: str) -> bool:
         """
-        Load the EyeTrax model using pickle.
+        Load a model saved by _save_model (no pickle involved).
         EyeTrax's GazeEstimator doesn't have load_model method, so we load manually.
         """
         try:
-            with open(path, 'rb') as f:
-                model_data = pickle.load(f)
-            
-            self.estimator.model = model_data['model']
-            self.estimator.scaler = model_data['scaler']
-            self.estimator.variable_scaling = model_data.get('variable_scaling', None)
-            self.screen_width = model_data.get('screen_width', 1920)
-            self.screen_height = model_data.get('screen_height', 1080)
-            
+            self.gaze_model = LinearGazeModel.load(path)
+            self.screen_width = self.gaze_model.screen_width
+            self.screen_height = self.gaze_model.screen_height
             return True
         except Exception as e:
             print(f"Error loading model: {e}")
@@ -157,6 +157,11 @@ class GazeTrackingService:
         Convert base64 string to OpenCV image (BGR format).
         EyeTrax's extract_features expects BGR format images.
         """
+        image_np, layout = self._decode_base64_array(base64_string)
+        return to_bgr(image_np, layout)
+    
+    def _decode_base64_array(self, base64_string: str) -> Tuple[np.ndarray, str]:
+        """Decode a base64 image to a numpy array and its channel layout (rgb, rgba or gray), unconverted"""
         try:
             # Remove data URL prefix if present
             if ',' in base64_string:
@@ -168,75 +173,43 @@ class GazeTrackingService:
             # Convert to RGB numpy array
             image_np = np.array(image)
             
-            # Handle different image formats and convert to BGR (EyeTrax requirement)
+            # Conversion to BGR (EyeTrax requirement) is left to the caller,
+            # so a face crop only converts the pixels it keeps
             if len(image_np.shape) == 2:  # Grayscale
-                image_np = cv2.cvtColor(image_np, cv2.COLOR_GRAY2BGR)
-            elif len(image_np.shape) == 3:
-                if image_np.shape[2] == 4:  # RGBA
-                    image_np = cv2.cvtColor(image_np, cv2.COLOR_RGBA2BGR)
-                elif image_np.shape[2] == 3:  # RGB
-                    image_np = cv2.cvtColor(image_np, cv2.COLOR_RGB2BGR)
-            
-            return image_np
+                return image_np, "gray"
+            if len(image_np.shape) == 3 and image_np.shape[2] == 4:  # RGBA
+                return image_np, "rgba"
+            return image_np, "rgb"
         except Exception as e:
             print(f"Error converting base64 to image: {e}")
             import traceback
             traceback.print_exc()
             raise
     
-    def predict_gaze(self, frame_base64: str) -> Optional[Tuple[float, float]]:
+    def predict_gaze(self, frame_base64: str, session: Optional[GazeSession] = None,
+                     seq: Optional[int] = None) -> Optional[Tuple[float, float]]:
         """
-        Predict gaze coordinates from a frame using EyeTrax.
-        
-        Uses EyeTrax's extract_features and predict methods (same as EyeTrax demo):
-        - extract_features(image) -> (features, blink_detected)
-        - predict([features]) -> array of predictions in screen pixel coordinates
-        
+        Predict gaze coordinates from a base64 encoded frame using EyeTrax.
         Returns normalized coordinates (0-1) or None if prediction fails.
         """
-        if not self.estimator:
-            print("ERROR: GazeEstimator not initialized")
-            return None
-            
-        if not self.is_calibrated:
+        if session is None and not self.is_calibrated:
             print("WARNING: Model not calibrated, cannot predict gaze")
             return None
-        
-        try:
-            # Convert base64 to BGR image (EyeTrax requirement)
-            frame = self.base64_to_image(frame_base64)
-            
-            # Use EyeTrax's extract_features method (same as in EyeTrax demo line 92)
-            features, blink_detected = self.estimator.extract_features(frame)
-            
-            if features is not None and not blink_detected:
-                # Use EyeTrax's predict method - expects array of features (same as EyeTrax demo line 94)
-                predictions = self.estimator.predict(np.array([features]))
-                x, y = predictions[0]  # Get first prediction (matching EyeTrax demo line 95)
-                
-                # EyeTrax predict returns screen pixel coordinates
-                # Convert to normalized (0-1) for frontend
-                x_norm = float(x) / self.screen_width
-                y_norm = float(y) / self.screen_height
-                
-                # Clamp to 0-1 range
-                x_norm = max(0.0, min(1.0, x_norm))
-                y_norm = max(0.0, min(1.0, y_norm))
-                
-                return (x_norm, y_norm)
-            else:
-                if features is None:
-                    print("DEBUG: No face detected in frame")
-                elif blink_detected:
-                    print("DEBUG: Blink detected, skipping prediction")
-            return None
-        except Exception as e:
-            print(f"ERROR: Error predicting gaze with EyeTrax: {e}")
-            import traceback
-            traceback.print_exc()
+        return self.analyze_frame(frame_base64, session, seq)["gaze"]
+    
+    def predict_gaze_image(self, frame: np.ndarray, session: Optional[GazeSession] = None,
+                           seq: Optional[int] = None) -> Optional[Tuple[float, float]]:
+        """
+        Predict gaze coordinates from an already decoded BGR frame using EyeTrax.
+        Returns normalized coordinates (0-1) or None if prediction fails.
+        """
+        if session is None and not self.is_calibrated:
+            print("WARNING: Model not calibrated, cannot predict gaze")
             return None
+        return self.analyze_frame_image(frame, session, seq)["gaze"]
 
-    def check_frame(self, frame_base64: str) -> Dict[str, bool]:
+    def check_frame(self, frame_base64: str, session: Optional[GazeSession] = None,
+                    seq: Optional[int] = None) -> Dict[str, bool]:
         """
         Lightweight per-frame check using EyeTrax only.
         Returns whether a face is detected and whether a blink is detected.
@@ -245,48 +218,232 @@ class GazeTrackingService:
         - features is None => no face detected
         - blink_detected True => blink detected
         """
+        result = self.analyze_frame(frame_base64, session, seq, predict=False)
+        return {"face_detected": result["face_detected"], "blink_detected": result["blink_detected"]}
+
+    def analyze_frame(self, frame_base64: str, session: Optional[GazeSession] = None, seq: Optional[int] = None,
+                      predict: bool = True) -> Dict[str, object]:
+        """analyze_frame_image for a base64 encoded frame; a feature cache hit skips the decode too"""
+        return self._analyze(lambda: self._decode_base64_array(frame_base64), session, seq, predict)
+
+    def analyze_frame_image(self, frame: np.ndarray, session: Optional[GazeSession] = None, seq: Optional[int] = None,
+                            predict: bool = True) -> Dict[str, object]:
+        """
+        Face/blink status and gaze prediction from a single EyeTrax extraction.
+
+        Uses EyeTrax's extract_features and predict methods (same as EyeTrax demo):
+        - extract_features(image) -> (features, blink_detected)
+        - predict([features]) -> array of predictions in screen pixel coordinates
+
+        With a session, its own calibrated model maps the features to the screen;
+        otherwise the shared (global) model does. With a session and a frame
+        sequence number, the extraction is cached so a later call for the same
+        frame (e.g. /check then /predict) reuses it.
+
+        Returns {"face_detected", "blink_detected", "gaze": normalized (x, y) or None}.
+        """
+        return self._analyze(lambda: (frame, "bgr"), session, seq, predict)
+
+    def analyze_frame_message(self, message: bytes, session: Optional[GazeSession] = None, seq: Optional[int] = None,
+                              predict: bool = True) -> Dict[str, object]:
+        """
+        analyze_frame_image for a binary protocol message, decoded on the
+        calling (inference) thread. Raises FrameDecodeError on a malformed payload.
+        """
+        return self.analyze_frame_image(decode_frame(message)[1], session, seq, predict)
+
+    def _get_roi_tracker(self, session: Optional[GazeSession]) -> Optional[FaceROITracker]:
+        # A tracker follows one child's face; without a session, frames of different clients
+        # cannot be told apart, so they take the full-frame path
+        if not self.roi_enabled or session is None:
+            return None
+        if session.roi_tracker is None:
+            session.roi_tracker = FaceROITracker()
+        return session.roi_tracker
+
+    def _extract_features(self, frame: np.ndarray) -> Tuple[Optional[np.ndarray], bool]:
+        # Use EyeTrax's extract_features method (same as in EyeTrax demo line 92)
+        with self._lock:
+            return self.estimator.extract_features(frame)
+
+    def _extract_cached(self, load_frame: Callable[[], Tuple[np.ndarray, str]], session: Optional[GazeSession],
+                        seq: Optional[int]) -> Tuple[Optional[np.ndarray], bool]:
+        cache = session.feature_cache if session is not None and seq is not None else None
+        if cache is not None:
+            cached = cache.get(seq)
+            if cached is not None:
+                return cached
+        image, layout = load_frame()
+        tracker = self._get_roi_tracker(session)
+        if tracker is not None:
+            result = tracker.extract(image, layout, self._extract_features)
+        else:
+            result = self._extract_features(to_bgr(image, layout))
+        if cache is not None:
+            cache.put(seq, result)
+        return result
+
+    def _analyze(self, load_frame: Callable[[], Tuple[np.ndarray, str]], session: Optional[GazeSession], seq: Optional[int],
+                 predict: bool) -> Dict[str, object]:
+        result = {"face_detected": False, "blink_detected": False, "gaze": None}
         if not self.estimator:
-            return {"face_detected": False, "blink_detected": False}
+            print("ERROR: GazeEstimator not initialized")
+            return result
 
         try:
-            frame = self.base64_to_image(frame_base64)
-            features, blink_detected = self.estimator.extract_features(frame)
-            face_detected = features is not None
-            return {
-                "face_detected": bool(face_detected),
-                "blink_detected": bool(blink_detected) if face_detected else False,
-            }
+            features, blink_detected = self._extract_cached(load_frame, session, seq)
         except Exception as e:
-            print(f"ERROR: check_frame failed: {e}")
+            print(f"ERROR: Error extracting gaze features with EyeTrax: {e}")
+            import traceback
+            traceback.print_exc()
+            return result
+
+        result["face_detected"] = features is not None
+        result["blink_detected"] = bool(blink_detected) if features is not None else False
+        if not predict:
+            return result
+        if session is None and not self.is_calibrated:
+            print("WARNING: Model not calibrated, cannot predict gaze")
+            return result
+        if features is None:
+            print("DEBUG: No face detected in frame")
+            return result
+        if blink_detected:
+            print("DEBUG: Blink detected, skipping prediction")
+            return result
+
+        try:
+            # Use EyeTrax's predict method - expects array of features (same as EyeTrax demo line 94)
+            if session is not None:
+                predictions = session.predict(np.array([features]))
+                screen_width, screen_height = session.screen_width, session.screen_height
+            else:
+                gaze_model = self.gaze_model
+                predictions = gaze_model.predict(np.array([features]))
+                screen_width, screen_height = gaze_model.screen_width, gaze_model.screen_height
+            x, y = predictions[0]  # Get first prediction (matching EyeTrax demo line 95)
+
+            # EyeTrax predict returns screen pixel coordinates
+            # Convert to normalized (0-1) for frontend, clamped to 0-1 range
+            x_norm = max(0.0, min(1.0, float(x) / screen_width))
+            y_norm = max(0.0, min(1.0, float(y) / screen_height))
+            result["gaze"] = (x_norm, y_norm)
+        except Exception as e:
+            print(f"ERROR: Error predicting gaze with EyeTrax: {e}")
             import traceback
             traceback.print_exc()
-            return {"face_detected": False, "blink_detected": False}
+        return result
     
-    def calibrate_with_frames(self, calibration_data: List[Dict], screen_width: int = 1920, screen_height: int = 1080) -> bool:
+    def _get_extractor_pool(self) -> FeatureExtractorPool:
+        """Worker pool with one EyeTrax estimator per thread, created on first calibration"""
+        if self._extractor_pool is None:
+            with self._lock:
+                if self._extractor_pool is None:
+                    self._extractor_pool = FeatureExtractorPool(GazeEstimator, GAZE_EXTRACT_WORKERS)
+        return self._extractor_pool
+    
+    def _decode_stream_frame(self, frame) -> np.ndarray:
+        if isinstance(frame, np.ndarray):
+            return frame
+        if isinstance(frame, (bytes, bytearray)):
+            return decode_frame(frame)[1]
+        return self.base64_to_image(frame)
+    
+    def extract_features_batch(self, frames: List, context: str = "stream frame",
+                               stream: Optional[object] = None, single_worker: bool = False) -> Tuple[List, Dict]:
         """
-        Perform 9-point calibration with collected frames using EyeTrax.
+        Extract EyeTrax features for a batch of frames (base64 strings, binary
+        protocol messages or BGR arrays) on the extractor pool. Batches passing
+        the same stream key continue one estimator state (see FeatureExtractorPool);
+        single_worker keeps a small batch on one worker thread.
+        Returns one (features, blink) or None per frame, in order, and the timings.
+        """
+        return self._get_extractor_pool().extract(frames, self._decode_stream_frame, context, stream, single_worker)
+    
+    def analyze_frames_batch(self, frames: List, session: Optional[GazeSession] = None,
+                             predict: bool = True, context: str = "batch frame",
+                             stream: Optional[object] = None) -> Tuple[List[Dict[str, object]], Dict]:
+        """
+        analyze_frame_image for N buffered frames (base64 strings, binary
+        protocol messages or BGR arrays): features are extracted on the
+        extractor pool, then the usable rows go through one vectorized
+        predict + normalize + clip over an (N, d) matrix. context and stream
+        are passed to extract_features_batch.
+        Returns one result dict per frame, in order, and the timings.
+        """
+        analyses = [{"face_detected": False, "blink_detected": False, "gaze": None} for _ in frames]
+        if not self.estimator or not frames:
+            return analyses, {"frames": len(frames)}
         
-        Uses EyeTrax's calibration point calculation, extract_features and train methods:
-        - calculate_9_point_calibration_targets() -> 9 calibration points (from EyeTrax logic)
-        - extract_features(image) -> (features, blink_detected)
-        - train(X, y) where X is array of features and y is array of target coordinates
+        results, timings = self.extract_features_batch(frames, context, stream)
+        usable, rows = [], []
+        for index, result in enumerate(results):
+            if result is None:
+                continue
+            features, blink = result
+            analyses[index]["face_detected"] = features is not None
+            analyses[index]["blink_detected"] = bool(blink) if features is not None else False
+            if features is not None and not blink:
+                usable.append(index)
+                rows.append(features)
+        
+        if not predict or not rows or (session is None and not self.get_calibration_status()):
+            return analyses, timings
+        
+        started = time.perf_counter()
+        try:
+            gaze_model = session.model if session is not None else self.gaze_model
+            points = gaze_model.predict(np.stack(rows))
+            # Screen pixels -> normalized (0-1), clamped
+            points = np.clip(points / (gaze_model.screen_width, gaze_model.screen_height), 0.0, 1.0)
+            for index, (x, y) in zip(usable, points.tolist()):
+                analyses[index]["gaze"] = (x, y)
+        except Exception as e:
+            print(f"ERROR: Error predicting gaze batch with EyeTrax: {e}")
+            import traceback
+            traceback.print_exc()
+        timings["predict_ms"] = (time.perf_counter() - started) * 1000.0
+        return analyses, timings
+    
+    def predict_gaze_batch(self, frames: List, session: Optional[GazeSession] = None
+                           ) -> Tuple[List[Optional[Tuple[float, float]]], Dict]:
+        """predict_gaze for N buffered frames; one normalized (x, y) or None per frame, and the timings"""
+        analyses, timings = self.analyze_frames_batch(frames, session)
+        return [analysis["gaze"] for analysis in analyses], timings
+    
+    def _decode_calibration_frame(self, cal_point: Dict) -> Optional[np.ndarray]:
+        frame_base64 = cal_point.get('frame', '')
+        if not frame_base64 or len(frame_base64) < 100:  # Check if frame data is valid
+            print("Calibration frame: Invalid or empty frame data")
+            return None
+        return self.base64_to_image(frame_base64)
+    
+    def collect_calibration_samples(self, calibration_data: List[Dict], screen_width: int = 1920,
+                                    screen_height: int = 1080) -> Optional[Tuple[np.ndarray, np.ndarray, Dict]]:
+        """
+        Extract EyeTrax features from calibration frames on the extractor pool.
         
         calibration_data: List of dicts with keys: 'frame', 'target_x', 'target_y'
         target_x, target_y are normalized coordinates (0-1) from frontend
+        
+        Returns (X, y, timings) with X the feature rows, y the targets in screen
+        pixels and the per-stage timings, or None if fewer than 9 usable frames
+        were found.
         """
         if not self.estimator:
             print("ERROR: Estimator not initialized")
-            return False
+            return None
         
         try:
-            self.screen_width = screen_width
-            self.screen_height = screen_height
             print(f"Calibration screen size: {screen_width}x{screen_height}")
             
             # Calculate 9-point calibration targets using EyeTrax's logic
             calibration_points_px = calculate_9_point_calibration_targets(screen_width, screen_height)
             print(f"9-point calibration targets (pixels): {calibration_points_px}")
             
+            # Extract features in parallel; results come back in the order of calibration_data
+            results, timings = self._get_extractor_pool().extract(calibration_data, self._decode_calibration_frame)
+            
             # Collect features and targets from calibration data using EyeTrax
             features_list = []
             targets_list = []
@@ -294,76 +451,92 @@ class GazeTrackingService:
             blink_detected_count = 0
             successful_extractions = 0
             
-            for idx, cal_point in enumerate(calibration_data):
-                frame_base64 = cal_point.get('frame', '')
+            for idx, (cal_point, result) in enumerate(zip(calibration_data, results)):
+                if result is None:
+                    continue
+                features, blink = result
                 target_x_norm = cal_point.get('target_x', 0.0)  # Normalized (0-1)
                 target_y_norm = cal_point.get('target_y', 0.0)  # Normalized (0-1)
                 
-                if not frame_base64 or len(frame_base64) < 100:  # Check if frame data is valid
-                    print(f"Frame {idx}: Invalid or empty frame data")
-                    continue
-                
-                try:
-                    # Convert to BGR image
-                    frame = self.base64_to_image(frame_base64)
+                if features is not None and not blink:
+                    features_list.append(features)
+                    # Convert normalized coordinates to screen pixel coordinates
+                    # EyeTrax train expects pixel coordinates (as used in run_9_point_calibration)
+                    target_x_px = target_x_norm * screen_width
+                    target_y_px = target_y_norm * screen_height
+                    targets_list.append([target_x_px, target_y_px])
+                    successful_extractions += 1
                     
-                    if frame is None or frame.size == 0:
-                        print(f"Frame {idx}: Failed to convert base64 to image")
-                        continue
-                    
-                    # Use EyeTrax's extract_features method (same as EyeTrax calibration)
-                    features, blink = self.estimator.extract_features(frame)
-                    
-                    if features is not None and not blink:
-                        features_list.append(features)
-                        # Convert normalized coordinates to screen pixel coordinates
-                        # EyeTrax train expects pixel coordinates (as used in run_9_point_calibration)
-                        target_x_px = target_x_norm * screen_width
-                        target_y_px = target_y_norm * screen_height
-                        targets_list.append([target_x_px, target_y_px])
-                        successful_extractions += 1
-                        
-                        if idx % 30 == 0:  # Log every 30th frame
-                            print(f"Frame {idx}: Features extracted successfully, target=({target_x_px:.0f}, {target_y_px:.0f})")
-                    elif features is None:
-                        face_not_detected_count += 1
-                        if idx % 30 == 0:
-                            print(f"Frame {idx}: No face detected")
-                    elif blink:
-                        blink_detected_count += 1
-                        if idx % 30 == 0:
-                            print(f"Frame {idx}: Blink detected")
-                except Exception as e:
-                    print(f"Error processing calibration frame {idx}: {e}")
-                    import traceback
-                    traceback.print_exc()
-                    continue
+                    if idx % 30 == 0:  # Log every 30th frame
+                        print(f"Frame {idx}: Features extracted successfully, target=({target_x_px:.0f}, {target_y_px:.0f})")
+                elif features is None:
+                    face_not_detected_count += 1
+                    if idx % 30 == 0:
+                        print(f"Frame {idx}: No face detected")
+                elif blink:
+                    blink_detected_count += 1
+                    if idx % 30 == 0:
+                        print(f"Frame {idx}: Blink detected")
             
             print(f"Calibration feature extraction summary:")
             print(f"  - Successful extractions: {successful_extractions}")
             print(f"  - Face not detected: {face_not_detected_count}")
             print(f"  - Blink detected: {blink_detected_count}")
             print(f"  - Total frames processed: {len(calibration_data)}")
+            print(f"  - Extraction: {timings['wall_ms']:.0f} ms on {timings['workers']} worker(s) "
+                  f"(decode {timings['decode_ms']:.0f} ms, extract {timings['extract_ms']:.0f} ms summed)")
             
             if len(features_list) < 9:  # Need at least 9 samples (one per calibration point)
                 print(f"ERROR: Not enough calibration samples: {len(features_list)} (need at least 9)")
                 print(f"Please ensure your face is clearly visible to the webcam during calibration")
-                return False
+                return None
             
-            print(f"Training EyeTrax model with {len(features_list)} calibration samples...")
+            return np.array(features_list), np.array(targets_list), timings
+        except Exception as e:
+            print(f"ERROR: Error collecting calibration samples: {e}")
+            import traceback
+            traceback.print_exc()
+            return None
+    
+    def calibrate_with_frames(self, calibration_data: List[Dict], screen_width: int = 1920, screen_height: int = 1080) -> bool:
+        """
+        Perform 9-point calibration of the shared (global) model with collected frames using EyeTrax.
+        
+        Uses EyeTrax's calibration point calculation, extract_features and train methods:
+        - calculate_9_point_calibration_targets() -> 9 calibration points (from EyeTrax logic)
+        - extract_features(image) -> (features, blink_detected)
+        - train(X, y) where X is array of features and y is array of target coordinates
+        
+        calibration_data: List of dicts with keys: 'frame', 'target_x', 'target_y'
+        target_x, target_y are normalized coordinates (0-1) from frontend
+        """
+        samples = self.collect_calibration_samples(calibration_data, screen_width, screen_height)
+        if samples is None:
+            return False
+        X, y, _ = samples
+        return self.train_global_model(X, y, screen_width, screen_height)
+    
+    def train_global_model(self, X: np.ndarray, y: np.ndarray, screen_width: int, screen_height: int) -> bool:
+        """Train the shared EyeTrax model on extracted samples and persist it to model_path"""
+        try:
+            print(f"Training EyeTrax model with {len(X)} calibration samples...")
             
             # Train the model using EyeTrax's train method
             # This is the same method used in run_9_point_calibration
-            X = np.array(features_list)
-            y = np.array(targets_list)
-            
             # EyeTrax train method signature: train(X, y, alpha=1.0, variable_scaling=None)
-            self.estimator.train(X, y)
-            self.is_calibrated = True
+            with self._lock:
+                self.estimator.train(X, y)
+                self.gaze_model = LinearGazeModel.from_sklearn(
+                    self.estimator.model, self.estimator.scaler, self.estimator.variable_scaling,
+                    screen_width, screen_height
+                )
+                self.screen_width = screen_width
+                self.screen_height = screen_height
+                self.is_calibrated = True
             
-            print(f"✓ EyeTrax model trained successfully with {len(features_list)} samples")
+            print(f"✓ EyeTrax model trained successfully with {len(X)} samples")
             
-            # Save model using pickle
+            # Save the flat model next to the service (shared by all workers)
             try:
                 os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
                 if self._save_model(self.model_path):
@@ -383,12 +556,54 @@ class GazeTrackingService:
             traceback.print_exc()
             return False
     
+    def calibrate_session(self, calibration_data: List[Dict], screen_width: int = 1920,
+                          screen_height: int = 1080, update_global: bool = False) -> Optional[GazeSession]:
+        """
+        Train a calibration that belongs to one session instead of the shared model.
+        Fits fresh copies of EyeTrax's scaler and ridge regressor the same way
+        GazeEstimator.train does, and returns the GazeSession (not yet stored).
+        With update_global the same samples also retrain the shared model,
+        for clients that predict without a session id.
+        """
+        samples = self.collect_calibration_samples(calibration_data, screen_width, screen_height)
+        if samples is None:
+            return None
+        X, y, timings = samples
+        return self.train_session(X, y, screen_width, screen_height, timings, update_global)
+    
+    def train_session(self, X: np.ndarray, y: np.ndarray, screen_width: int, screen_height: int,
+                      timings: Optional[Dict] = None, update_global: bool = False) -> Optional[GazeSession]:
+        """Fit a session model on extracted samples (see calibrate_session)"""
+        if update_global:
+            self.train_global_model(X, y, screen_width, screen_height)
+        
+        timings = dict(timings or {})
+        try:
+            from sklearn.base import clone
+            
+            started = time.perf_counter()
+            scaler = clone(self.estimator.scaler)
+            model = clone(self.estimator.model)
+            model.fit(scaler.fit_transform(X), y)
+            timings["train_ms"] = (time.perf_counter() - started) * 1000.0
+            print(f"✓ Session gaze model trained with {len(X)} samples")
+            session = GazeSession(
+                new_session_id(), LinearGazeModel.from_sklearn(model, scaler, None, screen_width, screen_height)
+            )
+            session.calibration_timings = timings
+            return session
+        except Exception as e:
+            print(f"ERROR: Error calibrating session: {e}")
+            import traceback
+            traceback.print_exc()
+            return None
+    
     def get_calibration_status(self) -> bool:
         """Check if the EyeTrax estimator is calibrated"""
-        return self.is_calibrated and self.estimator is not None and self.estimator.model is not None
+        return self.is_calibrated and self.estimator is not None and self.gaze_model is not None
     
     def save_model(self, path: Optional[str] = None) -> bool:
-        """Save the calibrated EyeTrax model using pickle"""
+        """Save the calibrated EyeTrax model (flat .npy format)"""
         if not self.estimator or not self.is_calibrated:
             return False
         
@@ -0,0 +1,125 @@
+"""
+Reduced-cost decoding of uploaded facial images.
+One decode produces everything the facial pipeline needs: the small
+RGB/grayscale images used for face detection and quality checks, and the
+working image the 224x224 model input (whole frame or face crop) is cut
+from. JPEGs are decoded directly at 1/2, 1/4 or 1/8 scale (libjpeg DCT
+scaling via PIL's draft mode), so a 12MP phone photo is never materialized
+at full resolution.
+"""
+import io
+import os
+from typing import Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from app.services.face_detector import FACE_DETECTION_MAX_SIDE, downscale
+
+# Decode configuration
+# FACIAL_MAX_IMAGE_PIXELS: uploads whose header declares more pixels are rejected before decoding
+# FACIAL_DECODE_MAX_SIDE: working resolution the upload is decoded/reduced to
+FACIAL_MAX_IMAGE_PIXELS = int(os.getenv("FACIAL_MAX_IMAGE_PIXELS", "50000000"))
+FACIAL_DECODE_MAX_SIDE = int(os.getenv("FACIAL_DECODE_MAX_SIDE", "1024"))
+MODEL_INPUT_SIZE = 224
+
+
+class ImageTooLargeError(ValueError):
+    """Raised when an upload exceeds FACIAL_MAX_IMAGE_PIXELS"""
+    pass
+
+
+class DecodedImage:
+    """
+    Result of decode_upload.
+
+    original_size:   (width, height) declared by the file header
+    working:         RGB PIL image at <= FACIAL_DECODE_MAX_SIDE
+    detection_rgb:   RGB uint8 array at <= FACE_DETECTION_MAX_SIDE
+    detection_gray:  grayscale version of detection_rgb
+    detection_scale: multiply detection coordinates by this to get original coordinates
+
+    The 224x224 model input is built on demand, either from the whole frame
+    (full_frame_input) or from the detected face (crop_face).
+    """
+    def __init__(self, original_size, working, detection_rgb, detection_gray, detection_scale):
+        self.original_size = original_size
+        self.working = working
+        self.detection_rgb = detection_rgb
+        self.detection_gray = detection_gray
+        self.detection_scale = detection_scale
+
+    @property
+    def width(self) -> int:
+        return self.original_size[0]
+
+    @property
+    def height(self) -> int:
+        return self.original_size[1]
+
+    def full_frame_input(self) -> Image.Image:
+        """Whole photo resized to 224x224 (the original preprocessing)"""
+        return self.working.resize((MODEL_INPUT_SIZE, MODEL_INPUT_SIZE), Image.BILINEAR)
+
+    def crop_face(self, box: Tuple[int, int, int, int], margin: float = 0.25) -> Image.Image:
+        """
+        Square crop around a face box (in detection coordinates), widened by
+        `margin` of the face size on every side, resized to 224x224.
+        """
+        x, y, w, h = box
+        scale = max(self.working.size) / float(max(self.detection_rgb.shape[:2]))
+        center_x = (x + w / 2.0) * scale
+        center_y = (y + h / 2.0) * scale
+        half = max(w, h) * scale * (1.0 + 2.0 * margin) / 2.0
+
+        width, height = self.working.size
+        left = max(0, int(round(center_x - half)))
+        top = max(0, int(round(center_y - half)))
+        right = min(width, int(round(center_x + half)))
+        bottom = min(height, int(round(center_y + half)))
+        if right - left < 2 or bottom - top < 2:
+            return self.full_frame_input()
+        face = self.working.crop((left, top, right, bottom))
+        return face.resize((MODEL_INPUT_SIZE, MODEL_INPUT_SIZE), Image.BILINEAR)
+
+
+def _fit(size: Tuple[int, int], max_side: int) -> Tuple[int, int]:
+    """Scale (width, height) so the longest side is at most max_side"""
+    width, height = size
+    longest = max(width, height)
+    if max_side <= 0 or longest <= max_side:
+        return width, height
+    factor = max_side / float(longest)
+    return max(1, int(round(width * factor))), max(1, int(round(height * factor)))
+
+
+def decode_upload(
+    contents: bytes,
+    max_pixels: int = FACIAL_MAX_IMAGE_PIXELS,
+    work_max_side: int = FACIAL_DECODE_MAX_SIDE,
+    detect_max_side: int = FACE_DETECTION_MAX_SIDE
+) -> DecodedImage:
+    """
+    Decode uploaded bytes once into the working and detection images.
+    Raises ImageTooLargeError if the header declares more than max_pixels.
+    """
+    image = Image.open(io.BytesIO(contents))
+    original_size = image.size  # read from the header, nothing decoded yet
+    if max_pixels > 0 and original_size[0] * original_size[1] > max_pixels:
+        raise ImageTooLargeError(
+            f"Image is {original_size[0]}x{original_size[1]} pixels; the limit is {max_pixels} pixels."
+        )
+
+    # JPEG: let libjpeg decode at the smallest 1/2^k scale still >= the working size
+    if image.format == "JPEG":
+        image.draft("RGB", _fit(original_size, work_max_side))
+    working = image.convert("RGB") if image.mode != "RGB" else image
+    working.load()
+    if max(working.size) > work_max_side:
+        working = working.resize(_fit(working.size, work_max_side), Image.BILINEAR, reducing_gap=2.0)
+
+    detection_rgb, _ = downscale(np.asarray(working), detect_max_side)
+    detection_gray = cv2.cvtColor(detection_rgb, cv2.COLOR_RGB2GRAY)
+    detection_scale = max(original_size) / float(max(detection_rgb.shape[:2]))
+    return DecodedImage(original_size, working, detection_rgb, detection_gray, detection_scale)
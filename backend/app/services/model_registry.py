@@ -0,0 +1,151 @@
+"""
+Registry of lazily loaded models.
+Models are registered with a loader and loaded on first use (thread-safe),
+or eagerly warmed up at startup so a worker only reports ready once its
+model has run a forward pass.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+# Entry states
+UNLOADED = "unloaded"
+LOADING = "loading"
+LOADED = "loaded"
+WARMING = "warming"
+READY = "ready"
+FAILED = "failed"
+
+
+class _ModelEntry:
+    def __init__(self, name: str, loader: Callable[[], Any], warmup: Optional[Callable[[Any], None]]):
+        self.name = name
+        self.loader = loader
+        self.warmup = warmup
+        self.model = None
+        self.state = UNLOADED
+        self.error: Optional[str] = None
+        self.load_ms: Optional[float] = None
+        self.warmup_ms: Optional[float] = None
+        self.version = 0
+        self.lock = threading.Lock()
+
+
+class ModelRegistry:
+    """
+    Named models with lazy, thread-safe first-use loading.
+
+    `get` loads the model on first call (concurrent callers wait for the same
+    load) and returns None if loading failed; the failure is remembered until
+    `reload` is called. `warmup` loads the model and runs its warm-up
+    callback, after which the entry is READY. `version` increases on every
+    (re)load so dependants such as caches can detect model changes.
+    """
+    def __init__(self):
+        self._entries: Dict[str, _ModelEntry] = {}
+
+    def register(self, name: str, loader: Callable[[], Any], warmup: Optional[Callable[[Any], None]] = None):
+        """Register a model loader (and optional warm-up callback) under a name"""
+        self._entries[name] = _ModelEntry(name, loader, warmup)
+
+    def _entry(self, name: str) -> _ModelEntry:
+        if name not in self._entries:
+            raise KeyError(f"Model '{name}' is not registered")
+        return self._entries[name]
+
+    def is_loaded(self, name: str) -> bool:
+        return self._entry(name).state in (LOADED, WARMING, READY)
+
+    def is_ready(self, name: str) -> bool:
+        return self._entry(name).state == READY
+
+    def state(self, name: str) -> str:
+        return self._entry(name).state
+
+    def version(self, name: str) -> int:
+        return self._entry(name).version
+
+    def get(self, name: str) -> Any:
+        """Return the model, loading it on first use. Returns None if loading failed."""
+        entry = self._entry(name)
+        if entry.model is not None or entry.state == FAILED:
+            return entry.model
+
+        with entry.lock:
+            # Another thread may have finished loading while we waited
+            if entry.model is not None or entry.state == FAILED:
+                return entry.model
+            entry.state = LOADING
+            started = time.perf_counter()
+            try:
+                model = entry.loader()
+            except Exception as e:
+                print(f"Warning: Could not load model '{name}': {e}")
+                entry.state = FAILED
+                entry.error = str(e)
+                return None
+            entry.load_ms = (time.perf_counter() - started) * 1000.0
+            entry.model = model
+            entry.error = None
+            entry.version += 1
+            entry.state = LOADED
+            print(f"✓ Model '{name}' loaded in {entry.load_ms:.0f} ms")
+            return model
+
+    def warmup(self, name: str) -> bool:
+        """Load the model if needed and run its warm-up callback. Returns True when ready."""
+        entry = self._entry(name)
+        model = self.get(name)
+        if model is None:
+            return False
+
+        with entry.lock:
+            if entry.state == READY:
+                return True
+            entry.state = WARMING
+            started = time.perf_counter()
+            try:
+                if entry.warmup is not None:
+                    entry.warmup(model)
+            except Exception as e:
+                # The model still works; it just has not been primed
+                print(f"Warning: Warm-up of model '{name}' failed: {e}")
+                entry.state = LOADED
+                entry.error = str(e)
+                return False
+            entry.warmup_ms = (time.perf_counter() - started) * 1000.0
+            entry.state = READY
+            print(f"✓ Model '{name}' warmed up in {entry.warmup_ms:.0f} ms")
+            return True
+
+    def reload(self, name: str):
+        """Drop the loaded model (or remembered failure); the next get() loads it again"""
+        entry = self._entry(name)
+        with entry.lock:
+            entry.model = None
+            entry.state = UNLOADED
+            entry.error = None
+
+    def status(self, name: Optional[str] = None) -> dict:
+        """State, error and timings of one model or of all registered models"""
+        if name is None:
+            return {n: self.status(n) for n in self._entries}
+        entry = self._entry(name)
+        return {
+            "state": entry.state,
+            "error": entry.error,
+            "load_ms": entry.load_ms,
+            "warmup_ms": entry.warmup_ms,
+            "version": entry.version,
+        }
+
+
+# Global instance
+_registry: Optional[ModelRegistry] = None
+
+def get_model_registry() -> ModelRegistry:
+    """Get or create the global model registry"""
+    global _registry
+    if _registry is None:
+        _registry = ModelRegistry()
+    return _registry
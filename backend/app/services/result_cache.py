@@ -0,0 +1,108 @@
+"""
+In-memory LRU/TTL cache of computed analysis results.
+Keyed by a digest of the uploaded bytes; only the computed result is
+stored, never the image itself.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+def content_digest(data: bytes) -> str:
+    """SHA-256 hex digest of uploaded bytes, used as the cache key"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class ResultCache:
+    """
+    Bounded LRU cache with per-entry time-to-live.
+
+    Every get/put carries a `generation` token (e.g. the model version);
+    when it differs from the token the cached entries were computed with,
+    the whole cache is dropped so results from an old model are never served.
+    max_entries=0 disables caching.
+    """
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 600.0):
+        self.max_entries = max(0, int(max_entries))
+        self.ttl_seconds = float(ttl_seconds)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._generation: Optional[Hashable] = None
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _check_generation(self, generation: Hashable):
+        # Caller holds the lock
+        if generation != self._generation:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._generation = generation
+
+    def get(self, key: str, generation: Hashable = None) -> Optional[Any]:
+        """Return the cached value, or None on miss/expiry"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            self._check_generation(generation)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: Any, generation: Hashable = None):
+        """Store a value, evicting the least recently used entries beyond max_entries"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._check_generation(generation)
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> int:
+        """Drop every entry. Returns how many were removed."""
+        with self._lock:
+            removed = len(self._entries)
+            self._entries.clear()
+            if removed:
+                self.invalidations += 1
+            return removed
+
+    def stats(self) -> dict:
+        """Size, hit rate and eviction counters"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
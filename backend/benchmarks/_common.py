@@ -0,0 +1,99 @@
+"""
+Shared helpers for the benchmark and evaluation scripts.
+Run the scripts from the backend directory, e.g. `python -m benchmarks.face_detection`.
+"""
+import os
+import random
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+# Dataset used by the facial model (see train_model.py)
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BACKEND_DIR.parent / "dataset" / "facial recognition" / "AutismDataset"
+
+
+def dataset_images(data_dir: Path = DATA_DIR, limit: int = 0, seed: int = 0) -> List[Tuple[str, int]]:
+    """
+    List (path, label) pairs from the AutismDataset layout (label 1 = Autistic).
+    A fixed seed shuffles the list so `limit` takes a stable mix of both classes.
+    """
+    data_dir = Path(data_dir)
+    samples = []
+    for folder, label in (("Autistic", 1), ("Non_Autistic", 0)):
+        for img_path in sorted((data_dir / folder).glob("*.jpg")):
+            samples.append((str(img_path), label))
+    random.Random(seed).shuffle(samples)
+    if limit:
+        samples = samples[:limit]
+    return samples
+
+
+def holdout_images(data_dir: Path = DATA_DIR, fraction: float = 0.2, limit: int = 0, seed: int = 0) -> List[Tuple[str, int]]:
+    """
+    Deterministic holdout: the last `fraction` of the seeded shuffle.
+    train_model.py uses the same 20% validation ratio but an unseeded split,
+    so this is a stable evaluation set rather than the exact training holdout.
+    """
+    samples = dataset_images(data_dir, seed=seed)
+    holdout = samples[len(samples) - int(len(samples) * fraction):]
+    if limit:
+        holdout = holdout[:limit]
+    return holdout
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[rank]
+
+
+def summarize(latencies_ms: List[float]) -> Dict[str, float]:
+    """Mean and p50/p95/p99 of a list of latencies in milliseconds"""
+    count = len(latencies_ms)
+    return {
+        "count": count,
+        "mean_ms": (sum(latencies_ms) / count) if count else 0.0,
+        "p50_ms": percentile(latencies_ms, 50),
+        "p95_ms": percentile(latencies_ms, 95),
+        "p99_ms": percentile(latencies_ms, 99),
+    }
+
+
+def time_call(fn: Callable, *args, **kwargs) -> Tuple[object, float]:
+    """Run fn once and return (result, elapsed milliseconds)"""
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - started) * 1000.0
+
+
+def rss_mb() -> float:
+    """Resident set size of this process in MB (psutil if installed, else getrusage peak)"""
+    try:
+        import psutil
+        return psutil.Process(os.getpid()).memory_info().rss / (1024 * 1024)
+    except ImportError:
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process since it started, in MB (getrusage)"""
+    import resource
+    import sys
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def print_table(rows: List[Dict[str, object]], columns: List[str]):
+    """Print a list of dicts as an aligned text table"""
+    def fmt(value):
+        return f"{value:.2f}" if isinstance(value, float) else str(value)
+    widths = {c: max(len(c), *(len(fmt(r.get(c, ""))) for r in rows)) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    print("  ".join("-" * widths[c] for c in columns))
+    for row in rows:
+        print("  ".join(fmt(row.get(c, "")).ljust(widths[c]) for c in columns))
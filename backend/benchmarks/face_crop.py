@@ -0,0 +1,101 @@
+"""
+Evaluate classifying a crop around the detected face versus the whole frame.
+
+For every holdout image the upload goes through decode_upload and the
+configured face detector, then the ViT classifies either the full frame or
+a margin-padded crop around the single detected face (images without
+exactly one face fall back to the full frame, as the API does). Each
+variant is also run on uploads the client downscaled to --upload-side, to
+check that smaller uploads keep their accuracy once the face is cropped.
+Reports accuracy, agreement with the full-frame prediction and the
+end-to-end latency (decode + detect + preprocess + forward).
+
+Usage (from backend/):
+    python -m benchmarks.face_crop --limit 200 --margin 0.25 --upload-side 320
+"""
+import argparse
+import io
+
+import torch
+from PIL import Image
+
+from app.models.vit_model import load_vit_model, predict_autism_risk
+from app.services.face_detector import get_face_detector
+from app.services.image_pipeline import decode_upload
+from benchmarks._common import holdout_images, print_table, summarize, time_call
+
+
+def encode_upload(path: str, max_side: int) -> bytes:
+    """Re-encode a dataset image as the client would upload it (JPEG, optionally downscaled)"""
+    image = Image.open(path).convert("RGB")
+    if max_side and max(image.size) > max_side:
+        image.thumbnail((max_side, max_side), Image.BILINEAR)
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def classify(model, device, contents: bytes, crop: bool, margin: float):
+    """Decode, detect and classify one upload. Returns (probability, cropped)."""
+    decoded = decode_upload(contents)
+    detector = get_face_detector()
+    faces = detector.detect(decoded.detection_rgb if detector.needs_color else decoded.detection_gray)
+    if crop and len(faces) == 1:
+        model_input, cropped = decoded.crop_face(faces[0], margin), True
+    else:
+        model_input, cropped = decoded.full_frame_input(), False
+    probability, _ = predict_autism_risk(model, model_input, device)
+    return probability, cropped
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--limit", type=int, default=0, help="cap the number of holdout images (0 = all)")
+    parser.add_argument("--margin", type=float, default=0.25, help="crop margin as a fraction of the face size")
+    parser.add_argument("--upload-side", type=int, default=320, help="longest side of the downscaled-upload variant")
+    args = parser.parse_args()
+
+    device = torch.device("cpu")
+    model = load_vit_model()
+    samples = holdout_images(limit=args.limit)
+    if not samples:
+        print("No holdout images found")
+        return
+
+    variants = [
+        ("full_frame", 0, False),
+        ("face_crop", 0, True),
+        (f"full_frame@{args.upload_side}", args.upload_side, False),
+        (f"face_crop@{args.upload_side}", args.upload_side, True),
+    ]
+    uploads = {side: [encode_upload(path, side) for path, _ in samples] for _, side, _ in variants}
+    classify(model, device, uploads[0][0], False, args.margin)  # warm-up
+
+    reference = None
+    rows = []
+    for name, side, crop in variants:
+        latencies, predictions, correct, cropped_count = [], [], 0, 0
+        for contents, (_, label) in zip(uploads[side], samples):
+            (probability, cropped), elapsed = time_call(classify, model, device, contents, crop, args.margin)
+            latencies.append(elapsed)
+            prediction = probability >= 0.5
+            predictions.append(prediction)
+            correct += int(prediction == bool(label))
+            cropped_count += int(cropped)
+        if reference is None:
+            reference = predictions
+        agreement = sum(a == b for a, b in zip(predictions, reference)) / len(samples)
+        rows.append({
+            "variant": name,
+            "accuracy": 100.0 * correct / len(samples),
+            "agreement": 100.0 * agreement,
+            "cropped": cropped_count,
+            **summarize(latencies),
+        })
+
+    print(f"{len(samples)} holdout images, margin {args.margin}")
+    print_table(rows, ["variant", "accuracy", "agreement", "cropped", "mean_ms", "p50_ms", "p95_ms"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Per-image latency of the face detection backends used by check_image_quality.
+
+Compares the legacy path (Haar cascade re-created on every call, full
+resolution) with the cached/downscaled detectors in app.services.face_detector.
+
+Usage (from backend/):
+    python -m benchmarks.face_detection --limit 200 --upscale 4
+"""
+import argparse
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from app.services.face_detector import FACE_DETECTORS, HaarFaceDetector, create_face_detector
+from benchmarks._common import DATA_DIR, dataset_images, print_table, summarize, time_call
+
+
+def legacy_haar(rgb: np.ndarray):
+    """The original check_image_quality detection: new cascade per call, full-resolution gray"""
+    bgr = cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+    gray = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY)
+    cascade = cv2.CascadeClassifier(HaarFaceDetector.cascade_path)
+    return cascade.detectMultiScale(gray, 1.1, 4)
+
+
+def load_images(limit: int, upscale: float):
+    images = []
+    for path, _ in dataset_images(DATA_DIR, limit=limit):
+        image = Image.open(path).convert("RGB")
+        if upscale != 1.0:
+            # Emulate large phone photos from the small dataset crops
+            image = image.resize((int(image.width * upscale), int(image.height * upscale)), Image.BICUBIC)
+        images.append(np.array(image))
+    return images
+
+
+def run(detect, images, needs_color: bool = True):
+    latencies, found = [], 0
+    for rgb in images:
+        image = rgb if needs_color else cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+        faces, elapsed = time_call(detect, image)
+        latencies.append(elapsed)
+        found += int(len(faces) > 0)
+    return latencies, found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--limit", type=int, default=100, help="number of dataset images")
+    parser.add_argument("--upscale", type=float, default=1.0, help="resize factor applied to each image")
+    parser.add_argument("--max-side", type=int, default=640, help="detector downscale target (0 = full resolution)")
+    parser.add_argument("--backends", default=",".join(FACE_DETECTORS), help="comma-separated detector backends")
+    args = parser.parse_args()
+
+    images = load_images(args.limit, args.upscale)
+    if not images:
+        print(f"No images found under {DATA_DIR}")
+        return
+    height, width = images[0].shape[:2]
+    print(f"{len(images)} images, first is {width}x{height}")
+
+    rows = []
+    latencies, found = run(legacy_haar, images)
+    rows.append({"backend": "haar (legacy)", "faces_found": found, **summarize(latencies)})
+
+    for backend in args.backends.split(","):
+        try:
+            detector = create_face_detector(backend.strip(), max_side=args.max_side)
+        except Exception as e:
+            print(f"Skipping {backend}: {e}")
+            continue
+        # Warm up per-thread state (cascade parse, model load) outside the timed loop
+        detector.detect(images[0])
+        latencies, found = run(detector.detect, images, detector.needs_color)
+        rows.append({"backend": detector.name, "faces_found": found, **summarize(latencies)})
+
+    print_table(rows, ["backend", "faces_found", "count", "mean_ms", "p50_ms", "p95_ms", "p99_ms"])
+
+
+if __name__ == "__main__":
+    main()
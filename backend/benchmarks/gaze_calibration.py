@@ -0,0 +1,94 @@
+"""
+Calibration feature-extraction time: serial vs the parallel extractor pool.
+
+Replays a calibration payload (the JSON body the frontend posts to
+/api/gaze/calibrate) through GazeTrackingService.collect_calibration_samples
+with 1 worker and with --workers workers, and reports the per-stage timings
+and the number of usable samples (which must match). Without --payload a
+synthetic 9-point payload is built from dataset faces; --save-payload writes
+it out so later runs replay the same bytes. Requires EyeTrax.
+
+Usage (from backend/):
+    python -m benchmarks.gaze_calibration --payload calibration.json --workers 4
+    python -m benchmarks.gaze_calibration --frames-per-point 20 --save-payload calibration.json
+"""
+import argparse
+import base64
+import json
+
+import cv2
+
+from app.services.gaze_features import FeatureExtractorPool
+from app.services.gaze_tracker import GazeEstimator, GazeTrackingService, calculate_9_point_calibration_targets
+from benchmarks._common import DATA_DIR, dataset_images, print_table
+
+
+def synthetic_payload(frames_per_point: int, width: int, height: int, screen_width: int = 1920,
+                      screen_height: int = 1080) -> dict:
+    """A CalibrationRequest body: dataset faces at webcam size, frames_per_point per target"""
+    samples = dataset_images(DATA_DIR, limit=9 * frames_per_point)
+    points = calculate_9_point_calibration_targets(screen_width, screen_height)
+    frames = []
+    for index, (path, _) in enumerate(samples):
+        image = cv2.imread(path)
+        if image is None:
+            continue
+        _, jpeg = cv2.imencode(".jpg", cv2.resize(image, (width, height)), [cv2.IMWRITE_JPEG_QUALITY, 80])
+        point_index = (index // frames_per_point) % 9
+        x, y = points[point_index]
+        frames.append({
+            "frame": "data:image/jpeg;base64," + base64.b64encode(jpeg.tobytes()).decode("ascii"),
+            "target_x": x / screen_width,
+            "target_y": y / screen_height,
+            "point_index": point_index,
+        })
+    return {"frames": frames, "screen_width": screen_width, "screen_height": screen_height}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--payload", help="recorded CalibrationRequest JSON")
+    parser.add_argument("--save-payload", help="write the synthetic payload here")
+    parser.add_argument("--frames-per-point", type=int, default=20)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    if args.payload:
+        with open(args.payload) as f:
+            payload = json.load(f)
+    else:
+        payload = synthetic_payload(args.frames_per_point, args.width, args.height)
+        if args.save_payload:
+            with open(args.save_payload, "w") as f:
+                json.dump(payload, f)
+    if not payload["frames"]:
+        print("Calibration payload has no frames")
+        return
+
+    service = GazeTrackingService()
+    if not service.initialize():
+        print("EyeTrax is not available")
+        return
+
+    rows = []
+    for workers in sorted({1, args.workers}):
+        service._extractor_pool = FeatureExtractorPool(GazeEstimator, workers)
+        service._extractor_pool.extract(payload["frames"][:workers], service._decode_calibration_frame)  # warm-up
+        samples = service.collect_calibration_samples(payload["frames"], payload["screen_width"], payload["screen_height"])
+        service._extractor_pool.shutdown()
+        if samples is None:
+            print(f"{workers} worker(s): not enough usable calibration frames")
+            continue
+        X, _, timings = samples
+        rows.append({"workers": workers, "samples": len(X), **timings})
+
+    print(f"\n{len(payload['frames'])} calibration frames")
+    print_table(rows, ["workers", "samples", "wall_ms", "decode_ms", "extract_ms"])
+    if len(rows) == 2:
+        print(f"\nSpeedup (wall): {rows[0]['wall_ms'] / rows[1]['wall_ms']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
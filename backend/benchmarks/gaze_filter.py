@@ -0,0 +1,128 @@
+"""
+Evaluate server-side gaze smoothing and fixation detection on gaze sequences.
+
+A sequence is either a recorded /api/gaze/analyze request body (its
+gaze_data points: timestamp in ms, x, y) or, by default, a synthetic
+scan path: fixations at random targets joined by saccades, with Gaussian
+prediction noise. The sequence is replayed through app.services.gaze_filter
+at several client frame rates (by dropping samples) and compared with the
+raw predictions:
+
+  jitter     RMS distance between consecutive output points within one fixation
+  error      RMS distance to the true gaze point (synthetic sequences only)
+  fixations  detected fixations (and the true count for synthetic sequences)
+
+Usage (from backend/):
+    python -m benchmarks.gaze_filter --rates 30 10 5
+    python -m benchmarks.gaze_filter --recording analyze_request.json --rates 10
+"""
+import argparse
+import json
+import math
+import random
+
+from app.services.gaze_filter import GazeFilter
+from benchmarks._common import print_table
+
+
+def synthetic_sequence(seconds: float, rate: float, noise: float, seed: int = 0):
+    """(timestamp_s, x, y, true_x, true_y, fixation_id) samples of a fixation/saccade scan path (id None in saccades)"""
+    rng = random.Random(seed)
+    samples, t, fixations = [], 0.0, 0
+    target = (rng.uniform(0.1, 0.9), rng.uniform(0.1, 0.9))
+    while t < seconds:
+        fixations += 1
+        fixation_end = t + rng.uniform(0.3, 1.2)
+        while t < min(fixation_end, seconds):
+            samples.append((t, target[0] + rng.gauss(0, noise), target[1] + rng.gauss(0, noise), *target, fixations))
+            t += 1.0 / rate
+        # ~40 ms saccade to the next target
+        start, target = target, (rng.uniform(0.1, 0.9), rng.uniform(0.1, 0.9))
+        saccade_end = t + 0.04
+        while t < min(saccade_end, seconds):
+            k = 1.0 - (saccade_end - t) / 0.04
+            true_point = (start[0] + k * (target[0] - start[0]), start[1] + k * (target[1] - start[1]))
+            samples.append((t, true_point[0] + rng.gauss(0, noise), true_point[1] + rng.gauss(0, noise), *true_point, None))
+            t += 1.0 / rate
+    return samples, fixations
+
+
+def recorded_sequence(path: str):
+    with open(path) as f:
+        body = json.load(f)
+    points = sorted(body["gaze_data"], key=lambda p: p["timestamp"])
+    # No ground truth: every consecutive pair counts towards jitter
+    return [(p["timestamp"] / 1000.0, p["x"], p["y"], None, None, 0) for p in points], None
+
+
+def decimate(samples, source_rate: float, rate: float):
+    step = max(1, int(round(source_rate / rate)))
+    return samples[::step]
+
+
+def evaluate(samples, smooth: bool, filter_options: dict):
+    gaze_filter = GazeFilter.from_options(filter_options)
+    outputs, fixation_starts = [], set()
+    for t, x, y, *_ in samples:
+        if smooth:
+            point = gaze_filter.update(x, y, t)
+            outputs.append((point["x"], point["y"]))
+            if point["fixation"] is not None:
+                fixation_starts.add(point["fixation"]["start"])
+        else:
+            outputs.append((x, y))
+
+    jitter_steps, errors = [], []
+    for i, (t, _, _, true_x, true_y, fixation_id) in enumerate(samples):
+        if true_x is not None:
+            errors.append(math.dist(outputs[i], (true_x, true_y)))
+        if i and fixation_id is not None and fixation_id == samples[i - 1][5]:
+            jitter_steps.append(math.dist(outputs[i], outputs[i - 1]))
+
+    rms = lambda values: math.sqrt(sum(v * v for v in values) / len(values)) if values else 0.0
+    return {
+        "jitter": rms(jitter_steps),
+        "error": rms(errors) if errors else None,
+        "fixations": len(fixation_starts) if smooth else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recording", help="recorded /api/gaze/analyze request body (JSON)")
+    parser.add_argument("--seconds", type=float, default=60.0, help="length of the synthetic sequence")
+    parser.add_argument("--noise", type=float, default=0.03, help="synthetic prediction noise (normalized units)")
+    parser.add_argument("--rates", type=float, nargs="+", default=[30.0, 10.0, 5.0], help="client frame rates to simulate")
+    for name in ("min_cutoff", "beta", "d_cutoff", "fixation_dispersion", "fixation_min_ms"):
+        parser.add_argument(f"--{name.replace('_', '-')}", type=float, dest=name)
+    args = parser.parse_args()
+
+    filter_options = {k: v for k, v in vars(args).items()
+                      if k in ("min_cutoff", "beta", "d_cutoff", "fixation_dispersion", "fixation_min_ms") and v is not None}
+    source_rate = max(args.rates)
+    if args.recording:
+        samples, true_fixations = recorded_sequence(args.recording)
+    else:
+        samples, true_fixations = synthetic_sequence(args.seconds, source_rate, args.noise)
+
+    rows = []
+    for rate in args.rates:
+        replay = decimate(samples, source_rate, rate) if not args.recording else samples
+        for smooth in (False, True):
+            rows.append({
+                "rate_hz": rate,
+                "output": "smoothed" if smooth else "raw",
+                "samples": len(replay),
+                **evaluate(replay, smooth, filter_options),
+            })
+        if args.recording:
+            break
+
+    print(f"Filter parameters: {GazeFilter.from_options(filter_options).parameters}")
+    if true_fixations is not None:
+        print(f"True fixations: {true_fixations}")
+    print_table(rows, ["rate_hz", "output", "samples", "jitter", "error", "fixations"])
+
+
+if __name__ == "__main__":
+    main()
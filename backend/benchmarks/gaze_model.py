@@ -0,0 +1,73 @@
+"""
+Gaze model persistence and prediction: pickled sklearn objects vs the flat .npy format.
+
+Fits EyeTrax's model type (StandardScaler + Ridge) on random calibration-like
+samples, then times:
+
+  load_pickle     pickle.load of the dict GazeTrackingService used to write
+  load_npy        LinearGazeModel.load
+  predict_sklearn scaler.transform + Ridge.predict, one frame at a time
+  predict_matmul  LinearGazeModel.predict, one frame at a time
+
+and checks that both prediction paths agree. Requires scikit-learn.
+
+Usage (from backend/):
+    python -m benchmarks.gaze_model --features 1000 --repeat 200
+"""
+import argparse
+import os
+import pickle
+import tempfile
+
+import numpy as np
+from sklearn.linear_model import Ridge
+from sklearn.preprocessing import StandardScaler
+
+from app.services.gaze_model import LinearGazeModel, migrate_pickle
+from benchmarks._common import print_table, summarize, time_call
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--features", type=int, default=1000, help="feature vector length (depends on the EyeTrax version)")
+    parser.add_argument("--samples", type=int, default=180, help="calibration samples (9 points x 20 frames)")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(args.samples, args.features))
+    y = rng.uniform(0, 1920, size=(args.samples, 2))
+    scaler = StandardScaler()
+    model = Ridge(alpha=1.0).fit(scaler.fit_transform(X), y)
+    frames = [rng.normal(size=(1, args.features)) for _ in range(args.repeat)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        pickle_path = os.path.join(directory, "gaze_model.pkl")
+        npy_path = os.path.join(directory, "gaze_model.npy")
+        with open(pickle_path, "wb") as f:
+            pickle.dump({"model": model, "scaler": scaler, "variable_scaling": None,
+                         "screen_width": 1920, "screen_height": 1080}, f)
+        flat = migrate_pickle(pickle_path, npy_path)
+
+        def load_pickle():
+            with open(pickle_path, "rb") as f:
+                return pickle.load(f)
+
+        rows = [
+            {"stage": "load_pickle", "bytes": os.path.getsize(pickle_path),
+             **summarize([time_call(load_pickle)[1] for _ in range(args.repeat)])},
+            {"stage": "load_npy", "bytes": os.path.getsize(npy_path),
+             **summarize([time_call(LinearGazeModel.load, npy_path)[1] for _ in range(args.repeat)])},
+        ]
+
+    sklearn_predict = lambda features: model.predict(scaler.transform(features))
+    for features in frames[:10]:
+        assert np.allclose(sklearn_predict(features), flat.predict(features)), "prediction paths disagree"
+    rows.append({"stage": "predict_sklearn", **summarize([time_call(sklearn_predict, f)[1] for f in frames])})
+    rows.append({"stage": "predict_matmul", **summarize([time_call(flat.predict, f)[1] for f in frames])})
+
+    print_table(rows, ["stage", "bytes", "mean_ms", "p50_ms", "p95_ms", "p99_ms"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Cost of /api/gaze/analyze payloads: pydantic JSON vs the compact columnar encoding.
+
+Builds a synthetic recording of --points gaze points and times, per request,
+parsing + SPI analysis for:
+
+  json_pydantic   the current GazeAnalysisRequest JSON body through analyze_gaze
+  compact_binary  the binary body through decode_compact_gaze
+  compact_base64  the JSON/base64 body through decode_compact_gaze_json
+
+Usage (from backend/):
+    python -m benchmarks.gaze_payload --points 10000 50000
+"""
+import argparse
+import asyncio
+import base64
+import json
+import random
+
+import numpy as np
+
+from app.routers.gaze_analysis import GazeAnalysisRequest, analyze_gaze, build_gaze_analysis
+from app.services.gaze_payload import HEADER, decode_compact_gaze, decode_compact_gaze_json, encode_compact_gaze
+from benchmarks._common import print_table, summarize, time_call
+
+
+def synthetic_points(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    start = 1_700_000_000_000.0
+    timestamps = [start + i * 100.0 for i in range(count)]
+    xs = [rng.random() for _ in range(count)]
+    ys = [rng.random() for _ in range(count)]
+    return timestamps, xs, ys, [x < 0.5 for x in xs]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    rows = []
+    for count in args.points:
+        timestamps, xs, ys, social = synthetic_points(count)
+        duration = count / 10.0
+
+        json_body = json.dumps({
+            "gaze_data": [{"timestamp": t, "x": x, "y": y, "social_region": s}
+                          for t, x, y, s in zip(timestamps, xs, ys, social)],
+            "video_duration": duration,
+        }).encode()
+        binary_body = encode_compact_gaze(timestamps, xs, ys, social, duration)
+        offset = HEADER.size
+        columns = {}
+        for key, size in (("timestamps", 4 * count), ("x", 4 * count), ("y", 4 * count), ("social_region", (count + 7) // 8)):
+            columns[key] = base64.b64encode(binary_body[offset:offset + size]).decode("ascii")
+            offset += size
+        base64_body = json.dumps({"count": count, "video_duration": duration, "t0": timestamps[0], **columns}).encode()
+
+        def json_pydantic(body):
+            return loop.run_until_complete(analyze_gaze(GazeAnalysisRequest.model_validate_json(body)))
+
+        def compact_binary(body):
+            data = decode_compact_gaze(body)
+            return build_gaze_analysis(data.social_frames, data.geometric_frames)
+
+        def compact_base64(body):
+            data = decode_compact_gaze_json(json.loads(body))
+            return build_gaze_analysis(data.social_frames, data.geometric_frames)
+
+        reference = None
+        for name, fn, body in (("json_pydantic", json_pydantic, json_body),
+                               ("compact_binary", compact_binary, binary_body),
+                               ("compact_base64", compact_base64, base64_body)):
+            result = fn(body)  # warm-up, and check all paths agree
+            if reference is None:
+                reference = result.spi
+            assert np.isclose(result.spi, reference), f"{name} SPI {result.spi} != {reference}"
+            latencies = [time_call(fn, body)[1] for _ in range(args.repeat)]
+            rows.append({"points": count, "payload": name, "body_kb": len(body) / 1024.0, **summarize(latencies)})
+
+    print_table(rows, ["points", "payload", "body_kb", "mean_ms", "p50_ms", "p95_ms"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Frames/sec per core of the gaze WebSocket frame decode: JSON vs binary.
+
+The JSON path is what the frontend sends today: a JSON message holding a
+canvas.toDataURL('image/jpeg', 0.8) string, parsed with json.loads and
+decoded by GazeTrackingService.base64_to_image. The binary paths use
+app.services.gaze_protocol with a JPEG or raw GRAY8 payload. Everything
+runs on one thread, so frames/sec is per core. With --features the EyeTrax
+feature extraction is included, showing the share decoding has of a frame.
+
+Usage (from backend/):
+    python -m benchmarks.gaze_protocol --frames 200 --width 640 --height 480
+"""
+import argparse
+import base64
+import json
+
+import cv2
+
+from app.services.gaze_protocol import FORMAT_GRAY8, FORMAT_JPEG, decode_frame, encode_frame
+from app.services.gaze_tracker import GazeTrackingService
+from benchmarks._common import DATA_DIR, dataset_images, print_table, summarize, time_call
+
+
+def make_frames(count: int, width: int, height: int):
+    """Dataset faces resized to webcam resolution, as BGR arrays"""
+    frames = []
+    samples = dataset_images(DATA_DIR, limit=count)
+    for path, _ in samples:
+        image = cv2.imread(path)
+        if image is not None:
+            frames.append(cv2.resize(image, (width, height)))
+    return frames
+
+
+def encode_messages(frames, quality: int):
+    """Wire messages for each path, built the way the client would send them"""
+    messages = {"json": [], "binary_jpeg": [], "binary_gray8": []}
+    for seq, frame in enumerate(frames):
+        _, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        jpeg = jpeg.tobytes()
+        data_url = "data:image/jpeg;base64," + base64.b64encode(jpeg).decode("ascii")
+        messages["json"].append(json.dumps({"type": "frame", "frame": data_url}))
+        messages["binary_jpeg"].append(encode_frame(jpeg, FORMAT_JPEG, seq=seq, timestamp=seq * 33.3))
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        messages["binary_gray8"].append(
+            encode_frame(gray.tobytes(), FORMAT_GRAY8, gray.shape[1], gray.shape[0], seq=seq, timestamp=seq * 33.3)
+        )
+    return messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--quality", type=int, default=80, help="JPEG quality (toDataURL uses 0.8)")
+    parser.add_argument("--features", action="store_true", help="include EyeTrax feature extraction")
+    args = parser.parse_args()
+
+    frames = make_frames(args.frames, args.width, args.height)
+    if not frames:
+        print(f"No images found under {DATA_DIR}")
+        return
+    messages = encode_messages(frames, args.quality)
+
+    service = GazeTrackingService()
+    if args.features and not service.initialize():
+        print("EyeTrax is not available; run without --features")
+        return
+
+    decoders = {
+        "json": lambda text: service.base64_to_image(json.loads(text)["frame"]),
+        "binary_jpeg": lambda message: decode_frame(message)[1],
+        "binary_gray8": lambda message: decode_frame(message)[1],
+    }
+
+    rows = []
+    for path, decode in decoders.items():
+        if args.features:
+            step = lambda message, decode=decode: service.estimator.extract_features(decode(message))
+        else:
+            step = decode
+        step(messages[path][0])  # warm-up
+        latencies = [time_call(step, message)[1] for message in messages[path]]
+        stats = summarize(latencies)
+        rows.append({
+            "path": path,
+            "mean_kb": sum(len(m) for m in messages[path]) / len(messages[path]) / 1024,
+            "fps_per_core": 1000.0 / stats["mean_ms"] if stats["mean_ms"] else 0.0,
+            **stats,
+        })
+
+    print(f"{len(frames)} frames at {args.width}x{args.height}" + (" (with feature extraction)" if args.features else ""))
+    print_table(rows, ["path", "mean_kb", "mean_ms", "p50_ms", "p95_ms", "fps_per_core"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Offline recording analysis vs live per-frame gaze requests.
+
+Writes the replay frames (see gaze_replay: --frames-dir, --video or dataset
+faces) into an MP4 at --fps, calibrates the shared model on a synthetic
+payload, then compares:
+
+  live       predict_gaze on one base64 JPEG per 1/--sample-fps s, as the client polls today
+  recording  analyze_recording on the MP4 (streaming decode + extractor pool)
+
+reporting wall time, analyzed frames and the bytes each path uploads.
+Requires EyeTrax; the model is written to a temporary directory.
+
+Usage (from backend/):
+    python -m benchmarks.gaze_recording --frames 300 --fps 30 --sample-fps 10
+"""
+import argparse
+import os
+import tempfile
+
+import cv2
+
+from app.services.gaze_recording import analyze_recording, iter_recording_frames
+from app.services.gaze_tracker import GazeTrackingService
+from benchmarks._common import print_table, time_call
+from benchmarks.gaze_calibration import synthetic_payload
+from benchmarks.gaze_replay import load_frames, to_data_url
+
+
+def write_video(frames, path: str, fps: float):
+    height, width = frames[0].shape[:2]
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    for frame in frames:
+        writer.write(frame)
+    writer.release()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=300, help="recorded frames (0 = all in the source)")
+    parser.add_argument("--frames-dir", help="directory of recorded frames")
+    parser.add_argument("--video", help="recorded video file")
+    parser.add_argument("--fps", type=float, default=30.0, help="frame rate of the written recording")
+    parser.add_argument("--sample-fps", type=float, default=10.0, help="frames analyzed per second")
+    parser.add_argument("--frames-per-point", type=int, default=10, help="synthetic calibration frames per point")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    args = parser.parse_args()
+
+    frames = load_frames(args)
+    if not frames:
+        print("No frames to replay")
+        return
+
+    service = GazeTrackingService()
+    if not service.initialize():
+        print("EyeTrax is not available")
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        service.model_path = os.path.join(directory, "gaze_model.npy")
+        payload = synthetic_payload(args.frames_per_point, args.width, args.height)
+        if not service.calibrate_with_frames(payload["frames"], payload["screen_width"], payload["screen_height"]):
+            print("Calibration failed")
+            return
+
+        video_path = os.path.join(directory, "recording.mp4")
+        write_video(frames, video_path, args.fps)
+
+        # The live client sends the frame on screen at each poll
+        step = max(1, int(round(args.fps / args.sample_fps)))
+        data_urls = [to_data_url(frame) for frame in frames[::step]]
+        live_points, live_ms = time_call(lambda: [service.predict_gaze(url) for url in data_urls])
+
+        result, recording_ms = time_call(
+            lambda: analyze_recording(service, iter_recording_frames(video_path, args.sample_fps))
+        )
+        rows = [
+            {"path": "live", "frames": len(data_urls), "predicted": sum(p is not None for p in live_points),
+             "upload_kb": sum(len(url) for url in data_urls) / 1024.0, "wall_ms": live_ms},
+            {"path": "recording", "frames": result["frames"]["analyzed"], "predicted": result["frames"]["predicted"],
+             "upload_kb": os.path.getsize(video_path) / 1024.0, "wall_ms": recording_ms},
+        ]
+
+    print_table(rows, ["path", "frames", "predicted", "upload_kb", "wall_ms"])
+    print(f"recording timings: {result['timings']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Replay recorded webcam frames through the gaze hot path, offline and CPU-only.
+
+Frames come from a directory of JPEG/PNG images (sorted by name), a video
+file, or, by default, dataset faces resized to webcam size. They are
+encoded the way the frontend sends them (base64 JPEG data URLs) and
+replayed through GazeTrackingService:
+
+  calibrate   calibrate_with_frames on a calibration payload (recorded or synthetic)
+  decode      base64_to_image
+  extract     estimator.extract_features
+  predict     estimator.predict on the extracted features
+  predict_gaze / check_frame   the full per-frame calls used by the API
+  analyze_frame                both of the above from one extraction (/frame)
+  predict_gaze_batch/N         predict_gaze_batch on N frames at a time (latency per batch, fps per frame)
+
+For every stage it reports throughput and p50/p95/p99 latency, then a
+second pass under tracemalloc reports the mean per-call peak of Python
+allocations and the blocks still alive afterwards (a leak indicator).
+The calibrated model is written to a temporary file, never to
+models/gaze_model.npy. Requires EyeTrax; no webcam or GPU is needed.
+
+Usage (from backend/):
+    python -m benchmarks.gaze_replay --frames 300
+    python -m benchmarks.gaze_replay --frames-dir recording/ --payload calibration.json
+    python -m benchmarks.gaze_replay --video session.mp4
+"""
+import argparse
+import base64
+import json
+import os
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from app.services.gaze_tracker import GazeTrackingService
+from benchmarks._common import DATA_DIR, dataset_images, print_table, summarize, time_call
+from benchmarks.gaze_calibration import synthetic_payload
+
+
+def load_frames(args):
+    """BGR frames from --frames-dir, --video or the dataset"""
+    frames = []
+    if args.frames_dir:
+        for path in sorted(Path(args.frames_dir).iterdir()):
+            if path.suffix.lower() in (".jpg", ".jpeg", ".png"):
+                image = cv2.imread(str(path))
+                if image is not None:
+                    frames.append(image)
+    elif args.video:
+        capture = cv2.VideoCapture(args.video)
+        while True:
+            ok, image = capture.read()
+            if not ok:
+                break
+            frames.append(image)
+        capture.release()
+    else:
+        for path, _ in dataset_images(DATA_DIR, limit=args.frames):
+            image = cv2.imread(path)
+            if image is not None:
+                frames.append(cv2.resize(image, (args.width, args.height)))
+    if args.frames:
+        frames = frames[:args.frames]
+    return frames
+
+
+def to_data_url(frame: np.ndarray, quality: int = 80) -> str:
+    """canvas.toDataURL('image/jpeg', 0.8) equivalent"""
+    _, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return "data:image/jpeg;base64," + base64.b64encode(jpeg.tobytes()).decode("ascii")
+
+
+def measure_allocations(fn, inputs):
+    """Mean per-call peak of traced allocations (KB) and blocks left alive after the run"""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    peaks = []
+    for item in inputs:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        fn(item)
+        peaks.append((tracemalloc.get_traced_memory()[1] - baseline) / 1024.0)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    live_blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+    return (sum(peaks) / len(peaks)) if peaks else 0.0, live_blocks
+
+
+def stage_row(name: str, fn, inputs, allocations: bool) -> dict:
+    latencies = [time_call(fn, item)[1] for item in inputs]
+    stats = summarize(latencies)
+    row = {
+        "stage": name,
+        "fps": 1000.0 / stats["mean_ms"] if stats["mean_ms"] else 0.0,
+        **stats,
+    }
+    if allocations:
+        row["peak_kb"], row["live_blocks"] = measure_allocations(fn, inputs)
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=300, help="frames to replay (0 = all in the recording)")
+    parser.add_argument("--frames-dir", help="directory of recorded frames")
+    parser.add_argument("--video", help="recorded video file")
+    parser.add_argument("--payload", help="recorded CalibrationRequest JSON (default: synthetic)")
+    parser.add_argument("--frames-per-point", type=int, default=10, help="synthetic calibration frames per point")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--batch", type=int, default=8, help="frames per predict_gaze_batch call (0 = skip)")
+    parser.add_argument("--no-allocations", action="store_true", help="skip the tracemalloc pass")
+    args = parser.parse_args()
+
+    frames = load_frames(args)
+    if not frames:
+        print("No frames to replay")
+        return
+    data_urls = [to_data_url(frame) for frame in frames]
+
+    if args.payload:
+        with open(args.payload) as f:
+            payload = json.load(f)
+    else:
+        payload = synthetic_payload(args.frames_per_point, args.width, args.height)
+
+    service = GazeTrackingService()
+    if not service.initialize():
+        print("EyeTrax is not available")
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        service.model_path = os.path.join(directory, "gaze_model.npy")
+        calibrated, calibrate_ms = time_call(
+            service.calibrate_with_frames, payload["frames"], payload["screen_width"], payload["screen_height"]
+        )
+    print(f"calibrate_with_frames: {len(payload['frames'])} frames in {calibrate_ms:.0f} ms "
+          f"({'ok' if calibrated else 'FAILED'})")
+    if not calibrated:
+        print("Calibration failed; predict stages need a calibrated model")
+        return
+
+    allocations = not args.no_allocations
+    estimator = service.estimator
+    decoded = [service.base64_to_image(url) for url in data_urls]
+    extracted = [estimator.extract_features(frame) for frame in decoded]
+    features = [np.array([f]) for f, blink in extracted if f is not None and not blink]
+    print(f"{len(frames)} frames replayed, {len(features)} with usable features")
+
+    rows = [
+        stage_row("decode", service.base64_to_image, data_urls, allocations),
+        stage_row("extract", estimator.extract_features, decoded, allocations),
+    ]
+    if features:
+        rows.append(stage_row("predict", estimator.predict, features, allocations))
+    rows.append(stage_row("predict_gaze", service.predict_gaze, data_urls, allocations))
+    rows.append(stage_row("check_frame", service.check_frame, data_urls, allocations))
+    rows.append(stage_row("analyze_frame", service.analyze_frame, data_urls, allocations))
+    if args.batch > 0:
+        batches = [data_urls[i:i + args.batch] for i in range(0, len(data_urls), args.batch)]
+        row = stage_row(f"predict_gaze_batch/{args.batch}", service.predict_gaze_batch, batches, allocations)
+        row["fps"] = len(data_urls) / (row["mean_ms"] * len(batches) / 1000.0) if row["mean_ms"] else 0.0
+        rows.append(row)
+
+    columns = ["stage", "count", "fps", "mean_ms", "p50_ms", "p95_ms", "p99_ms"]
+    if allocations:
+        columns += ["peak_kb", "live_blocks"]
+    print()
+    print_table(rows, columns)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Gaze feature extraction on the full frame vs a face-tracking crop (GAZE_ROI).
+
+Replays a recorded sequence (--video or --frames-dir; dataset faces work
+too but are unrelated stills, so the tracker re-detects constantly) as
+base64 JPEG frames through GazeTrackingService.analyze_frame, after
+calibrating a session on a synthetic payload with full frames (ROI
+tracking is per session).
+Each configuration is one pass over the sequence:
+
+  full        the whole frame, as without GAZE_ROI
+  roi/W       FaceROITracker crops, downscaled to at most W px wide (0 = crop resolution)
+
+Per pass: throughput and latency per frame, frames with a face, the
+tracker's detections and losses, and how far ROI predictions land from the
+full-frame prediction of the same frame (normalized screen units; the
+full-frame pass is the reference since recordings have no ground truth).
+
+Usage (from backend/):
+    python -m benchmarks.gaze_roi --video session.mp4 --max-widths 0 320 240
+"""
+import argparse
+import math
+
+from app.services.gaze_roi import GAZE_ROI_PADDING, FaceROITracker
+from app.services.gaze_tracker import GazeTrackingService
+from benchmarks._common import print_table, summarize, time_call
+from benchmarks.gaze_calibration import synthetic_payload
+from benchmarks.gaze_replay import load_frames, to_data_url
+
+
+def run_pass(service: GazeTrackingService, session, data_urls, tracker):
+    service.roi_enabled = tracker is not None
+    session.roi_tracker = tracker
+    results, latencies = [], []
+    for url in data_urls:
+        result, elapsed_ms = time_call(service.analyze_frame, url, session)
+        results.append(result)
+        latencies.append(elapsed_ms)
+    return results, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=300, help="frames to replay (0 = all in the recording)")
+    parser.add_argument("--frames-dir", help="directory of recorded frames")
+    parser.add_argument("--video", help="recorded video file")
+    parser.add_argument("--max-widths", type=int, nargs="+", default=[0, 320, 240], help="ROI downscale widths to compare")
+    parser.add_argument("--padding", type=float, default=GAZE_ROI_PADDING)
+    parser.add_argument("--redetect-every", type=int, default=30)
+    parser.add_argument("--frames-per-point", type=int, default=10, help="synthetic calibration frames per point")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    args = parser.parse_args()
+
+    frames = load_frames(args)
+    if not frames:
+        print("No frames to replay")
+        return
+    data_urls = [to_data_url(frame) for frame in frames]
+
+    service = GazeTrackingService()
+    if not service.initialize():
+        print("EyeTrax is not available")
+        return
+
+    service.roi_enabled = False
+    payload = synthetic_payload(args.frames_per_point, args.width, args.height)
+    session = service.calibrate_session(payload["frames"], payload["screen_width"], payload["screen_height"])
+    if session is None:
+        print("Calibration failed")
+        return
+
+    reference, latencies = run_pass(service, session, data_urls, None)
+    rows = [{"pass": "full", **summarize(latencies)}]
+    rows[0]["faces"] = sum(r["face_detected"] for r in reference)
+    for max_width in args.max_widths:
+        tracker = FaceROITracker(padding=args.padding, max_width=max_width, redetect_every=args.redetect_every)
+        results, latencies = run_pass(service, session, data_urls, tracker)
+        deviations = [
+            math.dist(r["gaze"], ref["gaze"])
+            for r, ref in zip(results, reference) if r["gaze"] is not None and ref["gaze"] is not None
+        ]
+        rows.append({
+            "pass": f"roi/{max_width}",
+            **summarize(latencies),
+            "faces": sum(r["face_detected"] for r in results),
+            "detections": tracker.detections,
+            "losses": tracker.losses,
+            "mean_dev": sum(deviations) / len(deviations) if deviations else None,
+            "max_dev": max(deviations) if deviations else None,
+        })
+    for row in rows:
+        row["fps"] = 1000.0 / row["mean_ms"] if row["mean_ms"] else 0.0
+
+    print(f"{len(frames)} frames")
+    print_table(rows, ["pass", "fps", "mean_ms", "p95_ms", "faces", "detections", "losses", "mean_dev", "max_dev"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Latency and memory of decoding large phone photos for facial analysis.
+
+Compares the legacy path (full-resolution decode, RGB->BGR->GRAY copies,
+resize to 224 from full resolution) with app.services.image_pipeline.decode_upload
+(JPEG draft-mode reduced decode, small detection images, one model input).
+Test images are dataset photos upscaled to phone-camera size and re-encoded
+as JPEG. Each path runs in a fresh subprocess; its peak memory is the
+growth of the process's peak RSS (getrusage) from before the first decode.
+
+Usage (from backend/):
+    python -m benchmarks.image_decoding --count 20 --width 4032 --height 3024
+"""
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from app.services.image_pipeline import decode_upload
+from benchmarks._common import DATA_DIR, dataset_images, peak_rss_mb, print_table, summarize, time_call
+
+
+def legacy_decode(contents: bytes):
+    """The original analyze_face + check_image_quality + transform preprocessing"""
+    image = Image.open(io.BytesIO(contents)).convert("RGB")
+    img_array = np.array(image)
+    img_cv = cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
+    gray = cv2.cvtColor(img_cv, cv2.COLOR_BGR2GRAY)
+    np.mean(gray)
+    return image.resize((224, 224), Image.BILINEAR)
+
+
+def pipeline_decode(contents: bytes):
+    decoded = decode_upload(contents)
+    np.mean(decoded.detection_gray)
+    return decoded.full_frame_input()
+
+
+def make_phone_photos(count: int, width: int, height: int, directory: str):
+    """Upscale dataset images to phone-camera resolution and save as quality-90 JPEGs"""
+    paths = []
+    for index, (path, _) in enumerate(dataset_images(DATA_DIR, limit=count)):
+        image = Image.open(path).convert("RGB").resize((width, height), Image.BICUBIC)
+        output = os.path.join(directory, f"phone_{index:03d}.jpg")
+        image.save(output, "JPEG", quality=90)
+        paths.append(output)
+    return paths
+
+
+def run_mode(mode: str, paths):
+    decode = legacy_decode if mode == "legacy" else pipeline_decode
+    uploads = [open(path, "rb").read() for path in paths]
+    # Peak RSS since process start, read before any decode so the first (warm-up) decode counts too
+    baseline = peak_rss_mb()
+    decode(uploads[0])  # warm-up (latency only)
+    latencies = []
+    for contents in uploads:
+        _, elapsed = time_call(decode, contents)
+        latencies.append(elapsed)
+    return {"mode": mode, "peak_rss_growth_mb": peak_rss_mb() - baseline, **summarize(latencies)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=20, help="number of test photos")
+    parser.add_argument("--width", type=int, default=4032)
+    parser.add_argument("--height", type=int, default=3024)
+    parser.add_argument("--mode", choices=["legacy", "pipeline"], help="internal: run one path and print JSON")
+    parser.add_argument("--paths", nargs="*", help="internal: photos to decode")
+    args = parser.parse_args()
+
+    if args.mode:
+        print("RESULT " + json.dumps(run_mode(args.mode, args.paths)))
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = make_phone_photos(args.count, args.width, args.height, directory)
+        if not paths:
+            print(f"No images found under {DATA_DIR}")
+            return
+        print(f"{len(paths)} photos at {args.width}x{args.height}, "
+              f"mean file size {sum(os.path.getsize(p) for p in paths) / len(paths) / 1024:.0f} KB")
+
+        rows = []
+        for mode in ("legacy", "pipeline"):
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.image_decoding", "--mode", mode, "--paths", *paths],
+                check=True, capture_output=True, text=True
+            ).stdout
+            line = next(l for l in output.splitlines() if l.startswith("RESULT "))
+            rows.append(json.loads(line[len("RESULT "):]))
+
+    print_table(rows, ["mode", "count", "mean_ms", "p50_ms", "p95_ms", "peak_rss_growth_mb"])
+    print(f"\nSpeedup (p50): {rows[0]['p50_ms'] / rows[1]['p50_ms']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
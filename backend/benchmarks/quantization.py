@@ -0,0 +1,88 @@
+"""
+Validate the dynamic int8 ViT against the fp32 model.
+
+Runs both precisions over the AutismDataset holdout and reports accuracy,
+accuracy delta, prediction agreement, per-image p50/p99 latency and the
+resident memory of a process holding the model. Each precision runs in its
+own subprocess so the memory numbers do not overlap.
+
+Usage (from backend/):
+    python -m benchmarks.quantization --limit 200
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+import torch
+from PIL import Image
+
+from app.models.vit_model import load_vit_model, predict_autism_risk
+from benchmarks._common import holdout_images, print_table, rss_mb, summarize, time_call
+
+
+def evaluate(mode: str, limit: int, threads: int) -> dict:
+    """Load one precision and run it over the holdout (batch size 1, CPU)"""
+    torch.set_num_threads(threads)
+    device = torch.device("cpu")
+    rss_before = rss_mb()
+    model = load_vit_model(quantization=mode)
+    rss_model = rss_mb()
+
+    samples = holdout_images(limit=limit)
+    # Warm-up forward so first-call allocation does not skew latency
+    predict_autism_risk(model, Image.open(samples[0][0]).convert("RGB"), device)
+
+    latencies, probabilities, correct = [], [], 0
+    for path, label in samples:
+        image = Image.open(path).convert("RGB")
+        (probability, _), elapsed = time_call(predict_autism_risk, model, image, device)
+        latencies.append(elapsed)
+        probabilities.append(probability)
+        correct += int((probability >= 0.5) == bool(label))
+
+    return {
+        "mode": mode,
+        "images": len(samples),
+        "accuracy": 100.0 * correct / len(samples),
+        "rss_model_mb": rss_model - rss_before,
+        "rss_peak_mb": rss_mb(),
+        "probabilities": probabilities,
+        **summarize(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--limit", type=int, default=0, help="cap the number of holdout images (0 = all)")
+    parser.add_argument("--threads", type=int, default=torch.get_num_threads(), help="torch intra-op threads")
+    parser.add_argument("--mode", choices=["fp32", "int8"], help="evaluate a single precision and print JSON")
+    args = parser.parse_args()
+
+    if args.mode:
+        print("RESULT " + json.dumps(evaluate(args.mode, args.limit, args.threads)))
+        return
+
+    results = {}
+    for mode in ("fp32", "int8"):
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.quantization", "--mode", mode,
+             "--limit", str(args.limit), "--threads", str(args.threads)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        line = next(l for l in output.splitlines() if l.startswith("RESULT "))
+        results[mode] = json.loads(line[len("RESULT "):])
+
+    fp32, int8 = results["fp32"], results["int8"]
+    agree = sum((a >= 0.5) == (b >= 0.5) for a, b in zip(fp32["probabilities"], int8["probabilities"]))
+    max_diff = max(abs(a - b) for a, b in zip(fp32["probabilities"], int8["probabilities"]))
+
+    print_table([fp32, int8], ["mode", "images", "accuracy", "p50_ms", "p99_ms", "mean_ms", "rss_model_mb", "rss_peak_mb"])
+    print()
+    print(f"Accuracy delta (int8 - fp32): {int8['accuracy'] - fp32['accuracy']:+.2f} pts")
+    print(f"Prediction agreement: {agree}/{fp32['images']}  max |prob diff|: {max_diff:.4f}")
+    print(f"p50 speedup: {fp32['p50_ms'] / int8['p50_ms']:.2f}x  p99 speedup: {fp32['p99_ms'] / int8['p99_ms']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
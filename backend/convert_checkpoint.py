@@ -0,0 +1,25 @@
+"""
+Convert the trained ViT checkpoint (vitasd_model.pth) to safetensors.
+load_vit_model prefers vitasd_model.safetensors when it exists next to the
+.pth file: it loads without unpickling and straight into the model's tensors.
+
+Usage (from backend/):
+    python convert_checkpoint.py
+    python convert_checkpoint.py --model-path models/vitasd_model.pth
+"""
+import argparse
+
+from app.models.vit_model import save_safetensors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-path", default=None, help="trained state dict (default: models/vitasd_model.pth)")
+    args = parser.parse_args()
+
+    output_path = save_safetensors(args.model_path)
+    print(f"✓ Wrote {output_path}")
+
+
+if __name__ == "__main__":
+    main()
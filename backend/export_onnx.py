@@ -0,0 +1,99 @@
+"""
+Export the trained ViT model to ONNX for the onnxruntime serving backend.
+The graph takes pixel_values (N x 3 x 224 x 224, dynamic N) and returns logits (N x 2).
+
+Usage (from backend/):
+    python export_onnx.py
+    python export_onnx.py --output models/vitasd_model.onnx --verify
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from app.models.vit_model import IMAGE_SIZE, _load_finetuned_model, _safetensors_path
+from app.models.vit_onnx import ONNX_MODEL_PATH
+
+OPSET_VERSION = 14
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "vitasd_model.pth")
+
+
+class LogitsOnly(nn.Module):
+    """Unwrap the Hugging Face ImageClassifierOutput so the graph has a plain tensor output"""
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, pixel_values):
+        outputs = self.model(pixel_values)
+        return outputs.logits if hasattr(outputs, 'logits') else outputs
+
+
+def resolve_checkpoint(model_path: str = None) -> str:
+    """
+    Absolute path of the fine-tuned checkpoint (relative paths are taken from
+    the current directory). Exits if neither the .pth nor its .safetensors
+    sibling exists: the pretrained fallback of load_vit_model has an untrained
+    head and must never be exported.
+    """
+    model_path = os.path.abspath(model_path) if model_path else DEFAULT_MODEL_PATH
+    if not os.path.exists(model_path) and not os.path.exists(_safetensors_path(model_path)):
+        sys.exit(f"Fine-tuned checkpoint not found at {model_path}; refusing to export the untrained fallback")
+    return model_path
+
+
+def export(model_path: str, output_path: str):
+    """Trace the fine-tuned fp32 model and write the ONNX graph"""
+    # Loaded directly so a broken checkpoint raises instead of falling back to the pretrained model
+    model = LogitsOnly(_load_finetuned_model(resolve_checkpoint(model_path))).eval()
+    dummy = torch.randn(1, 3, IMAGE_SIZE, IMAGE_SIZE)
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            dummy,
+            output_path,
+            input_names=["pixel_values"],
+            output_names=["logits"],
+            dynamic_axes={"pixel_values": {0: "batch"}, "logits": {0: "batch"}},
+            opset_version=OPSET_VERSION,
+            do_constant_folding=True
+        )
+    print(f"✓ Exported ONNX model to {output_path}")
+    return model
+
+
+def verify(model, output_path: str, batch_size: int = 4):
+    """Compare ONNX Runtime logits against PyTorch on a random batch"""
+    import onnxruntime as ort
+
+    session = ort.InferenceSession(output_path, providers=["CPUExecutionProvider"])
+    batch = torch.randn(batch_size, 3, IMAGE_SIZE, IMAGE_SIZE)
+    with torch.no_grad():
+        expected = model(batch).numpy()
+    actual = session.run(["logits"], {"pixel_values": batch.numpy()})[0]
+    max_diff = float(np.abs(expected - actual).max())
+    print(f"Max |logit diff| between PyTorch and ONNX Runtime (batch {batch_size}): {max_diff:.6f}")
+    if max_diff > 1e-3:
+        raise SystemExit("ONNX export verification failed")
+    print("✓ ONNX export verified")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-path", default=None, help="trained state dict (default: models/vitasd_model.pth)")
+    parser.add_argument("--output", default=ONNX_MODEL_PATH, help="where to write the .onnx graph")
+    parser.add_argument("--verify", action="store_true", help="check ONNX Runtime output against PyTorch")
+    args = parser.parse_args()
+
+    model = export(args.model_path, args.output)
+    if args.verify:
+        verify(model, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Server-side gaze smoothing and fixation detection (app.services.gaze_filter).
+
+Sequences are synthetic: a noisy fixation, a step between two targets, and
+streams whose client timestamps are missing or repeated, where the server
+clock (patched here) has to drive the filter instead.
+"""
+import math
+import random
+
+import pytest
+
+from app.services import gaze_filter as gaze_filter_module
+from app.services.gaze_filter import FilterOptionError, GazeFilter
+
+RATE = 30.0
+
+
+def noisy_fixation(seconds: float, target=(0.5, 0.5), noise: float = 0.02, seed: int = 0):
+    rng = random.Random(seed)
+    count = int(seconds * RATE)
+    return [(i / RATE, target[0] + rng.gauss(0, noise), target[1] + rng.gauss(0, noise)) for i in range(count)]
+
+
+def jitter(points):
+    """RMS distance between consecutive points"""
+    steps = [math.dist(a, b) for a, b in zip(points, points[1:])]
+    return math.sqrt(sum(s * s for s in steps) / len(steps))
+
+
+class FakeClock:
+    def __init__(self, start: float = 1000.0):
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(gaze_filter_module.time, "monotonic", fake)
+    return fake
+
+
+def test_jitter_is_reduced_on_a_noisy_fixation():
+    samples = noisy_fixation(3.0)
+    gaze_filter = GazeFilter()
+    smoothed = []
+    for t, x, y in samples:
+        point = gaze_filter.update(x, y, t)
+        smoothed.append((point["x"], point["y"]))
+    raw = [(x, y) for _, x, y in samples]
+    assert jitter(smoothed) < 0.5 * jitter(raw)
+
+
+def test_step_change_is_followed_within_a_bounded_lag():
+    gaze_filter = GazeFilter()
+    t = 0.0
+    for _ in range(30):
+        gaze_filter.update(0.2, 0.2, t)
+        t += 1.0 / RATE
+    step_at = t
+    reached_at = None
+    while t < step_at + 1.0:
+        point = gaze_filter.update(0.8, 0.8, t)
+        if math.dist((point["x"], point["y"]), (0.8, 0.8)) < 0.05:
+            reached_at = t
+            break
+        t += 1.0 / RATE
+    assert reached_at is not None
+    assert reached_at - step_at <= 0.25
+
+
+def test_fixation_is_reported_after_min_duration():
+    gaze_filter = GazeFilter(fixation_min_ms=150)
+    first_fixation = None
+    for t, x, y in noisy_fixation(1.0, noise=0.005):
+        point = gaze_filter.update(x, y, t)
+        if point["fixation"] is not None:
+            first_fixation = (t, point["fixation"])
+            break
+    assert first_fixation is not None
+    t, fixation = first_fixation
+    assert 0.15 <= t <= 0.15 + 2.0 / RATE
+    assert fixation["duration_ms"] >= 150
+    assert fixation["x"] == pytest.approx(0.5, abs=0.01)
+
+
+@pytest.mark.parametrize("timestamp", [0.0, 5.0, None])
+def test_repeated_or_missing_timestamps_fall_back_to_server_time(clock, timestamp):
+    # Binary frames whose header timestamp is never set repeat 0.0 on every frame
+    gaze_filter = GazeFilter()
+    gaze_filter.update(0.2, 0.2, timestamp)
+    outputs = []
+    for _ in range(15):
+        clock.now += 1.0 / RATE
+        outputs.append(gaze_filter.update(0.8, 0.8, timestamp)["x"])
+    assert all(b > a for a, b in zip(outputs, outputs[1:]))
+    assert outputs[-1] > 0.75
+
+
+def test_client_timestamps_drive_the_filter_while_they_increase(clock):
+    # The server clock stalls (frames arrive in a burst); the client's 33 ms steps still apply
+    gaze_filter = GazeFilter()
+    gaze_filter.update(0.2, 0.2, 0.0)
+    outputs = [gaze_filter.update(0.8, 0.8, i / RATE)["x"] for i in range(1, 11)]
+    assert all(b > a for a, b in zip(outputs, outputs[1:]))
+    assert outputs[-1] > 0.75
+
+
+def test_timestamp_going_backwards_does_not_freeze_or_rewind(clock):
+    gaze_filter = GazeFilter()
+    gaze_filter.update(0.2, 0.2, 10.0)
+    clock.now += 0.1
+    first = gaze_filter.update(0.8, 0.8, 9.0)["x"]
+    clock.now += 0.1
+    second = gaze_filter.update(0.8, 0.8, 9.5)["x"]
+    clock.now += 0.1
+    third = gaze_filter.update(0.8, 0.8, 10.1)["x"]
+    assert 0.2 < first < second < third
+
+
+def test_reset_restarts_from_the_next_sample():
+    gaze_filter = GazeFilter()
+    gaze_filter.update(0.2, 0.2, 1.0)
+    gaze_filter.update(0.2, 0.2, 1.1)
+    gaze_filter.reset()
+    assert gaze_filter.update(0.9, 0.9, 0.0)["x"] == pytest.approx(0.9)
+
+
+@pytest.mark.parametrize("options", [
+    {"min_cutoff": 0},
+    {"d_cutoff": -1.0},
+    {"beta": -0.5},
+    {"fixation_min_ms": float("nan")},
+    {"fixation_dispersion": float("inf")},
+    {"beta": "fast"},
+    {"min_cutoff": True},
+    {"beta": None},
+    ["min_cutoff", 1.0],
+])
+def test_from_options_rejects_bad_values(options):
+    with pytest.raises(FilterOptionError):
+        GazeFilter.from_options(options)
+
+
+def test_from_options_applies_overrides_and_ignores_unknown_keys():
+    gaze_filter = GazeFilter.from_options({"beta": "0.5", "fixation_min_ms": 200, "unknown": 1})
+    assert gaze_filter.parameters["beta"] == 0.5
+    assert gaze_filter.parameters["fixation_min_ms"] == 200.0
+    assert GazeFilter.from_options(None).parameters == GazeFilter().parameters
@@ -0,0 +1,105 @@
+"""
+Credit window of the gaze WebSocket flow control.
+
+The /ws loop is simulated event by event: one frame is processed at a time,
+and a frame that has a newer frame queued behind it when its turn comes is
+answered "dropped" (the drop_stale rule of websocket_gaze_tracking). The
+client keeps as many frames in flight as the last reply's credits allow.
+"""
+import heapq
+
+import pytest
+
+from app.services.gaze_flow import FrameFlowController
+
+
+def simulate(flow: FrameFlowController, frame_ms: float, latency_ms: float, duration_ms: float = 10000.0,
+             warmup_ms: float = 1000.0):
+    """Returns (frames processed, frames dropped) after the warm-up"""
+    events = []  # (time, order, kind, payload)
+    order = 0
+
+    def push(time, kind, payload=None):
+        nonlocal order
+        order += 1
+        heapq.heappush(events, (time, order, kind, payload))
+
+    credits, in_flight = 1, 0
+    inbox, busy = [], False
+    processed = dropped = 0
+
+    def client_send(now):
+        nonlocal in_flight
+        while in_flight < credits:
+            in_flight += 1
+            push(now + latency_ms, "arrive")
+
+    def server_next(now):
+        nonlocal busy, dropped
+        while inbox and not busy:
+            inbox.pop(0)
+            if inbox and flow.drop_stale:
+                flow.frame_dropped()
+                if now >= warmup_ms:
+                    dropped += 1
+                push(now + latency_ms, "reply", None)
+                continue
+            busy = True
+            push(now + frame_ms, "done")
+
+    client_send(0.0)
+    while events:
+        now, _, kind, payload = heapq.heappop(events)
+        if now > duration_ms:
+            break
+        if kind == "arrive":
+            inbox.append(now)
+            server_next(now)
+        elif kind == "done":
+            busy = False
+            flow.frame_done(frame_ms)
+            if now >= warmup_ms:
+                processed += 1
+            push(now + latency_ms, "reply", flow.credits())
+            server_next(now)
+        elif kind == "reply":
+            in_flight -= 1
+            if payload is not None:
+                credits = payload
+            client_send(now)
+    return processed, dropped
+
+
+@pytest.mark.parametrize("frame_ms", [20.0, 50.0, 120.0])
+@pytest.mark.parametrize("latency_ms", [1.0, 10.0, 40.0])
+def test_credit_following_client_has_no_drops(frame_ms, latency_ms):
+    processed, dropped = simulate(FrameFlowController(), frame_ms, latency_ms)
+    assert processed > 0
+    assert dropped == 0
+
+
+def test_drop_stale_window_keeps_the_server_busy_on_a_fast_network():
+    # With one frame in transit behind the one being processed, the server never idles
+    processed, _ = simulate(FrameFlowController(), frame_ms=50.0, latency_ms=10.0)
+    assert processed >= 0.95 * 9000.0 / 50.0
+
+
+def test_drop_stale_credits_are_capped_at_two():
+    flow = FrameFlowController(target_latency_ms=250.0, max_credits=4)
+    flow.frame_done(50.0)
+    assert flow.credits() == 2
+    flow.drop_stale = False
+    assert flow.credits() == 4
+
+
+def test_credits_shrink_with_slow_frames_and_queued_jobs():
+    flow = FrameFlowController(target_latency_ms=250.0, max_credits=4)
+    assert flow.credits() == 1
+    flow.frame_done(400.0)
+    assert flow.credits() == 1
+
+    batching = FrameFlowController(target_latency_ms=250.0, max_credits=4)
+    batching.drop_stale = False
+    batching.frame_done(50.0)
+    assert batching.credits(queued_jobs=2) == 2
+    assert batching.credits(queued_jobs=10) == 1